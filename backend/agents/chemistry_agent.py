@@ -1,110 +1,173 @@
-from crewai import Agent
-from transformers import pipeline
-from tools.chemistry_tools.chemical_equation_balancer import ChemicalEquationBalancer
-from tools.chemistry_tools.molar_mass_calculator import MolarMassCalculator
-from tools.chemistry_tools.ph_calculator import pHCalculator
-from db.database import get_query_history
-from rag import setup_rag, retrieve_context
-import os
-from dotenv import load_dotenv
+from functools import lru_cache
+from tools.registry import tool_registry
+from agents.request_context import RequestContext
+from answer_cache import cached_lookup, cached_store
+from generation import get_generation_engine
+from prompt_builder import PromptBuilder
+from agents.intent_router import intent_router
+from typing import Iterator, Optional
 import re
-import google.generativeai as genai
 
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-1.5-flash")
-vector_store = setup_rag()
+def _parse_equation(routed, match) -> Optional[dict]:
+    if "->" not in routed.original:
+        return None
+    return {"equation": re.sub(r"^\s*balance\s*:?\s*", "", routed.original, flags=re.IGNORECASE)}
+
+intent_router.register("chemistry", "equation_balancing", keywords=["->", "balance"], parse=_parse_equation)
+# Compounds are matched on the original text so "H2SO4" keeps its case
+intent_router.register(
+    "chemistry", "molar_mass",
+    pattern=r"molar\s*mass\s+of\s+([A-Za-z0-9]+)",
+    parse=lambda routed, match: {"compound": match.group(1)}
+)
+intent_router.register(
+    "chemistry", "ph",
+    pattern=r"ph\s+of\s+([a-zA-Z0-9]+)\s+(\d*\.?\d+)\s*m\b",
+    parse=lambda routed, match: {"compound": match.group(1), "concentration": float(match.group(2))}
+)
+
+PROMPT = PromptBuilder(
+    "chemistry",
+    "You are a chemistry expert. "
+    "For calculations, solve step-by-step and provide the final answer. "
+    "For theoretical questions, explain clearly with examples if applicable. "
+    "Keep the response concise and accurate."
+)
 
 class ChemistryAgent:
     def __init__(self):
-        self.equation_balancer = ChemicalEquationBalancer()
-        self.molar_mass_calculator = MolarMassCalculator()
-        self.ph_calculator = pHCalculator()
+        self.equation_balancer = tool_registry.get("equation_balancer")
+        self.molar_mass_calculator = tool_registry.get("molar_mass_calculator")
+        self.ph_calculator = tool_registry.get("ph_calculator")
 
-    def solve_chemistry_query(self, query: str, user_id: str = "default") -> dict:
+    def solve_chemistry_query(self, query: str, user_id: str = "default", request_context: RequestContext = None) -> dict:
         """Route chemistry query to appropriate tool or model"""
-        query_lower = query.lower().replace(" ", "")
-        history = get_query_history(user_id, limit=3)
-        context = "Recent queries: " + "; ".join([f"{h['query']} ({h['subject']})" for h in history])
-        rag_context = retrieve_context(query, vector_store)
-
-        # Check for equation balancing
-        if "->" in query_lower or "balance" in query_lower:
-            balance_result = self.equation_balancer.balance_equation(query)
-            if balance_result["success"]:
-                return {
-                    "agent": "chemistry",
-                    "tool_used": "equation_balancer",
-                    "query": query,
-                    "answer": f"Balanced equation: {balance_result['balanced_equation']}",
-                    "details": balance_result,
-                    "confidence": 0.90
-                }
-
-        # Check for molar mass calculations
-        if "molar mass" in query_lower:
-            compound = re.search(r"of\s+([A-Za-z0-9]+)", query_lower)
-            if compound:
-                compound = compound.group(1)
-                mass_result = self.molar_mass_calculator.calculate_molar_mass(compound)
-                if mass_result["success"]:
-                    return {
-                        "agent": "chemistry",
-                        "tool_used": "molar_mass_calculator",
-                        "query": query,
-                        "answer": f"Molar mass of {compound}: {mass_result['molar_mass']} g/mol\nSteps:\n" + "\n".join(mass_result["steps"]),
-                        "details": mass_result,
-                        "confidence": 0.90
-                    }
-
-        # Check for pH calculations
-        if "ph of" in query_lower:
-            compound_match = re.search(r"ph of\s+([a-zA-Z0-9]+)\s+(\d*\.?\d*)\s*m", query_lower)
-            if compound_match:
-                compound, concentration = compound_match.groups()
-                concentration = float(concentration)
-                ph_result = self.ph_calculator.calculate_ph(compound, concentration)
-                if ph_result["success"]:
-                    return {
-                        "agent": "chemistry",
-                        "tool_used": "ph_calculator",
-                        "query": query,
-                        "answer": f"pH of {compound} ({concentration} M): {ph_result['ph']}\nSteps:\n" + "\n".join(ph_result["steps"]),
-                        "details": ph_result,
-                        "confidence": 0.90
-                    }
+        result = self._solve_with_tools(query)
+        if result is not None:
+            return result
 
         # Fallback to language model for theoretical questions
-        return self._use_language_model(query, context, rag_context)
+        cached = cached_lookup(query, "chemistry")
+        if cached is not None:
+            return cached
+
+        request_context = request_context or RequestContext(query, user_id)
+        request_context.prefetch()
+        result = self._use_language_model(query, request_context)
+        cached_store(query, "chemistry", result)
+        return result
+
+    def stream_chemistry_query(self, query: str, user_id: str = "default", request_context: RequestContext = None) -> Iterator[str]:
+        """Yield the answer in chunks, streaming tokens when the language model is needed"""
+        result = self._solve_with_tools(query)
+        if result is not None:
+            yield result["answer"]
+            return
+
+        cached = cached_lookup(query, "chemistry")
+        if cached is not None:
+            yield cached["answer"]
+            return
+
+        request_context = request_context or RequestContext(query, user_id)
+        request_context.prefetch()
+        chunks = []
+        for chunk in self._stream_language_model(query, request_context):
+            chunks.append(chunk)
+            yield chunk
+        cached_store(query, "chemistry", self._language_model_result(query, "".join(chunks)))
+
+    def _solve_with_tools(self, query: str) -> Optional[dict]:
+        """Answer with the best-matching tool, otherwise return None"""
+        handlers = {
+            "equation_balancing": self._balance_equation,
+            "molar_mass": self._calculate_molar_mass,
+            "ph": self._calculate_ph
+        }
+        for match in intent_router.route(query, "chemistry"):
+            result = handlers[match.name](query, **match.args)
+            if result is not None:
+                return result
+        return None
 
-    def _use_language_model(self, query: str, context: str, rag_context: str) -> dict:
+    def _balance_equation(self, query: str, equation: str) -> Optional[dict]:
+        balance_result = self.equation_balancer.balance_equation(equation)
+        if not balance_result["success"]:
+            return None
+        return {
+            "agent": "chemistry",
+            "tool_used": "equation_balancer",
+            "query": query,
+            "answer": f"Balanced equation: {balance_result['balanced_equation']}",
+            "details": balance_result,
+            "confidence": 0.90
+        }
+
+    def _calculate_molar_mass(self, query: str, compound: str) -> Optional[dict]:
+        mass_result = self.molar_mass_calculator.calculate_molar_mass(compound)
+        if not mass_result["success"]:
+            return None
+        return {
+            "agent": "chemistry",
+            "tool_used": "molar_mass_calculator",
+            "query": query,
+            "answer": f"Molar mass of {compound}: {mass_result['molar_mass']} g/mol\nSteps:\n" + "\n".join(mass_result["steps"]),
+            "details": mass_result,
+            "confidence": 0.90
+        }
+
+    def _calculate_ph(self, query: str, compound: str, concentration: float) -> Optional[dict]:
+        ph_result = self.ph_calculator.calculate_ph(compound, concentration)
+        if not ph_result["success"]:
+            return None
+        return {
+            "agent": "chemistry",
+            "tool_used": "ph_calculator",
+            "query": query,
+            "answer": f"pH of {compound} ({concentration} M): {ph_result['ph']}\nSteps:\n" + "\n".join(ph_result["steps"]),
+            "details": ph_result,
+            "confidence": 0.90
+        }
+
+    def _use_language_model(self, query: str, request_context: RequestContext) -> dict:
         """Use language model for chemistry explanations"""
-        prompt = (
-            f"You are a chemistry expert. Given the context: {context}\n"
-            f"Relevant knowledge: {rag_context}\n"
-            f"Query: {query}\n"
-            f"For calculations, solve step-by-step and provide the final answer. "
-            f"For theoretical questions, explain clearly with examples if applicable. "
-            f"Keep the response concise and accurate."
-        )
-        response = chem_pipeline(prompt, max_length=300, num_return_sequences=1, temperature=0.7)[0]["generated_text"]
+        prompt = PROMPT.build(query, request_context.history, request_context.rag_context)
+        return self._language_model_result(query, get_generation_engine().generate(prompt))
+
+    def _language_model_result(self, query: str, answer: str) -> dict:
         return {
             "agent": "chemistry",
             "tool_used": "language_model",
             "query": query,
-            "answer": response,
+            "answer": answer,
             "confidence": 0.75
         }
 
-chemistry_agent = Agent(
-    role="Chemistry Agent",
-    goal="Answer chemistry-related questions and perform calculations",
-    backstory="An expert in organic, inorganic, and physical chemistry",
-    llm=lambda x, **kwargs: ChemistryAgent().solve_chemistry_query(x, kwargs.get("user_id", "default"))["answer"],
-    tools=[
-        ChemicalEquationBalancer().balance_equation,
-        MolarMassCalculator().calculate_molar_mass,
-        pHCalculator().calculate_ph
-    ],
-    verbose=True
-)
\ No newline at end of file
+    def _stream_language_model(self, query: str, request_context: RequestContext) -> Iterator[str]:
+        """Stream an explanation from the local engine as it is generated"""
+        prompt = PROMPT.build(query, request_context.history, request_context.rag_context)
+        yield from get_generation_engine().stream(prompt)
+
+chemistry_solver = ChemistryAgent()
+
+@lru_cache(maxsize=None)
+def build_crew_agent():
+    """The CrewAI agent used by the /query crew"""
+    from crewai import Agent
+    return Agent(
+        role="Chemistry Agent",
+        goal="Answer chemistry-related questions and perform calculations",
+        backstory="An expert in organic, inorganic, and physical chemistry",
+        llm=lambda x, **kwargs: chemistry_solver.solve_chemistry_query(x, kwargs.get("user_id", "default"))["answer"],
+        tools=[
+            chemistry_solver.equation_balancer.balance_equation,
+            chemistry_solver.molar_mass_calculator.calculate_molar_mass,
+            chemistry_solver.ph_calculator.calculate_ph
+        ],
+        verbose=True
+    )
+
+def __getattr__(name):
+    if name == "chemistry_agent":
+        return build_crew_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
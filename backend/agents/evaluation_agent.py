@@ -1,27 +1,19 @@
-from crewai import Agent
-from transformers import pipeline
-from tools.general_tools.answer_comparator import AnswerComparator
-from tools.general_tools.feedback_generator import FeedbackGenerator
-from db.database import get_query_history, save_content
-import os
-from dotenv import load_dotenv
-import google.generativeai as genai
+from functools import lru_cache
+from tools.registry import tool_registry
+from tools.general_tools.answer_equivalence import answer_equivalence_engine
+from db.database import save_content, save_contents
+from metrics import metrics
+import time
 
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-1.5-flash")
-vector_store = setup_rag()
+metrics.register("answer_equivalence", answer_equivalence_engine.stats)
 
 class EvaluationAgent:
     def __init__(self):
-        self.answer_comparator = AnswerComparator()
-        self.feedback_generator = FeedbackGenerator()
+        self.answer_comparator = tool_registry.get("answer_comparator")
+        self.feedback_generator = tool_registry.get("feedback_generator")
 
     def evaluate_answer(self, query: str, student_answer: str, correct_answer: str, user_id: str = "default") -> dict:
         """Evaluate student answer and provide feedback"""
-        history = get_query_history(user_id, limit=3)
-        context = "Recent queries: " + "; ".join([f"{h['query']} ({h['subject']})" for h in history])
-
         # Compare answers
         comparison_result = self.answer_comparator.compare_answer(student_answer, correct_answer, query)
         if not comparison_result["success"]:
@@ -52,19 +44,74 @@ class EvaluationAgent:
             "success": True
         }
 
-evaluation_agent = Agent(
-    role="Evaluation Agent",
-    goal="Evaluate student answers and provide feedback",
-    backstory="An expert in assessing responses across math, physics, and chemistry",
-    llm=lambda x, **kwargs: EvaluationAgent().evaluate_answer(
-        kwargs.get("query", ""),
-        kwargs.get("student_answer", ""),
-        kwargs.get("correct_answer", ""),
-        kwargs.get("user_id", "default")
-    )["feedback"],
-    tools=[
-        AnswerComparator().compare_answer,
-        FeedbackGenerator().generate_feedback
-    ],
-    verbose=True
-)
\ No newline at end of file
+    def evaluate_batch(self, query: str, correct_answer: str, submissions: list) -> dict:
+        """Grade many {user_id, student_answer} submissions against one answer key"""
+        start = time.perf_counter()
+        comparison_result = self.answer_comparator.compare_batch(
+            [s["student_answer"] for s in submissions], correct_answer, query
+        )
+        if not comparison_result["success"]:
+            return {
+                "agent": "evaluation",
+                "query": query,
+                "success": False,
+                "error": comparison_result["error"]
+            }
+
+        results = []
+        feedback_rows = []
+        for submission, comparison in zip(submissions, comparison_result["results"]):
+            user_id = submission.get("user_id", "default")
+            feedback_result = self.feedback_generator.generate_feedback(
+                query, submission["student_answer"], correct_answer, comparison["is_correct"]
+            )
+            feedback_rows.append((user_id, "evaluation", feedback_result["feedback"]))
+            results.append({
+                "user_id": user_id,
+                "student_answer": submission["student_answer"],
+                "is_correct": comparison["is_correct"],
+                "feedback": feedback_result["feedback"],
+                "similarity": comparison["similarity"]
+            })
+
+        # All feedback rows go to the database in one transaction
+        save_contents(feedback_rows)
+        elapsed = time.perf_counter() - start
+        return {
+            "agent": "evaluation",
+            "query": query,
+            "correct_answer": correct_answer,
+            "results": results,
+            "correct_count": sum(1 for r in results if r["is_correct"]),
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "submissions_per_second": round(len(results) / elapsed, 1) if elapsed > 0 else None,
+            "success": True
+        }
+
+evaluation_solver = EvaluationAgent()
+
+@lru_cache(maxsize=None)
+def build_crew_agent():
+    """The CrewAI agent used by the /query crew"""
+    from crewai import Agent
+    return Agent(
+        role="Evaluation Agent",
+        goal="Evaluate student answers and provide feedback",
+        backstory="An expert in assessing responses across math, physics, and chemistry",
+        llm=lambda x, **kwargs: evaluation_solver.evaluate_answer(
+            kwargs.get("query", ""),
+            kwargs.get("student_answer", ""),
+            kwargs.get("correct_answer", ""),
+            kwargs.get("user_id", "default")
+        )["feedback"],
+        tools=[
+            evaluation_solver.answer_comparator.compare_answer,
+            evaluation_solver.feedback_generator.generate_feedback
+        ],
+        verbose=True
+    )
+
+def __getattr__(name):
+    if name == "evaluation_agent":
+        return build_crew_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,101 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Pattern
+import re
+import threading
+
+class RoutedQuery:
+    """A query tokenised once for every intent to score against"""
+
+    def __init__(self, query: str):
+        self.original = query
+        self.lower = query.lower()
+        # Same shape as the query_lower the agents used to match against
+        self.compact = self.lower.replace(" ", "")
+
+class Intent:
+    def __init__(self, subject: str, name: str, keywords: Iterable[str], pattern: Optional[Pattern],
+                 parse: Optional[Callable[[RoutedQuery, Any], Optional[Dict[str, Any]]]], priority: float):
+        self.subject = subject
+        self.name = name
+        self.keywords = {k.lower().replace(" ", "") for k in keywords}
+        self.pattern = pattern
+        self.parse = parse
+        self.priority = priority
+
+class RouteMatch:
+    def __init__(self, name: str, score: float, args: Dict[str, Any]):
+        self.name = name
+        self.score = score
+        self.args = args
+
+    def __repr__(self):
+        return f"RouteMatch({self.name!r}, score={self.score}, args={self.args})"
+
+class IntentRouter:
+    """Scores every registered tool intent against a query in one pass.
+
+    An intent applies when at least one of its keywords occurs (if it has keywords) and its
+    pattern matches (if it has one). The parser turns the pattern match into tool arguments and
+    may return None to decline. Keywords are matched against the query with spaces removed.
+    Queries longer than MAX_PATTERN_LENGTH are only routed by keywords, which bounds the cost
+    of running every pattern against pasted essays.
+    """
+
+    PATTERN_BONUS = 2.0
+    MAX_PATTERN_LENGTH = 500
+
+    def __init__(self):
+        self._intents = {}
+        self._keyword_regex = {}
+        self._lock = threading.Lock()
+
+    def register(self, subject: str, name: str, keywords: Iterable[str] = (), pattern: Optional[str] = None,
+                 parse: Optional[Callable[[RoutedQuery, Any], Optional[Dict[str, Any]]]] = None,
+                 priority: float = 0.0, flags: int = re.IGNORECASE):
+        """Register (or replace) a tool intent for a subject"""
+        compiled = re.compile(pattern, flags) if pattern else None
+        with self._lock:
+            intents = self._intents.setdefault(subject, {})
+            intents[name] = Intent(subject, name, keywords, compiled, parse, priority)
+            self._keyword_regex[subject] = self._compile_keywords(intents.values())
+
+    def _compile_keywords(self, intents) -> Optional[Pattern]:
+        keywords = sorted({k for intent in intents for k in intent.keywords}, key=len, reverse=True)
+        if not keywords:
+            return None
+        return re.compile("|".join(re.escape(k) for k in keywords))
+
+    def route(self, query: str, subject: str) -> List[RouteMatch]:
+        """Return the applicable intents for the subject, best first"""
+        routed = RoutedQuery(query)
+        with self._lock:
+            intents = list(self._intents.get(subject, {}).values())
+            keyword_regex = self._keyword_regex.get(subject)
+
+        # One scan finds every keyword of every intent
+        hits = set(keyword_regex.findall(routed.compact)) if keyword_regex else set()
+        match_patterns = len(routed.original) <= self.MAX_PATTERN_LENGTH
+        matches = []
+        for intent in intents:
+            keyword_hits = len(intent.keywords & hits)
+            if intent.keywords and not keyword_hits:
+                continue
+            match = None
+            if intent.pattern is not None:
+                if not match_patterns:
+                    continue
+                match = intent.pattern.search(routed.original)
+                if match is None:
+                    continue
+            args = intent.parse(routed, match) if intent.parse else {}
+            if args is None:
+                continue
+            score = keyword_hits + (self.PATTERN_BONUS if match is not None else 0.0) + intent.priority
+            matches.append(RouteMatch(intent.name, score, args))
+        matches.sort(key=lambda m: m.score, reverse=True)
+        return matches
+
+    def intents(self, subject: str) -> List[str]:
+        with self._lock:
+            return list(self._intents.get(subject, {}))
+
+intent_router = IntentRouter()
@@ -1,147 +1,362 @@
-from crewai import Agent
-import google.generativeai as genai
-from transformers import pipeline
-from transformers import pipeline, AutoModelForCausalLM, AutoTokenizer
-from tools.math_tools.calculator import BasicCalculator
-from tools.math_tools.equation_solver import EquationSolver
-from tools.math_tools.statistics_calculator import StatisticsCalculator
-from tools.math_tools.geometry_calculator import GeometryCalculator
-from db.database import get_query_history
-from rag import retrieve_context, setup_rag
-import os
-from dotenv import load_dotenv
+from functools import lru_cache
+from tools.math_tools.equation_solver import linear_cache_stats
+from tools.registry import tool_registry
+from tools.math_tools import expression_engine
+from agents.request_context import RequestContext
+from answer_cache import cached_lookup, cached_store
+from generation import get_generation_engine
+from prompt_builder import PromptBuilder
+from agents.intent_router import intent_router
+from metrics import metrics
+from decimal import Decimal
+from typing import Iterator, Optional
 import re
-# import torch
 
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-1.5-flash")
-vector_store = setup_rag()
+metrics.register("expression_cache", expression_engine.cache_stats)
+metrics.register("linear_equation_cache", linear_cache_stats)
+
+def _format_result(value) -> str:
+    """str() of a result, in scientific notation when the integer is too long to print in full"""
+    try:
+        return str(value)
+    except ValueError:
+        # Python refuses int -> str conversions beyond sys.get_int_max_str_digits()
+        return f"{Decimal(value):.12e}"
+
+def _coefficient(text: Optional[str], default: float) -> float:
+    """Parse a polynomial coefficient: "" or "+" is 1, "-" is -1, otherwise the number"""
+    if text is None:
+        return default
+    text = text.replace(" ", "")
+    if text in ("", "+"):
+        return 1
+    if text == "-":
+        return -1
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+# Names the expression engine evaluates, so "ln(e)" and "e^2" reach the calculator. Trailing digits
+# are dropped ("log10" is already "log" followed by digits) so every match splits into tokens one way
+_CONSTANTS = [name for name, value in expression_engine.SCALAR_NAMESPACE.items() if not callable(value)]
+_CALCULATOR_WORDS = "|".join(sorted(
+    {re.sub(r"\d+$", "", name) for name in [*expression_engine.SCALAR_NAMESPACE, *expression_engine.FUNCTION_ALIASES]},
+    key=lambda word: (-len(word), word)
+))
+_OPERAND = re.compile(r"\d|\b(?:" + "|".join(_CONSTANTS) + r")\b", re.IGNORECASE)
+
+def _parse_arithmetic(routed, match) -> Optional[dict]:
+    expression = match.group("expr").strip()
+    if not _OPERAND.search(expression) or not re.search(r"[+\-*/^×÷(]", expression):
+        return None
+    return {"expression": expression}
+
+def _parse_table(routed, match) -> Optional[dict]:
+    return {
+        "expression": match.group("expr").strip(),
+        "start": float(match.group("start")),
+        "stop": float(match.group("stop"))
+    }
+
+def _parse_linear(routed, match) -> Optional[dict]:
+    equation = match.group("equation").strip()
+    # Only single-letter unknowns; words mean this isn't a bare equation
+    if re.search(r"[a-z]{2,}", equation, re.IGNORECASE):
+        return None
+    if not re.search(r"[a-z]", equation, re.IGNORECASE):
+        return None
+    return {"equation": equation}
+
+def _parse_system(routed, match) -> Optional[dict]:
+    equations = [part.strip() for part in re.split(r"[,;]|\band\b", match.group("equations")) if part.strip()]
+    if len(equations) < 2 or any(equation.count("=") != 1 for equation in equations):
+        return None
+    if any(re.search(r"[a-z]{2,}", equation, re.IGNORECASE) for equation in equations):
+        return None
+    return {"equations": equations}
+
+def _parse_quadratic(routed, match) -> Optional[dict]:
+    return {
+        "a": _coefficient(match.group("a"), 1),
+        "b": _coefficient(match.group("b"), 0) if match.group("b") is not None else 0,
+        "c": _coefficient(match.group("c"), 0) if match.group("c") is not None else 0
+    }
+
+def _parse_statistics(routed, match) -> Optional[dict]:
+    data = routed.original.split("of")[-1].strip()
+    return {"data": data} if re.search(r"\d", data) else None
+
+def _parse_geometry(routed, match) -> Optional[dict]:
+    shape = match.group(1).lower()
+    params = {}
+    if shape == "circle":
+        radius_match = re.search(r"radius\s*(\d+\.?\d*)", routed.compact)
+        if not radius_match:
+            return None
+        params["radius"] = float(radius_match.group(1))
+    else:
+        length_match = re.search(r"length\s*(\d+\.?\d*)", routed.compact)
+        width_match = re.search(r"width\s*(\d+\.?\d*)", routed.compact)
+        if not (length_match and width_match):
+            return None
+        params["length"] = float(length_match.group(1))
+        params["width"] = float(width_match.group(1))
+    return {"shape": shape, "params": params}
+
+intent_router.register(
+    "math", "calculator",
+    pattern=(
+        r"^\s*(?:(?:what\s+is|calculate|compute|evaluate)\s*)?"
+        # Spaces only ever separate tokens, so each way through the expression is unique
+        rf"(?P<expr>(?:[\d.+\-*/^()×÷]|{_CALCULATOR_WORDS})(?:\s*(?:[\d.+\-*/^()×÷]|{_CALCULATOR_WORDS}))*)"
+        r"\s*\??\s*$"
+    ),
+    parse=_parse_arithmetic
+)
+intent_router.register(
+    "math", "table_of_values",
+    keywords=["table", "plot"],
+    pattern=r"(?:table\s+of\s+values|plot)\s+(?:for\s+|of\s+)?(?:y\s*=\s*)?(?P<expr>.+?)\s+from\s+(?P<start>-?\d+\.?\d*)\s+to\s+(?P<stop>-?\d+\.?\d*)",
+    parse=_parse_table
+)
+intent_router.register(
+    "math", "linear_system",
+    pattern=r"^\s*(?:solve\s*(?:the\s+system\s*)?:?\s*)?(?P<equations>[\w\s.+\-*/()]+=[\w\s.+\-*/()]+(?:(?:[,;]|\band\b)[\w\s.+\-*/()]+=[\w\s.+\-*/()]+)+?)\s*\??\s*$",
+    parse=_parse_system,
+    priority=1.0
+)
+intent_router.register(
+    "math", "linear_equation",
+    pattern=r"^\s*(?:solve\s*:?\s*)?(?P<equation>[\w\s.+\-*/()]+=[\w\s.+\-*/()]+?)\s*\??\s*$",
+    parse=_parse_linear
+)
+intent_router.register(
+    "math", "quadratic_equation",
+    pattern=(
+        r"^\s*(?:solve\s*:?\s*)?"
+        # Every optional part starts with its own non-space token, so spaces are never shared
+        r"(?P<a>(?:[+-]\s*)?(?:\d+(?:\.\d+)?\s*)?)x\s*(?:\^|\*\*)\s*2\s*"
+        r"(?:(?P<b>[+-]\s*(?:\d+(?:\.\d+)?\s*)?)x(?![\w^*])\s*)?"
+        r"(?:(?P<c>[+-]\s*\d+(?:\.\d+)?)\s*)?=\s*0"
+    ),
+    parse=_parse_quadratic,
+    priority=1.0
+)
+intent_router.register(
+    "math", "statistics",
+    keywords=["mean", "median", "mode", "standard deviation"],
+    parse=_parse_statistics
+)
+intent_router.register(
+    "math", "geometry",
+    keywords=["area"],
+    pattern=r"area.*?(circle|rectangle)",
+    parse=_parse_geometry
+)
+
+PROMPT = PromptBuilder(
+    "math",
+    "You are a math expert. "
+    "For numerical questions, solve step-by-step and provide the final answer. "
+    "For theoretical questions, explain clearly with examples if applicable. "
+    "Keep the response concise and accurate."
+)
 
 class MathAgent:
     def __init__(self):
-        self.calculator = BasicCalculator()
-        self.equation_solver = EquationSolver()
-        self.stats_calculator = StatisticsCalculator()
-        self.geometry_calculator = GeometryCalculator()
+        self.calculator = tool_registry.get("calculator")
+        self.equation_solver = tool_registry.get("equation_solver")
+        self.stats_calculator = tool_registry.get("statistics_calculator")
+        self.geometry_calculator = tool_registry.get("geometry_calculator")
 
-    def solve_math_query(self, query: str, user_id: str = "default") -> dict:
+    def solve_math_query(self, query: str, user_id: str = "default", request_context: RequestContext = None) -> dict:
         """Route query to appropriate tool or model"""
-        query_lower = query.lower().replace(" ", "")
-        history = get_query_history(user_id, limit=3)
-        context = "Recent queries: " + "; ".join([f"{h['query']} ({h['subject']})" for h in history])
-        rag_context = retrieve_context(query, vector_store)
-
-        # Check for arithmetic calculations
-        if any(op in query_lower for op in ['+', '-', '*', '/', '(', ')', '^']):
-            calc_result = self.calculator.evaluate_expression(query)
-            if calc_result["success"]:
-                return {
-                    "agent": "math",
-                    "tool_used": "calculator",
-                    "query": query,
-                    "answer": f"Result: {calc_result['result']}",
-                    "details": calc_result,
-                    "confidence": 0.95
-                }
-
-        # Check for linear equations
-        if '=' in query_lower and any(var in query_lower for var in ['x', 'y', 'z']):
-            eq_result = self.equation_solver.solve_linear_equation(query)
-            if eq_result["success"]:
-                return {
-                    "agent": "math",
-                    "tool_used": "equation_solver",
-                    "query": query,
-                    "answer": f"Solution: {eq_result['variable']} = {eq_result['solution']}\nSteps:\n" + "\n".join(eq_result["steps"]),
-                    "details": eq_result,
-                    "confidence": 0.90
-                }
-
-        # Check for quadratic equations (e.g., "Solve x^2 + 5x + 6 = 0")
-        quadratic_match = re.match(r'(\d*)x\^2\s*([+-]?\s*\d*)x\s*([+-]?\s*\d*)\s*=\s*0', query_lower)
-        if quadratic_match:
-            a = int(quadratic_match.group(1) or 1)
-            b = int((quadratic_match.group(2).replace(" ", "") or "+0").replace("+", ""))
-            c = int((quadratic_match.group(3).replace(" ", "") or "+0").replace("+", ""))
-            quad_result = self.equation_solver.solve_quadratic_equation(a, b, c)
-            if quad_result["success"]:
-                return {
-                    "agent": "math",
-                    "tool_used": "equation_solver",
-                    "query": query,
-                    "answer": f"Solutions: {', '.join(quad_result['solutions'])}\nSteps:\n" + "\n".join(quad_result["steps"]),
-                    "details": quad_result,
-                    "confidence": 0.90
-                }
-
-        # Check for statistics queries (e.g., "Find mean of 1,2,3,4,5")
-        if any(keyword in query_lower for keyword in ['mean', 'median', 'mode', 'standard deviation']):
-            stats_result = self.stats_calculator.calculate_stats(query.split("of")[-1].strip())
-            if stats_result["success"]:
-                return {
-                    "agent": "math",
-                    "tool_used": "statistics_calculator",
-                    "query": query,
-                    "answer": f"Mean: {stats_result['mean']}, Median: {stats_result['median']}, Mode: {stats_result['mode']}, Std Dev: {stats_result['std_dev']}",
-                    "details": stats_result,
-                    "confidence": 0.90
-                }
-
-        # Check for geometry queries (e.g., "Area of circle with radius 5")
-        if 'area' in query_lower and any(shape in query_lower for shape in ['circle', 'rectangle']):
-            shape = 'circle' if 'circle' in query_lower else 'rectangle'
-            params = {}
-            if shape == 'circle':
-                radius_match = re.search(r'radius\s*(\d+)', query_lower)
-                if radius_match:
-                    params["radius"] = float(radius_match.group(1))
-            elif shape == 'rectangle':
-                length_match = re.search(r'length\s*(\d+)', query_lower)
-                width_match = re.search(r'width\s*(\d+)', query_lower)
-                if length_match and width_match:
-                    params["length"] = float(length_match.group(1))
-                    params["width"] = float(width_match.group(1))
-            geo_result = self.geometry_calculator.calculate_area(shape, params)
-            if geo_result["success"]:
-                return {
-                    "agent": "math",
-                    "tool_used": "geometry_calculator",
-                    "query": query,
-                    "answer": f"Area of {shape}: {geo_result['area']}",
-                    "details": geo_result,
-                    "confidence": 0.90
-                }
+        result = self._solve_with_tools(query)
+        if result is not None:
+            return result
 
         # Fallback to language model for theoretical questions
-        return self._use_language_model(query, context, rag_context)
+        cached = cached_lookup(query, "math")
+        if cached is not None:
+            return cached
+
+        request_context = request_context or RequestContext(query, user_id)
+        request_context.prefetch()
+        result = self._use_language_model(query, request_context)
+        cached_store(query, "math", result)
+        return result
+
+    def stream_math_query(self, query: str, user_id: str = "default", request_context: RequestContext = None) -> Iterator[str]:
+        """Yield the answer in chunks, streaming tokens when the language model is needed"""
+        result = self._solve_with_tools(query)
+        if result is not None:
+            yield result["answer"]
+            return
+
+        cached = cached_lookup(query, "math")
+        if cached is not None:
+            yield cached["answer"]
+            return
 
-    def _use_language_model(self, query: str, context: str, rag_context: str) -> dict:
+        request_context = request_context or RequestContext(query, user_id)
+        request_context.prefetch()
+        chunks = []
+        for chunk in self._stream_language_model(query, request_context):
+            chunks.append(chunk)
+            yield chunk
+        cached_store(query, "math", self._language_model_result(query, "".join(chunks)))
+
+    def _solve_with_tools(self, query: str) -> Optional[dict]:
+        """Answer with the best-matching tool, otherwise return None"""
+        handlers = {
+            "calculator": self._calculate,
+            "linear_equation": self._solve_linear,
+            "linear_system": self._solve_system,
+            "quadratic_equation": self._solve_quadratic,
+            "statistics": self._calculate_stats,
+            "geometry": self._calculate_area,
+            "table_of_values": self._table_of_values
+        }
+        for match in intent_router.route(query, "math"):
+            result = handlers[match.name](query, **match.args)
+            if result is not None:
+                return result
+        return None
+
+    def _calculate(self, query: str, expression: str) -> Optional[dict]:
+        calc_result = self.calculator.evaluate_expression(expression)
+        if not calc_result["success"]:
+            return None
+        return {
+            "agent": "math",
+            "tool_used": "calculator",
+            "query": query,
+            "answer": f"Result: {_format_result(calc_result['result'])}",
+            "details": calc_result,
+            "confidence": 0.95
+        }
+
+    def _table_of_values(self, query: str, expression: str, start: float, stop: float) -> Optional[dict]:
+        table_result = self.calculator.table_of_values(expression, start, stop)
+        if not table_result["success"]:
+            return None
+        rows = [f"{x:g}\t{'undefined' if y is None else f'{y:g}'}" for x, y in zip(table_result["x"], table_result["y"])]
+        return {
+            "agent": "math",
+            "tool_used": "calculator",
+            "query": query,
+            "answer": f"Table of values for {expression}:\nx\ty\n" + "\n".join(rows),
+            "details": table_result,
+            "confidence": 0.95
+        }
+
+    def _solve_linear(self, query: str, equation: str) -> Optional[dict]:
+        eq_result = self.equation_solver.solve_linear_equation(equation)
+        if not eq_result["success"]:
+            return None
+        if eq_result["solution"] is not None:
+            solution = f"{eq_result['variable']} = {eq_result['solution']}"
+        else:
+            solution = eq_result.get("nature", "No solution found")
+        return {
+            "agent": "math",
+            "tool_used": "equation_solver",
+            "query": query,
+            "answer": f"Solution: {solution}\nSteps:\n" + "\n".join(eq_result["steps"]),
+            "details": eq_result,
+            "confidence": 0.90
+        }
+
+    def _solve_system(self, query: str, equations: list) -> Optional[dict]:
+        system_result = self.equation_solver.solve_linear_system(equations)
+        if not system_result["success"]:
+            return None
+        solution = ", ".join(f"{variable} = {value:g}" for variable, value in system_result["solution"].items())
+        return {
+            "agent": "math",
+            "tool_used": "equation_solver",
+            "query": query,
+            "answer": f"Solution: {solution}\nSteps:\n" + "\n".join(system_result["steps"]),
+            "details": system_result,
+            "confidence": 0.90
+        }
+
+    def _solve_quadratic(self, query: str, a: float, b: float, c: float) -> Optional[dict]:
+        quad_result = self.equation_solver.solve_quadratic_equation(a, b, c)
+        if not quad_result["success"]:
+            return None
+        return {
+            "agent": "math",
+            "tool_used": "equation_solver",
+            "query": query,
+            "answer": f"Solutions: {', '.join(quad_result['solutions'])}\nSteps:\n" + "\n".join(quad_result["steps"]),
+            "details": quad_result,
+            "confidence": 0.90
+        }
+
+    def _calculate_stats(self, query: str, data: str) -> Optional[dict]:
+        stats_result = self.stats_calculator.calculate_stats(data)
+        if not stats_result["success"]:
+            return None
+        return {
+            "agent": "math",
+            "tool_used": "statistics_calculator",
+            "query": query,
+            "answer": f"Mean: {stats_result['mean']}, Median: {stats_result['median']}, Mode: {stats_result['mode']}, Std Dev: {stats_result['std_dev']}",
+            "details": stats_result,
+            "confidence": 0.90
+        }
+
+    def _calculate_area(self, query: str, shape: str, params: dict) -> Optional[dict]:
+        geo_result = self.geometry_calculator.calculate_area(shape, params)
+        if not geo_result["success"]:
+            return None
+        return {
+            "agent": "math",
+            "tool_used": "geometry_calculator",
+            "query": query,
+            "answer": f"Area of {shape}: {geo_result['area']}",
+            "details": geo_result,
+            "confidence": 0.90
+        }
+
+    def _use_language_model(self, query: str, request_context: RequestContext) -> dict:
         """Use language model for complex math explanations"""
-        prompt = (
-            f"You are a math expert. Given the context: {context}\n"
-            f"Relevant knowledge: {rag_context}\n"
-            f"Query: {query}\n"
-            f"For numerical questions, solve step-by-step and provide the final answer. "
-            f"For theoretical questions, explain clearly with examples if applicable. "
-            f"Keep the response concise and accurate."
-        )
-        response = math_pipeline(prompt, max_length=300, num_return_sequences=1, temperature=0.7)[0]["generated_text"]
+        prompt = PROMPT.build(query, request_context.history, request_context.rag_context)
+        return self._language_model_result(query, get_generation_engine().generate(prompt))
+
+    def _language_model_result(self, query: str, answer: str) -> dict:
         return {
             "agent": "math",
             "tool_used": "language_model",
             "query": query,
-            "answer": response,
+            "answer": answer,
             "confidence": 0.75
         }
 
-math_agent = Agent(
-    role="Math Agent",
-    goal="Answer mathematics-related questions and perform calculations",
-    backstory="An expert in algebra, calculus, statistics, and geometry",
-    llm=lambda x, **kwargs: MathAgent().solve_math_query(x, kwargs.get("user_id", "default"))["answer"],
-    tools=[BasicCalculator().evaluate_expression, EquationSolver().solve_linear_equation, 
-           EquationSolver().solve_quadratic_equation, StatisticsCalculator().calculate_stats,
-           GeometryCalculator().calculate_area],
-    verbose=True
-)
\ No newline at end of file
+    def _stream_language_model(self, query: str, request_context: RequestContext) -> Iterator[str]:
+        """Stream an explanation from the local engine as it is generated"""
+        prompt = PROMPT.build(query, request_context.history, request_context.rag_context)
+        yield from get_generation_engine().stream(prompt)
+
+math_solver = MathAgent()
+
+@lru_cache(maxsize=None)
+def build_crew_agent():
+    """The CrewAI agent used by the /query crew; crewai is imported when it is first built"""
+    from crewai import Agent
+    return Agent(
+        role="Math Agent",
+        goal="Answer mathematics-related questions and perform calculations",
+        backstory="An expert in algebra, calculus, statistics, and geometry",
+        llm=lambda x, **kwargs: math_solver.solve_math_query(x, kwargs.get("user_id", "default"))["answer"],
+        tools=[math_solver.calculator.evaluate_expression, math_solver.equation_solver.solve_linear_equation,
+               math_solver.equation_solver.solve_quadratic_equation, math_solver.stats_calculator.calculate_stats,
+               math_solver.geometry_calculator.calculate_area],
+        verbose=True
+    )
+
+def __getattr__(name):
+    # "math_agent" used to be built at import time; keep the name working without the import cost
+    if name == "math_agent":
+        return build_crew_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,103 +1,160 @@
-from crewai import Agent
-from transformers import pipeline
-from tools.physic_tools.kinematics_calculator import KinematicsCalculator
-from tools.physic_tools.energy_calculator import EnergyCalculator
-from tools.physic_tools.circuit_calculator import CircuitCalculator
-from db.database import get_query_history
-from rag import setup_rag, retrieve_context
-import os
-from dotenv import load_dotenv
+from functools import lru_cache
+from tools.registry import tool_registry
+from agents.request_context import RequestContext
+from answer_cache import cached_lookup, cached_store
+from generation import get_generation_engine
+from prompt_builder import PromptBuilder
+from agents.intent_router import intent_router
+from typing import Iterator, Optional
 import re
-import google.generativeai as genai
 
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-1.5-flash")
-vector_store = setup_rag()
+# The calculators parse their own parameters, so these intents only need keywords
+intent_router.register("physics", "kinematics", keywords=["velocity", "acceleration", "displacement"])
+intent_router.register("physics", "energy", keywords=["kinetic", "potential", "energy"])
+intent_router.register("physics", "circuit", keywords=["current", "voltage", "resistance"])
+
+PROMPT = PromptBuilder(
+    "physics",
+    "You are a physics expert. "
+    "For calculations, solve step-by-step and provide the final answer. "
+    "For theoretical questions, explain clearly with examples if applicable. "
+    "Keep the response concise and accurate."
+)
 
 class PhysicsAgent:
     def __init__(self):
-        self.kinematics_calculator = KinematicsCalculator()
-        self.energy_calculator = EnergyCalculator()
-        self.circuit_calculator = CircuitCalculator()
+        self.kinematics_calculator = tool_registry.get("kinematics_calculator")
+        self.energy_calculator = tool_registry.get("energy_calculator")
+        self.circuit_calculator = tool_registry.get("circuit_calculator")
 
-    def solve_physics_query(self, query: str, user_id: str = "default") -> dict:
+    def solve_physics_query(self, query: str, user_id: str = "default", request_context: RequestContext = None) -> dict:
         """Route physics query to appropriate tool or model"""
-        query_lower = query.lower().replace(" ", "")
-        history = get_query_history(user_id, limit=3)
-        context = "Recent queries: " + "; ".join([f"{h['query']} ({h['subject']})" for h in history])
-        rag_context = retrieve_context(query, vector_store)
-
-        # Check for kinematics queries
-        if any(keyword in query_lower for keyword in ["velocity", "acceleration", "displacement"]):
-            kinematics_result = self.kinematics_calculator.calculate_kinematics(query)
-            if kinematics_result["success"]:
-                return {
-                    "agent": "physics",
-                    "tool_used": "kinematics_calculator",
-                    "query": query,
-                    "answer": f"Result: {kinematics_result['result']}\nSteps:\n" + "\n".join(kinematics_result["steps"]),
-                    "details": kinematics_result,
-                    "confidence": 0.90
-                }
-
-        # Check for energy queries
-        if any(keyword in query_lower for keyword in ["kinetic", "potential", "energy"]):
-            energy_result = self.energy_calculator.calculate_energy(query)
-            if energy_result["success"]:
-                return {
-                    "agent": "physics",
-                    "tool_used": "energy_calculator",
-                    "query": query,
-                    "answer": f"Result: {energy_result['result']} J\nSteps:\n" + "\n".join(energy_result["steps"]),
-                    "details": energy_result,
-                    "confidence": 0.90
-                }
-
-        # Check for circuit queries
-        if any(keyword in query_lower for keyword in ["current", "voltage", "resistance"]):
-            circuit_result = self.circuit_calculator.calculate_circuit(query)
-            if circuit_result["success"]:
-                return {
-                    "agent": "physics",
-                    "tool_used": "circuit_calculator",
-                    "query": query,
-                    "answer": f"Result: {circuit_result['result']} A\nSteps:\n" + "\n".join(circuit_result["steps"]),
-                    "details": circuit_result,
-                    "confidence": 0.90
-                }
+        result = self._solve_with_tools(query)
+        if result is not None:
+            return result
 
         # Fallback to language model
-        return self._use_language_model(query, context, rag_context)
+        cached = cached_lookup(query, "physics")
+        if cached is not None:
+            return cached
+
+        request_context = request_context or RequestContext(query, user_id)
+        request_context.prefetch()
+        result = self._use_language_model(query, request_context)
+        cached_store(query, "physics", result)
+        return result
+
+    def stream_physics_query(self, query: str, user_id: str = "default", request_context: RequestContext = None) -> Iterator[str]:
+        """Yield the answer in chunks, streaming tokens when the language model is needed"""
+        result = self._solve_with_tools(query)
+        if result is not None:
+            yield result["answer"]
+            return
+
+        cached = cached_lookup(query, "physics")
+        if cached is not None:
+            yield cached["answer"]
+            return
+
+        request_context = request_context or RequestContext(query, user_id)
+        request_context.prefetch()
+        chunks = []
+        for chunk in self._stream_language_model(query, request_context):
+            chunks.append(chunk)
+            yield chunk
+        cached_store(query, "physics", self._language_model_result(query, "".join(chunks)))
+
+    def _solve_with_tools(self, query: str) -> Optional[dict]:
+        """Answer with the best-matching tool, otherwise return None"""
+        handlers = {
+            "kinematics": self._calculate_kinematics,
+            "energy": self._calculate_energy,
+            "circuit": self._calculate_circuit
+        }
+        for match in intent_router.route(query, "physics"):
+            result = handlers[match.name](query, **match.args)
+            if result is not None:
+                return result
+        return None
+
+    def _calculate_kinematics(self, query: str) -> Optional[dict]:
+        kinematics_result = self.kinematics_calculator.calculate_kinematics(query)
+        if not kinematics_result["success"]:
+            return None
+        return {
+            "agent": "physics",
+            "tool_used": "kinematics_calculator",
+            "query": query,
+            "answer": f"Result: {kinematics_result['result']}\nSteps:\n" + "\n".join(kinematics_result["steps"]),
+            "details": kinematics_result,
+            "confidence": 0.90
+        }
+
+    def _calculate_energy(self, query: str) -> Optional[dict]:
+        energy_result = self.energy_calculator.calculate_energy(query)
+        if not energy_result["success"]:
+            return None
+        return {
+            "agent": "physics",
+            "tool_used": "energy_calculator",
+            "query": query,
+            "answer": f"Result: {energy_result['result']} J\nSteps:\n" + "\n".join(energy_result["steps"]),
+            "details": energy_result,
+            "confidence": 0.90
+        }
 
-    def _use_language_model(self, query: str, context: str, rag_context: str) -> dict:
+    def _calculate_circuit(self, query: str) -> Optional[dict]:
+        circuit_result = self.circuit_calculator.calculate_circuit(query)
+        if not circuit_result["success"]:
+            return None
+        return {
+            "agent": "physics",
+            "tool_used": "circuit_calculator",
+            "query": query,
+            "answer": f"Result: {circuit_result['result']} A\nSteps:\n" + "\n".join(circuit_result["steps"]),
+            "details": circuit_result,
+            "confidence": 0.90
+        }
+
+    def _use_language_model(self, query: str, request_context: RequestContext) -> dict:
         """Use language model for physics explanations"""
-        prompt = (
-            f"You are a physics expert. Given the context: {context}\n"
-            f"Relevant knowledge: {rag_context}\n"
-            f"Query: {query}\n"
-            f"For calculations, solve step-by-step and provide the final answer. "
-            f"For theoretical questions, explain clearly with examples if applicable. "
-            f"Keep the response concise and accurate."
-        )
-        response = physics_pipeline(prompt, max_length=300, num_return_sequences=1, temperature=0.7)[0]["generated_text"]
+        prompt = PROMPT.build(query, request_context.history, request_context.rag_context)
+        return self._language_model_result(query, get_generation_engine().generate(prompt))
+
+    def _language_model_result(self, query: str, answer: str) -> dict:
         return {
             "agent": "physics",
             "tool_used": "language_model",
             "query": query,
-            "answer": response,
+            "answer": answer,
             "confidence": 0.75
         }
 
-physics_agent = Agent(
-    role="Physics Agent",
-    goal="Answer physics-related questions and perform calculations",
-    backstory="An expert in mechanics, electromagnetism, and thermodynamics",
-    llm=lambda x, **kwargs: PhysicsAgent().solve_physics_query(x, kwargs.get("user_id", "default"))["answer"],
-    tools=[
-        KinematicsCalculator().calculate_kinematics,
-        EnergyCalculator().calculate_energy,
-        CircuitCalculator().calculate_circuit
-    ],
-    verbose=True
-)
\ No newline at end of file
+    def _stream_language_model(self, query: str, request_context: RequestContext) -> Iterator[str]:
+        """Stream an explanation from the local engine as it is generated"""
+        prompt = PROMPT.build(query, request_context.history, request_context.rag_context)
+        yield from get_generation_engine().stream(prompt)
+
+physics_solver = PhysicsAgent()
+
+@lru_cache(maxsize=None)
+def build_crew_agent():
+    """The CrewAI agent used by the /query crew"""
+    from crewai import Agent
+    return Agent(
+        role="Physics Agent",
+        goal="Answer physics-related questions and perform calculations",
+        backstory="An expert in mechanics, electromagnetism, and thermodynamics",
+        llm=lambda x, **kwargs: physics_solver.solve_physics_query(x, kwargs.get("user_id", "default"))["answer"],
+        tools=[
+            physics_solver.kinematics_calculator.calculate_kinematics,
+            physics_solver.energy_calculator.calculate_energy,
+            physics_solver.circuit_calculator.calculate_circuit
+        ],
+        verbose=True
+    )
+
+def __getattr__(name):
+    if name == "physics_agent":
+        return build_crew_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,63 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+import asyncio
+from db.database import get_query_history
+from rag import retrieve_context
+import threading
+
+# Shared by all agents; prefetching is I/O bound so a small pool is plenty
+_prefetch_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="context-prefetch")
+
+class RequestContext:
+    """Query history and RAG context for one request, fetched only on first access"""
+
+    def __init__(self, query: str, user_id: str = "default", history_limit: int = 3):
+        self.query = query
+        self.user_id = user_id
+        self.history_limit = history_limit
+        self._loaders = {
+            "history": lambda: get_query_history(self.user_id, limit=self.history_limit),
+            "rag_context": lambda: retrieve_context(self.query)
+        }
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    @property
+    def history(self) -> list:
+        return self._resolve("history")
+
+    @property
+    def context(self) -> str:
+        return "Recent queries: " + "; ".join([f"{h['query']} ({h['subject']})" for h in self.history])
+
+    @property
+    def rag_context(self) -> str:
+        return self._resolve("rag_context")
+
+    def prefetch(self):
+        """Start every lookup that hasn't run yet in the background"""
+        with self._lock:
+            for name, loader in self._loaders.items():
+                if name not in self._futures:
+                    self._futures[name] = _prefetch_pool.submit(loader)
+
+    async def resolve_async(self) -> tuple:
+        """Prefetch and await (context, rag_context) without blocking the event loop"""
+        self.prefetch()
+        with self._lock:
+            futures = list(self._futures.values())
+        await asyncio.gather(*[asyncio.wrap_future(future) for future in futures])
+        return self.context, self.rag_context
+
+    def _resolve(self, name: str):
+        with self._lock:
+            future = self._futures.get(name)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._futures[name] = future
+        if owner:
+            try:
+                future.set_result(self._loaders[name]())
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
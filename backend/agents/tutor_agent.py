@@ -1,63 +1,114 @@
-from crewai import Agent
-import google.generativeai as genai
-from db.database import get_query_history
-from rag import setup_rag, retrieve_context
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-model = genai.GenerativeModel("gemini-1.5-flash")
-vector_store = setup_rag()
+from functools import lru_cache
+from agents.request_context import RequestContext
+from answer_cache import cached_lookup, cached_store
+from llm import get_gemini_client
+from prompt_builder import PromptBuilder
+from typing import Iterator
+import asyncio
+
+GENERATION_CONFIG = {
+    "max_output_tokens": 300,
+    "temperature": 0.7,
+}
+
+PROMPT = PromptBuilder(
+    "general",
+    "You are a knowledgeable tutor. "
+    "Provide a clear, concise, and accurate response. "
+    "For questions requiring explanation, include examples if applicable. "
+    "If the query is unclear, ask for clarification."
+)
 
 class TutorAgent:
     def __init__(self):
         pass  # No specific tools needed for general queries
 
-    def handle_general_query(self, query: str, user_id: str = "default") -> dict:
+    def handle_general_query(self, query: str, user_id: str = "default", request_context: RequestContext = None) -> dict:
         """Handle general queries using Gemini API"""
-        history = get_query_history(user_id, limit=3)
-        context = "Recent queries: " + "; ".join([f"{h['query']} ({h['subject']})" for h in history])
-        rag_context = retrieve_context(query, vector_store)
-
-        prompt = (
-            f"You are a knowledgeable tutor. Given the context: {context}\n"
-            f"Relevant knowledge: {rag_context}\n"
-            f"Query: {query}\n"
-            f"Provide a clear, concise, and accurate response. "
-            f"For questions requiring explanation, include examples if applicable. "
-            f"If the query is unclear, ask for clarification."
-        )
+        cached = cached_lookup(query, "general")
+        if cached is not None:
+            return cached
+        request_context = request_context or RequestContext(query, user_id)
+        request_context.prefetch()
+        prompt = PROMPT.build(query, request_context.history, request_context.rag_context)
         try:
-            response = model.generate_content(
-                prompt,
-                generation_config={
-                    "max_output_tokens": 300,
-                    "temperature": 0.7,
-                }
-            )
-            answer = response.text
-            return {
-                "agent": "tutor",
-                "tool_used": "language_model",
-                "query": query,
-                "answer": answer,
-                "confidence": 0.75
-            }
+            response = get_gemini_client().generate_content(prompt, generation_config=GENERATION_CONFIG)
+            # .text raises ValueError when the response was blocked
+            result = self._result(query, response.text)
         except Exception as e:
-            return {
-                "agent": "tutor",
-                "tool_used": "language_model",
-                "query": query,
-                "answer": f"Error: {str(e)}",
-                "confidence": 0.0
-            }
-
-tutor_agent = Agent(
-    role="Tutor Agent",
-    goal="Answer general questions and provide educational support",
-    backstory="A versatile educator skilled in various subjects, ready to assist with any query",
-    llm=lambda x, **kwargs: TutorAgent().handle_general_query(x, kwargs.get("user_id", "default"))["answer"],
-    tools=[],
-    verbose=True
-)
+            return self._error(query, e)
+        cached_store(query, "general", result)
+        return result
+
+    def stream_general_query(self, query: str, user_id: str = "default", request_context: RequestContext = None) -> Iterator[str]:
+        """Yield the answer as Gemini produces it"""
+        cached = cached_lookup(query, "general")
+        if cached is not None:
+            yield cached["answer"]
+            return
+        request_context = request_context or RequestContext(query, user_id)
+        request_context.prefetch()
+        prompt = PROMPT.build(query, request_context.history, request_context.rag_context)
+        response = get_gemini_client().generate_content(prompt, generation_config=GENERATION_CONFIG, stream=True)
+        chunks = []
+        for chunk in response:
+            if chunk.text:
+                chunks.append(chunk.text)
+                yield chunk.text
+        cached_store(query, "general", self._result(query, "".join(chunks)))
+
+    async def handle_general_query_async(self, query: str, user_id: str = "default", request_context: RequestContext = None) -> dict:
+        """Handle general queries without holding a thread during the Gemini call"""
+        # Embedding the query is CPU-bound, so the cache is consulted off the event loop
+        cached = await asyncio.to_thread(cached_lookup, query, "general")
+        if cached is not None:
+            return cached
+        request_context = request_context or RequestContext(query, user_id)
+        await request_context.resolve_async()
+        prompt = PROMPT.build(query, request_context.history, request_context.rag_context)
+        try:
+            response = await get_gemini_client().generate_content_async(prompt, generation_config=GENERATION_CONFIG)
+            # .text raises ValueError when the response was blocked
+            result = self._result(query, response.text)
+        except Exception as e:
+            return self._error(query, e)
+        await asyncio.to_thread(cached_store, query, "general", result)
+        return result
+
+    def _result(self, query: str, answer: str) -> dict:
+        return {
+            "agent": "tutor",
+            "tool_used": "language_model",
+            "query": query,
+            "answer": answer,
+            "confidence": 0.75
+        }
+
+    def _error(self, query: str, error: Exception) -> dict:
+        return {
+            "agent": "tutor",
+            "tool_used": "language_model",
+            "query": query,
+            "answer": f"Error: {str(error)}",
+            "confidence": 0.0
+        }
+
+tutor_solver = TutorAgent()
+
+@lru_cache(maxsize=None)
+def build_crew_agent():
+    """The CrewAI agent used by the /query crew"""
+    from crewai import Agent
+    return Agent(
+        role="Tutor Agent",
+        goal="Answer general questions and provide educational support",
+        backstory="A versatile educator skilled in various subjects, ready to assist with any query",
+        llm=lambda x, **kwargs: tutor_solver.handle_general_query(x, kwargs.get("user_id", "default"))["answer"],
+        tools=[],
+        verbose=True
+    )
+
+def __getattr__(name):
+    if name == "tutor_agent":
+        return build_crew_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
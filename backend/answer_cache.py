@@ -0,0 +1,167 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from cache import normalize_query
+from metrics import metrics
+from rag import get_retrieval_service
+import numpy as np
+import os
+import re
+import threading
+import time
+
+ENABLED = os.getenv("TUTOR_ANSWER_CACHE", "1") == "1"
+SIMILARITY_THRESHOLD = float(os.getenv("TUTOR_ANSWER_CACHE_THRESHOLD", "0.92"))
+MAX_ENTRIES = int(os.getenv("TUTOR_ANSWER_CACHE_SIZE", "512"))
+TTL = float(os.getenv("TUTOR_ANSWER_CACHE_TTL", "86400"))
+
+_NUMBERS_AND_OPERATORS = re.compile(r"\d+(?:\.\d+)?|[-+*/^=<>%()×÷]")
+
+def query_signature(query: str) -> Tuple[str, ...]:
+    """The numbers and operators of a query, in order; questions must agree on them to share an answer"""
+    return tuple(_NUMBERS_AND_OPERATORS.findall(normalize_query(query)))
+
+class _SubjectIndex:
+    """Fixed-size slots of unit vectors with their cached results, searched by one matrix product"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.vectors = None
+        self.entries: List[Optional[dict]] = [None] * maxsize
+        # Empty slots have already "expired"
+        self.expires_at = np.full(maxsize, -np.inf)
+        self.last_used = np.zeros(maxsize)
+        self.signature_hashes = np.zeros(maxsize, dtype=np.int64)
+
+    def search(self, vector: np.ndarray, signature: Tuple[str, ...], now: float) -> Tuple[Optional[int], float]:
+        """Return (slot, similarity) of the nearest live entry with the same signature, or (None, 0.0)"""
+        if self.vectors is None:
+            return None, 0.0
+        similarities = self.vectors @ vector
+        similarities[(self.expires_at <= now) | (self.signature_hashes != hash(signature))] = -np.inf
+        slot = int(np.argmax(similarities))
+        # The hash only narrows the search; the signature itself must match
+        if similarities[slot] == -np.inf or self.entries[slot]["signature"] != signature:
+            return None, 0.0
+        return slot, float(similarities[slot])
+
+    def free_slot(self, now: float) -> Tuple[int, bool]:
+        """An empty or expired slot, else the least recently used one; True if a live entry is evicted"""
+        expired = np.flatnonzero(self.expires_at <= now)
+        if expired.size:
+            return int(expired[0]), False
+        return int(np.argmin(self.last_used)), True
+
+    def put(self, slot: int, vector: np.ndarray, entry: dict, expires_at: float, now: float):
+        if self.vectors is None:
+            self.vectors = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+        self.vectors[slot] = vector
+        self.entries[slot] = entry
+        self.signature_hashes[slot] = hash(entry["signature"])
+        self.expires_at[slot] = expires_at
+        self.last_used[slot] = now
+
+    def touch(self, slot: int, now: float):
+        self.last_used[slot] = now
+
+    def live(self, now: float) -> int:
+        return int(np.count_nonzero(self.expires_at > now))
+
+class SemanticAnswerCache:
+    """Language-model answers reused for questions that mean the same thing.
+
+    Queries are embedded with the retrieval service's model and matched by cosine similarity
+    against earlier questions of the same subject. A match at or above the threshold returns
+    the earlier result, but only when both questions have the same numbers and operators:
+    "2x + 3 = 7" and "2x + 4 = 7" embed almost identically and have different answers.
+    Each subject keeps at most max_entries answers (least recently used are evicted),
+    entries expire after ttl seconds, and everything is dropped when a reload
+    (POST /knowledge/reload) changes the knowledge base the answers were grounded in.
+    """
+
+    def __init__(self, embed: Callable[[str], list] = None, threshold: float = SIMILARITY_THRESHOLD,
+                 max_entries: int = MAX_ENTRIES, ttl: float = TTL):
+        self._embed = embed
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._indexes: Dict[str, _SubjectIndex] = {}
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0, "errors": 0}
+
+    def _vector(self, query: str) -> np.ndarray:
+        embed = self._embed or get_retrieval_service().embed_query
+        vector = np.asarray(embed(normalize_query(query)), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def lookup(self, query: str, subject: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached result for a similar question, marked cached, or None"""
+        try:
+            vector = self._vector(query)
+        except Exception as e:
+            self._count("errors")
+            print(f"Answer cache lookup skipped: {e}")
+            return None
+        now = time.monotonic()
+        with self._lock:
+            index = self._indexes.get(subject)
+            slot, similarity = index.search(vector, query_signature(query), now) if index else (None, 0.0)
+            if slot is None or similarity < self.threshold:
+                self._counters["misses"] += 1
+                return None
+            index.touch(slot, now)
+            self._counters["hits"] += 1
+            result = dict(index.entries[slot]["result"])
+        result.update({"query": query, "cached": True, "cache_similarity": round(similarity, 4)})
+        return result
+
+    def store(self, query: str, subject: str, result: Dict[str, Any]):
+        """Remember a result; a near-identical earlier question is replaced rather than duplicated"""
+        try:
+            vector = self._vector(query)
+        except Exception as e:
+            self._count("errors")
+            print(f"Answer cache store skipped: {e}")
+            return
+        now = time.monotonic()
+        entry = {"query": query, "signature": query_signature(query), "result": dict(result)}
+        with self._lock:
+            index = self._indexes.setdefault(subject, _SubjectIndex(self.max_entries))
+            slot, similarity = index.search(vector, entry["signature"], now)
+            if slot is None or similarity < self.threshold:
+                slot, evicted = index.free_slot(now)
+                self._counters["evictions"] += evicted
+            index.put(slot, vector, entry, now + self.ttl, now)
+            self._counters["stores"] += 1
+
+    def invalidate(self):
+        """Drop every cached answer, e.g. because the knowledge base changed"""
+        with self._lock:
+            self._indexes.clear()
+            self._counters["invalidations"] += 1
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counters[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            now = time.monotonic()
+            sizes = {subject: index.live(now) for subject, index in self._indexes.items()}
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+            "threshold": self.threshold,
+            "size": sizes
+        }
+
+answer_cache = SemanticAnswerCache()
+get_retrieval_service().add_change_listener(answer_cache.invalidate)
+metrics.register("answer_cache", answer_cache.stats)
+
+def cached_lookup(query: str, subject: str) -> Optional[Dict[str, Any]]:
+    return answer_cache.lookup(query, subject) if ENABLED else None
+
+def cached_store(query: str, subject: str, result: Dict[str, Any]):
+    if ENABLED:
+        answer_cache.store(query, subject, result)
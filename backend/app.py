@@ -1,42 +1,61 @@
-from flask import Flask, request, jsonify
-from agents.math_agent import math_agent
-from agents.chemistry_agent import chemistry_agent
-from agents.physics_agent import physics_agent
-from agents.evaluation_agent import evaluation_agent
-from agents.tutor_agent import tutor_agent
-from crewai import Crew, Task
-from db.database import init_db, save_query
-import google.generativeai as genai
+from flask import Flask, Response, request, jsonify, stream_with_context
+from agents import math_agent, chemistry_agent, physics_agent, evaluation_agent, tutor_agent
+from agents.math_agent import math_solver
+from agents.chemistry_agent import chemistry_solver
+from agents.physics_agent import physics_solver
+from agents.evaluation_agent import evaluation_solver
+from agents.tutor_agent import tutor_solver
+from db.database import WRITE_BEHIND, enable_write_behind, init_db, save_queries, save_query
+from cache import normalize_query
+from classifier import classify_query, classify_queries, subject_classifier
+from concurrent.futures import ThreadPoolExecutor
+from generation import get_generation_engine
+from llm import get_gemini_client
+from metrics import metrics
+from prompt_builder import prompt_tokenizer
+from rag import get_retrieval_service
+from readiness import WARMUP, readiness
+from single_flight import get_single_flight
+from tools.general_tools.answer_equivalence import canonical_form
+from tools.registry import tool_registry
+import json
 import os
-from dotenv import load_dotenv
 
-load_dotenv()
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-classifier_model = genai.GenerativeModel("gemini-1.5-flash")
+BATCH_MAX_ITEMS = int(os.getenv("TUTOR_BATCH_MAX_ITEMS", "200"))
+BATCH_WORKERS = int(os.getenv("TUTOR_BATCH_WORKERS", "16"))
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix="batch")
+
+# CrewAI agents for /query, built (and crewai imported) on first use
+CREW_AGENTS = {
+    "math": math_agent.build_crew_agent,
+    "chemistry": chemistry_agent.build_crew_agent,
+    "physics": physics_agent.build_crew_agent,
+    "evaluation": evaluation_agent.build_crew_agent,
+    "general": tutor_agent.build_crew_agent
+}
+
+# Identical queries arriving together (a whole class asking the projected problem)
+# share one classification and one answer; each request is still logged for its user
+classification_flight = get_single_flight("classification")
+query_flight = get_single_flight("query")
+answer_flight = get_single_flight("answer")
 
 app = Flask(__name__)
 init_db()
+if WRITE_BEHIND:
+    enable_write_behind()
 
-def classify_query(query: str) -> str:
-    """Classify query into subject using Gemini API"""
-    prompt = (
-        f"Classify the following query into one of these categories: math, chemistry, physics, evaluation, or general.\n"
-        f"Query: {query}\n"
-        f"Return only the category name (e.g., 'math', 'chemistry', 'physics', 'evaluation', 'general')."
-    )
-    try:
-        response = classifier_model.generate_content(
-            prompt,
-            generation_config={
-                "max_output_tokens": 50,
-                "temperature": 0.3,
-            }
-        )
-        category = response.text.strip().lower()
-        return category if category in ["math", "chemistry", "physics", "evaluation", "general"] else "general"
-    except Exception as e:
-        print(f"Classification error: {e}")
-        return "general"
+metrics.register("readiness", readiness.snapshot)
+metrics.register("tools", tool_registry.stats)
+if WARMUP:
+    readiness.add("retrieval", lambda: get_retrieval_service().vector_store)
+    readiness.add("classifier", lambda: subject_classifier.classify("warm up"))
+    readiness.add("symbolic_math", lambda: canonical_form("x + 1"))
+    readiness.add("language_model", lambda: get_gemini_client().load())
+    readiness.add("local_model", lambda: get_generation_engine().load())
+    readiness.add("tokenizer", lambda: prompt_tokenizer.count("warm up"))
+    readiness.add("crew", lambda: [build() for build in CREW_AGENTS.values()])
+    readiness.start()
 
 @app.route("/query", methods=["POST"])
 def handle_query():
@@ -49,30 +68,99 @@ def handle_query():
         return jsonify({"error": "Query is required"}), 400
     
     # Classify query
-    subject = classify_query(query)
+    query_key = normalize_query(query)
+    subject, _ = classification_flight.do(query_key, lambda: classify_query(query))
     
     # Save query to database
     save_query(user_id, query, subject)
     
     # Route to appropriate agent
-    agent_map = {
-        "math": math_agent,
-        "chemistry": chemistry_agent,
-        "physics": physics_agent,
-        "evaluation": evaluation_agent,
-        "general": tutor_agent
-    }
-    agent = agent_map.get(subject, tutor_agent)
+    agent = CREW_AGENTS.get(subject, CREW_AGENTS["general"])()
     
     # Create task and execute
-    task = Task(description=query, agent=agent, context={"user_id": user_id})
-    crew = Crew(agents=[agent], tasks=[task])
+    def kickoff():
+        from crewai import Crew, Task
+        task = Task(description=query, agent=agent, context={"user_id": user_id})
+        crew = Crew(agents=[agent], tasks=[task])
+        return crew.kickoff()
+
     try:
-        response = crew.kickoff()
+        response, _ = query_flight.do((query_key, subject), kickoff)
         return jsonify({"response": response, "subject": subject})
     except Exception as e:
         return jsonify({"error": str(e), "subject": subject}), 500
 
+def answer_query(query: str, subject: str, user_id: str) -> str:
+    """Answer one query with the agent that owns the subject, without building a Crew"""
+    if subject == "math":
+        return math_solver.solve_math_query(query, user_id)["answer"]
+    if subject == "chemistry":
+        return chemistry_solver.solve_chemistry_query(query, user_id)["answer"]
+    if subject == "physics":
+        return physics_solver.solve_physics_query(query, user_id)["answer"]
+    return tutor_solver.handle_general_query(query, user_id)["answer"]
+
+def stream_answer(query: str, subject: str, user_id: str):
+    """Yield the answer in chunks from the agent that owns the subject"""
+    if subject == "math":
+        return math_solver.stream_math_query(query, user_id)
+    if subject == "chemistry":
+        return chemistry_solver.stream_chemistry_query(query, user_id)
+    if subject == "physics":
+        return physics_solver.stream_physics_query(query, user_id)
+    return tutor_solver.stream_general_query(query, user_id)
+
+@app.route("/query/stream", methods=["POST"])
+def handle_query_stream():
+    """Stream the subject, then the answer as it is generated, as NDJSON"""
+    data = request.json
+    query = data.get("query")
+    user_id = data.get("user_id", "default")
+
+    if not query:
+        return jsonify({"error": "Query is required"}), 400
+
+    subject, _ = classification_flight.do(normalize_query(query), lambda: classify_query(query))
+    save_query(user_id, query, subject)
+
+    def generate():
+        yield json.dumps({"type": "subject", "subject": subject}) + "\n"
+        try:
+            for text in stream_answer(query, subject, user_id):
+                yield json.dumps({"type": "token", "text": text}) + "\n"
+            yield json.dumps({"type": "done"}) + "\n"
+        except Exception as e:
+            yield json.dumps({"type": "error", "error": str(e)}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+@app.route("/query/batch", methods=["POST"])
+def handle_query_batch():
+    """Answer a list of queries, classified together and dispatched in parallel"""
+    data = request.json
+    queries = data.get("queries")
+    user_id = data.get("user_id", "default")
+
+    if not isinstance(queries, list) or not queries:
+        return jsonify({"error": "A non-empty list of queries is required"}), 400
+    if len(queries) > BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {BATCH_MAX_ITEMS} queries per batch"}), 400
+    if not all(isinstance(q, str) and q.strip() for q in queries):
+        return jsonify({"error": "Every query must be a non-empty string"}), 400
+
+    subjects = classify_queries(queries)
+
+    def run_item(query: str, subject: str) -> dict:
+        try:
+            save_query(user_id, query, subject)
+            response, _ = answer_flight.do((normalize_query(query), subject), lambda: answer_query(query, subject, user_id))
+            return {"query": query, "subject": subject, "response": response}
+        except Exception as e:
+            return {"query": query, "subject": subject, "error": str(e)}
+
+    futures = [batch_executor.submit(run_item, q, s) for q, s in zip(queries, subjects)]
+    return jsonify({"results": [future.result() for future in futures]})
+
 @app.route("/evaluate", methods=["POST"])
 def evaluate_answer():
     """Handle evaluation requests"""
@@ -89,9 +177,11 @@ def evaluate_answer():
     save_query(user_id, query, "evaluation")
     
     # Execute evaluation task
+    from crewai import Crew, Task
+    agent = CREW_AGENTS["evaluation"]()
     task = Task(
         description="Evaluate answer",
-        agent=evaluation_agent,
+        agent=agent,
         context={
             "query": query,
             "student_answer": student_answer,
@@ -99,17 +189,67 @@ def evaluate_answer():
             "user_id": user_id
         }
     )
-    crew = Crew(agents=[evaluation_agent], tasks=[task])
+    crew = Crew(agents=[agent], tasks=[task])
     try:
         response = crew.kickoff()
         return jsonify({"response": response})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/evaluate/batch", methods=["POST"])
+def evaluate_batch():
+    """Grade a whole class's submissions for one question"""
+    data = request.json
+    query = data.get("query")
+    correct_answer = data.get("correct_answer")
+    submissions = data.get("submissions")
+
+    if not query or not correct_answer or not isinstance(submissions, list) or not submissions:
+        return jsonify({"error": "Query, correct_answer, and a non-empty list of submissions are required"}), 400
+    if not all(isinstance(s, dict) and isinstance(s.get("student_answer"), str) for s in submissions):
+        return jsonify({"error": "Every submission needs a student_answer"}), 400
+
+    save_queries([(s.get("user_id", "default"), query, "evaluation") for s in submissions])
+    result = evaluation_solver.evaluate_batch(query, correct_answer, submissions)
+    if not result["success"]:
+        return jsonify({"error": result["error"]}), 500
+    return jsonify({
+        "results": result["results"],
+        "correct_count": result["correct_count"],
+        "elapsed_ms": result["elapsed_ms"],
+        "submissions_per_second": result["submissions_per_second"]
+    })
+
 @app.route("/health", methods=["GET"])
 def health_check():
     """Check backend status"""
     return jsonify({"status": "Backend is running"})
 
+@app.route("/ready", methods=["GET"])
+def ready_check():
+    """Report whether the heavy components are warm; 503 until they are"""
+    snapshot = readiness.snapshot()
+    return jsonify(snapshot), 200 if snapshot["ready"] else 503
+
+@app.route("/knowledge/reload", methods=["POST"])
+def reload_knowledge_base():
+    """Re-index db/knowledge_base.json; cached answers are dropped if its documents changed"""
+    service = get_retrieval_service()
+    try:
+        service.reload()
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"index_version": service.index_version, "fingerprint": service.knowledge_base_fingerprint})
+
+@app.route("/tools/stats", methods=["GET"])
+def get_tool_stats():
+    """Per-tool call counts, error counts and latency, with the busiest and slowest tools"""
+    return jsonify(tool_registry.stats())
+
+@app.route("/metrics", methods=["GET"])
+def get_metrics():
+    """Report cache and service metrics"""
+    return jsonify(metrics.snapshot())
+
 if __name__ == "__main__":
     app.run(debug=True)
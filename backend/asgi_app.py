@@ -0,0 +1,163 @@
+"""Asyncio serving mode with the same /query, /evaluate, /health, /ready and /knowledge/reload contract as app.py.
+
+Run with any ASGI server, e.g.:
+    hypercorn asgi_app:app --bind 0.0.0.0:5000
+"""
+from quart import Quart, request, jsonify
+from agents.math_agent import math_solver
+from agents.chemistry_agent import chemistry_solver
+from agents.physics_agent import physics_solver
+from agents.evaluation_agent import evaluation_solver
+from agents.tutor_agent import tutor_solver
+from agents.request_context import RequestContext
+from concurrent.futures import ThreadPoolExecutor
+from db.database import WRITE_BEHIND, enable_write_behind, init_db, save_query
+from cache import normalize_query
+from classifier import classify_query_async, subject_classifier
+from generation import get_generation_engine
+from llm import get_gemini_client
+from metrics import metrics
+from prompt_builder import prompt_tokenizer
+from rag import get_retrieval_service
+from readiness import WARMUP, readiness
+from single_flight import get_single_flight
+from tools.general_tools.answer_equivalence import canonical_form
+from tools.registry import tool_registry
+import asyncio
+import functools
+import os
+
+# Tool agents and the local model fallbacks are CPU bound; they share a bounded pool
+# while Gemini calls are awaited directly on the event loop
+AGENT_WORKERS = int(os.getenv("TUTOR_ASYNC_AGENT_WORKERS", "16"))
+agent_executor = ThreadPoolExecutor(max_workers=AGENT_WORKERS, thread_name_prefix="agent")
+
+# Concurrent identical queries share one classification and one answer, as in app.py
+classification_flight = get_single_flight("classification")
+answer_flight = get_single_flight("answer")
+
+app = Quart(__name__)
+init_db()
+if WRITE_BEHIND:
+    enable_write_behind()
+
+# Same warm-up as app.py, minus the CrewAI agents this mode doesn't use
+metrics.register("readiness", readiness.snapshot)
+metrics.register("tools", tool_registry.stats)
+if WARMUP:
+    readiness.add("retrieval", lambda: get_retrieval_service().vector_store)
+    readiness.add("classifier", lambda: subject_classifier.classify("warm up"))
+    readiness.add("symbolic_math", lambda: canonical_form("x + 1"))
+    readiness.add("language_model", lambda: get_gemini_client().load())
+    readiness.add("local_model", lambda: get_generation_engine().load())
+    readiness.add("tokenizer", lambda: prompt_tokenizer.count("warm up"))
+    readiness.start()
+
+SOLVERS = {
+    "math": math_solver.solve_math_query,
+    "chemistry": chemistry_solver.solve_chemistry_query,
+    "physics": physics_solver.solve_physics_query
+}
+
+async def run_blocking(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(agent_executor, functools.partial(func, *args, **kwargs))
+
+async def log_query(user_id: str, query: str, subject_task: asyncio.Task):
+    """Write the query row as soon as its subject is known, off the response path"""
+    subject = await subject_task
+    await asyncio.to_thread(save_query, user_id, query, subject)
+
+async def classify(query_key: str, query: str) -> str:
+    subject, _ = await classification_flight.do_async(query_key, lambda: classify_query_async(query))
+    return subject
+
+async def answer(query: str, subject: str, user_id: str) -> str:
+    request_context = RequestContext(query, user_id)
+    # History and RAG lookups overlap with agent dispatch instead of following it
+    request_context.prefetch()
+    if subject in SOLVERS:
+        result = await run_blocking(SOLVERS[subject], query, user_id, request_context=request_context)
+    else:
+        # "evaluation" without answers to compare is handled like a general question
+        result = await tutor_solver.handle_general_query_async(query, user_id, request_context=request_context)
+    return result["answer"]
+
+@app.route("/query", methods=["POST"])
+async def handle_query():
+    """Handle user queries and route to appropriate agent"""
+    data = await request.get_json()
+    query = data.get("query")
+    user_id = data.get("user_id", "default")
+
+    if not query:
+        return jsonify({"error": "Query is required"}), 400
+
+    query_key = normalize_query(query)
+    subject_task = asyncio.create_task(classify(query_key, query))
+    log_task = asyncio.create_task(log_query(user_id, query, subject_task))
+    subject = await subject_task
+    try:
+        response, _ = await answer_flight.do_async((query_key, subject), lambda: answer(query, subject, user_id))
+        return jsonify({"response": response, "subject": subject})
+    except Exception as e:
+        return jsonify({"error": str(e), "subject": subject}), 500
+    finally:
+        await log_task
+
+@app.route("/evaluate", methods=["POST"])
+async def evaluate_answer():
+    """Handle evaluation requests"""
+    data = await request.get_json()
+    query = data.get("query")
+    student_answer = data.get("student_answer")
+    correct_answer = data.get("correct_answer")
+    user_id = data.get("user_id", "default")
+
+    if not all([query, student_answer, correct_answer]):
+        return jsonify({"error": "Query, student_answer, and correct_answer are required"}), 400
+
+    log_task = asyncio.create_task(asyncio.to_thread(save_query, user_id, query, "evaluation"))
+    try:
+        result = await run_blocking(evaluation_solver.evaluate_answer, query, student_answer, correct_answer, user_id)
+        if not result["success"]:
+            return jsonify({"error": result["error"]}), 500
+        return jsonify({"response": result["feedback"]})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        await log_task
+
+@app.route("/health", methods=["GET"])
+async def health_check():
+    """Check backend status"""
+    return jsonify({"status": "Backend is running"})
+
+@app.route("/ready", methods=["GET"])
+async def ready_check():
+    """Report whether the heavy components are warm; 503 until they are"""
+    snapshot = readiness.snapshot()
+    return jsonify(snapshot), 200 if snapshot["ready"] else 503
+
+@app.route("/knowledge/reload", methods=["POST"])
+async def reload_knowledge_base():
+    """Re-index db/knowledge_base.json; cached answers are dropped if its documents changed"""
+    service = get_retrieval_service()
+    try:
+        await run_blocking(service.reload)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    return jsonify({"index_version": service.index_version, "fingerprint": service.knowledge_base_fingerprint})
+
+@app.route("/tools/stats", methods=["GET"])
+async def get_tool_stats():
+    """Per-tool call counts, error counts and latency, with the busiest and slowest tools"""
+    return jsonify(tool_registry.stats())
+
+@app.route("/metrics", methods=["GET"])
+async def get_metrics():
+    """Report cache and service metrics"""
+    return jsonify(metrics.snapshot())
+
+if __name__ == "__main__":
+    app.run()
@@ -0,0 +1,65 @@
+"""Measure per-tier latency of the answer-equivalence engine on a corpus of answer pairs.
+
+The corpus is a JSON list of {"student", "correct", "expected"} objects; pass --corpus to use
+pairs exported from real submissions.
+
+Run from the backend directory:
+    python benchmarks/bench_answer_equivalence.py --repeat 50
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from difflib import SequenceMatcher
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tools.general_tools.answer_equivalence import AnswerEquivalenceEngine, canonical_form
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "data", "answer_pairs.json")
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+def run(corpus_path: str, repeat: int):
+    with open(corpus_path, "r") as f:
+        pairs = json.load(f)
+
+    engine = AnswerEquivalenceEngine()
+    canonical_form.cache_clear()
+    latencies = {}
+    correct = 0
+    cold_ms = []
+    for i in range(repeat):
+        for pair in pairs:
+            start = time.perf_counter()
+            result = engine.compare(pair["student"], pair["correct"])
+            elapsed = (time.perf_counter() - start) * 1000
+            if i == 0:
+                cold_ms.append(elapsed)
+                correct += result["is_correct"] == pair["expected"]
+            else:
+                latencies.setdefault(result["tier"], []).append(elapsed)
+
+    legacy_ms = []
+    for pair in pairs:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            SequenceMatcher(None, pair["student"].lower(), pair["correct"].lower()).ratio()
+        legacy_ms.append((time.perf_counter() - start) * 1000 / repeat)
+
+    print(f"Pairs: {len(pairs)}, agreement with expected labels: {correct / len(pairs):.1%}")
+    print(f"First pass (cold canonical cache) mean: {sum(cold_ms) / len(cold_ms):.3f} ms")
+    print(f"{'tier':>10} {'count':>7} {'p50 ms':>9} {'p95 ms':>9}")
+    for tier, values in latencies.items():
+        print(f"{tier:>10} {len(values):>7} {percentile(values, 50):>9.4f} {percentile(values, 95):>9.4f}")
+    print(f"Legacy SequenceMatcher mean: {sum(legacy_ms) / len(legacy_ms):.4f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    run(args.corpus, max(2, args.repeat))
@@ -0,0 +1,78 @@
+"""Report local classifier accuracy and latency against hand-labelled queries.
+
+By default the labels come from data/subject_queries.json, which is kept apart from the
+classifier's seed examples. Rows from the queries table can be used instead, but only those
+saved before the local classifier was deployed (--before): later rows carry the subject the
+local classifier itself chose whenever it was confident, so they would grade it against itself.
+
+Run from the backend directory:
+    python benchmarks/bench_classifier.py
+    python benchmarks/bench_classifier.py --db tutor.db --before "2026-01-01 00:00:00" --limit 500
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from classifier import CONFIDENCE_THRESHOLD, subject_classifier
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "subject_queries.json")
+
+def load_labelled(limit: int) -> list:
+    with open(DATA_PATH) as f:
+        return [(row["query"], row["subject"]) for row in json.load(f)][:limit]
+
+def load_history(db_path: str, before: str, limit: int) -> list:
+    """Queries saved before the local classifier existed, labelled by the Gemini classifier"""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT query, subject FROM queries WHERE timestamp < ? ORDER BY RANDOM() LIMIT ?", (before, limit)
+    )
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+def run(sample: list, threshold: float):
+    if not sample:
+        print("No labelled queries found")
+        return
+
+    subject_classifier.classify("warm up")
+    correct = confident = confident_correct = 0
+    latencies = []
+    for query, label in sample:
+        start = time.perf_counter()
+        subject, confidence = subject_classifier.classify(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        correct += subject == label
+        if confidence >= threshold:
+            confident += 1
+            confident_correct += subject == label
+
+    print(f"Sample size:            {len(sample)}")
+    print(f"Overall accuracy:       {correct / len(sample):.1%}")
+    print(f"Fast-path coverage:     {confident / len(sample):.1%} (confidence >= {threshold})")
+    if confident:
+        print(f"Fast-path accuracy:     {confident_correct / confident:.1%}")
+    print(f"Latency p50 / p95 (ms): {percentile(latencies, 50):.2f} / {percentile(latencies, 95):.2f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", help="grade against rows of this database instead of the labelled set")
+    parser.add_argument("--before", help="with --db, only rows saved before this timestamp")
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--threshold", type=float, default=CONFIDENCE_THRESHOLD)
+    args = parser.parse_args()
+    if args.db and not args.before:
+        parser.error("--db needs --before: rows saved since the local classifier was deployed are labelled by it")
+    sample = load_history(args.db, args.before, args.limit) if args.db else load_labelled(args.limit)
+    run(sample, args.threshold)
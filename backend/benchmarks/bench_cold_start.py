@@ -0,0 +1,95 @@
+"""Measure cold start: import time per module and time to first response.
+
+Each measurement runs in a fresh interpreter so nothing is already imported.
+
+Run from the backend directory:
+    python benchmarks/bench_cold_start.py --top 20 --ready-timeout 120
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+HEAVY_MODULES = ["crewai", "transformers", "torch", "sympy", "scipy", "google.generativeai", "langchain_community", "faiss"]
+
+FIRST_RESPONSE_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+status = client.get("/health").status_code
+first_response = time.perf_counter()
+ready_at, snapshot = None, None
+while time.perf_counter() - start < {timeout}:
+    response = client.get("/ready")
+    snapshot = response.get_json()
+    if response.status_code == 200:
+        ready_at = time.perf_counter()
+        break
+    time.sleep(0.05)
+print(json.dumps({{
+    "import_ms": (imported - start) * 1000,
+    "first_response_ms": (first_response - start) * 1000,
+    "health_status": status,
+    "ready_ms": (ready_at - start) * 1000 if ready_at else None,
+    "readiness": snapshot
+}}))
+"""
+
+def import_times(warmup: bool) -> dict:
+    """Cumulative import time in ms per module, from python -X importtime"""
+    env = dict(os.environ, TUTOR_WARMUP="1" if warmup else "0")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app"],
+                            cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative) / 1000
+    if "app" not in times:
+        print(result.stderr[-2000:])
+        raise SystemExit("Importing app failed")
+    return times
+
+def first_response(timeout: float) -> dict:
+    result = subprocess.run([sys.executable, "-c", FIRST_RESPONSE_SCRIPT.format(timeout=timeout)],
+                            cwd=BACKEND_DIR, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        raise SystemExit("First-response run failed")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run(top: int, ready_timeout: float):
+    times = import_times(warmup=False)
+    print(f"Import of app (no warm-up): {times['app']:.1f} ms\n")
+    print(f"{'module':50} {'cumulative ms':>14}")
+    # Only first-level packages and the app's own modules, so nested entries don't repeat
+    own = {"app", "classifier", "rag", "cache", "metrics", "llm", "readiness"}
+    rows = [(name, ms) for name, ms in times.items() if "." not in name or name.split(".")[0] in {"agents", "tools", "db"} or name in own]
+    for name, ms in sorted(rows, key=lambda row: row[1], reverse=True)[:top]:
+        print(f"{name:50} {ms:14.1f}")
+
+    loaded = [name for name in HEAVY_MODULES if name in times]
+    print(f"\nHeavy modules imported at start-up: {', '.join(loaded) if loaded else 'none'}")
+
+    result = first_response(ready_timeout)
+    print(f"\nTime to import app:        {result['import_ms']:.1f} ms")
+    print(f"Time to first response:    {result['first_response_ms']:.1f} ms (/health -> {result['health_status']})")
+    if result["ready_ms"] is not None:
+        print(f"Time until /ready is 200:  {result['ready_ms']:.1f} ms")
+    else:
+        print(f"/ready not 200 after {ready_timeout:.0f} s")
+    for name, state in (result["readiness"] or {}).get("components", {}).items():
+        print(f"  {name:16} {state['status']:8} {state.get('elapsed_ms', 0):10.1f} ms  {state.get('error', '')}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--ready-timeout", type=float, default=120)
+    args = parser.parse_args()
+    run(args.top, args.ready_timeout)
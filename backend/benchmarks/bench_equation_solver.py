@@ -0,0 +1,57 @@
+"""Compare the closed-form linear path with SymPy, and time n×n linear systems.
+
+Run from the backend directory:
+    python benchmarks/bench_equation_solver.py --repeat 200 --sizes 10 100 1000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import sympy as sp
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tools.math_tools.equation_solver import EquationSolver
+
+EQUATIONS = ["2*x + 4 = 10", "3*y - 7 = 2", "x/3 + 1 = 2", "5*t + 2 = 3*t - 8", "0.5*z - 1.25 = 4"]
+
+def sympy_solve(equation: str):
+    """The solver as it was: sympify both sides and run the general sp.solve"""
+    left, right = equation.replace(" ", "").split("=")
+    left_expr, right_expr = sp.sympify(left), sp.sympify(right)
+    symbol = sorted((left_expr - right_expr).free_symbols, key=str)[0]
+    return sp.solve(sp.Eq(left_expr, right_expr), symbol)
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def run(repeat: int, sizes: list):
+    solver = EquationSolver()
+    print(f"{'equation':22} {'sympy us':>10} {'linear us':>10} {'speedup':>8}")
+    for equation in EQUATIONS:
+        baseline = timed(lambda: sympy_solve(equation), max(1, repeat // 10))
+        fast = timed(lambda: solver.solve_linear_equation(equation), repeat)
+        print(f"{equation:22} {baseline:10.1f} {fast:10.1f} {baseline / fast:7.0f}x")
+
+    print(f"\n{'n':>6} {'method':42} {'ms':>8} {'residual':>10}")
+    rng = np.random.default_rng(0)
+    for n in sizes:
+        # Diagonally dominant tridiagonal system, the shape that finite-difference problems produce
+        matrix = np.eye(n) * 4 + np.eye(n, k=1) + np.eye(n, k=-1)
+        constants = rng.standard_normal(n)
+        start = time.perf_counter()
+        result = solver.solve_matrix_system(matrix, constants)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{n:6} {result['method']:42} {elapsed:8.2f} {result['residual']:10.2e}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    args = parser.parse_args()
+    run(args.repeat, args.sizes)
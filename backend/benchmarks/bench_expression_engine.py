@@ -0,0 +1,70 @@
+"""Compare the compiled expression engine with the previous clean-replace-eval calculator path.
+
+Run from the backend directory:
+    python benchmarks/bench_expression_engine.py --repeat 20000 --points 10000
+"""
+import argparse
+import math
+import os
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from tools.math_tools.calculator import BasicCalculator
+from tools.math_tools.expression_engine import evaluate, evaluate_vectorised
+
+EXPRESSIONS = ["15 + 23", "2^10 - 3*7", "sqrt(16) + 3×2", "sin(pi/4)^2 + cos(pi/4)^2", "(1.5 + 2.25) / 0.75"]
+LEGACY_NAMESPACE = {
+    "sin": math.sin, "cos": math.cos, "tan": math.tan,
+    "log": math.log, "log10": math.log10, "sqrt": math.sqrt,
+    "pi": math.pi, "e": math.e, "abs": abs, "pow": pow,
+    "floor": math.floor, "ceil": math.ceil, "round": round
+}
+
+def legacy_evaluate(expression: str, x=None):
+    """The calculator as it was: regex cleanup, string replacement and eval on every call"""
+    expr = expression.replace(" ", "").replace("×", "*").replace("÷", "/").replace("^", "**")
+    expr = re.sub(r'(\d)([a-zA-Z])', r'\1*\2', expr)
+    expr = re.sub(r'([a-zA-Z])(\d)', r'\1*\2', expr)
+    for old, new in {'ln': 'log', 'lg': 'log10', 'arcsin': 'asin', 'arccos': 'acos', 'arctan': 'atan'}.items():
+        expr = expr.replace(old, new)
+    namespace = dict(LEGACY_NAMESPACE, x=x)
+    return eval(expr, {"__builtins__": {}}, namespace)
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def run(repeat: int, points: int):
+    calculator = BasicCalculator()
+    print(f"{'expression':30} {'legacy us':>10} {'engine us':>10} {'speedup':>8}")
+    for expression in EXPRESSIONS:
+        assert math.isclose(legacy_evaluate(expression), calculator.evaluate_expression(expression)["result"])
+        legacy = timed(lambda: legacy_evaluate(expression), repeat)
+        engine = timed(lambda: evaluate(expression), repeat)
+        print(f"{expression:30} {legacy:10.2f} {engine:10.2f} {legacy / engine:7.1f}x")
+
+    expression = "3*x^2 - 2*x + sin(x)"
+    xs = np.linspace(-10, 10, points)
+    start = time.perf_counter()
+    looped = [legacy_evaluate(expression, x=float(x)) for x in xs]
+    legacy = time.perf_counter() - start
+    start = time.perf_counter()
+    vectorised = evaluate_vectorised(expression, xs)
+    engine = time.perf_counter() - start
+    np.testing.assert_allclose(vectorised, looped)
+    print(f"\n{points} points of {expression}: legacy loop {legacy * 1000:.1f} ms, "
+          f"vectorised {engine * 1000:.2f} ms ({legacy / engine:.0f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=20000)
+    parser.add_argument("--points", type=int, default=10000)
+    args = parser.parse_args()
+    run(args.repeat, args.points)
@@ -0,0 +1,73 @@
+"""Load-test the shared Gemini client against the local stub backend, fully offline.
+
+Compares calling the backend directly (no limiter, no retries) with going through
+GeminiClient, under the same burst, stub latency and injected error rate.
+
+Run from the backend directory:
+    python benchmarks/bench_gemini_client.py --requests 200 --concurrency 32 --error-rate 0.2
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from llm import CircuitBreaker, GeminiClient, StubBackend
+
+def run_load(call, requests: int, concurrency: int) -> dict:
+    latencies = []
+    failures = 0
+
+    def one(i: int):
+        nonlocal failures
+        start = time.perf_counter()
+        try:
+            call(f"Query: question {i}")
+        except Exception:
+            failures += 1
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "wall_s": wall,
+        "success_rate": 1 - failures / requests,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000
+    }
+
+def run(requests: int, concurrency: int, latency_ms: float, error_rate: float, rpm: float, max_concurrency: int):
+    direct = StubBackend(latency_ms=latency_ms, error_rate=error_rate, seed=0)
+    client = GeminiClient(
+        backend=StubBackend(latency_ms=latency_ms, error_rate=error_rate, seed=0),
+        requests_per_minute=rpm, burst=max_concurrency, max_concurrency=max_concurrency,
+        timeout=30, max_retries=3, backoff_base=0.05, backoff_max=1.0,
+        breaker=CircuitBreaker(threshold=20, cooldown=1.0)
+    )
+    rows = [
+        ("direct", run_load(lambda prompt: direct.generate(prompt, None, 30), requests, concurrency)),
+        ("client", run_load(client.generate_content, requests, concurrency))
+    ]
+
+    print(f"{requests} requests, concurrency {concurrency}, stub latency {latency_ms:.0f} ms, "
+          f"error rate {error_rate:.0%}, limit {rpm:.0f} rpm / {max_concurrency} in flight\n")
+    print(f"{'mode':8} {'wall s':>8} {'success':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for label, row in rows:
+        print(f"{label:8} {row['wall_s']:8.2f} {row['success_rate']:8.1%} {row['p50_ms']:8.0f} {row['p95_ms']:8.0f}")
+    print(f"\nclient stats: {client.stats()}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--rpm", type=float, default=6000)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    args = parser.parse_args()
+    run(args.requests, args.concurrency, args.latency_ms, args.error_rate, args.rpm, args.max_concurrency)
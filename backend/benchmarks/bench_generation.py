@@ -0,0 +1,78 @@
+"""Compare batched and one-at-a-time local generation under concurrent load.
+
+Loads the configured local model (TUTOR_LOCAL_MODEL, default distilgpt2), so it needs
+transformers and torch.
+
+Run from the backend directory:
+    python benchmarks/bench_generation.py --requests 32 --concurrency 16 --max-new-tokens 64
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from generation import LOCAL_MODEL_NAME, GenerationEngine, TransformersBackend
+
+PROMPTS = [
+    "Explain what a derivative measures in calculus.",
+    "Describe why ionic compounds conduct electricity when dissolved.",
+    "What does Newton's second law say about force and acceleration?",
+    "Explain the difference between mean and median.",
+    "Why does ice float on water?",
+    "What is an exothermic reaction?",
+    "How does a transformer change voltage?",
+    "What is the Pythagorean theorem used for?"
+]
+
+def run_load(engine: GenerationEngine, requests: int, concurrency: int, max_new_tokens: int) -> dict:
+    prompts = [PROMPTS[i % len(PROMPTS)] for i in range(requests)]
+    latencies = []
+
+    def call(prompt: str):
+        start = time.perf_counter()
+        engine.generate(prompt, max_new_tokens=max_new_tokens)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, prompts))
+    wall = time.perf_counter() - start
+    stats = engine.stats()
+    latencies.sort()
+    return {
+        "wall_s": wall,
+        "requests_per_s": requests / wall,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p95_ms": latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000,
+        **stats
+    }
+
+def run(requests: int, concurrency: int, max_new_tokens: int, batch_size: int, max_wait_ms: float):
+    backend = TransformersBackend(LOCAL_MODEL_NAME)
+    backend.load()
+    # Greedy decoding so both runs do the same work
+    backend.generate(["warm up"], [4], 0.0)
+
+    rows = []
+    for label, size in [("one at a time", 1), (f"batched (<= {batch_size})", batch_size)]:
+        engine = GenerationEngine(backend=backend, max_batch_size=size, max_wait_ms=max_wait_ms, temperature=0.0)
+        rows.append((label, run_load(engine, requests, concurrency, max_new_tokens)))
+
+    print(f"Model: {LOCAL_MODEL_NAME}, {requests} requests, concurrency {concurrency}, {max_new_tokens} new tokens\n")
+    print(f"{'mode':22} {'wall s':>8} {'req/s':>7} {'tok/s':>8} {'batch':>6} {'p50 ms':>8} {'p95 ms':>8} {'wait ms':>8}")
+    for label, row in rows:
+        print(f"{label:22} {row['wall_s']:8.2f} {row['requests_per_s']:7.2f} {row['tokens_per_second']:8.1f} "
+              f"{row['avg_batch_size']:6.2f} {row['p50_ms']:8.0f} {row['p95_ms']:8.0f} {row['avg_queue_wait_ms']:8.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=25)
+    args = parser.parse_args()
+    run(args.requests, args.concurrency, args.max_new_tokens, args.batch_size, args.max_wait_ms)
@@ -0,0 +1,93 @@
+"""Report intent-router accuracy and latency on a labelled set of tool queries.
+
+The same queries also go through a baseline: the keyword and regex cascade that each agent
+ran before the router, reproduced here. The cascade tried its branches in a fixed order and
+the router ranks its candidates, so both are graded on the first intent they would try.
+
+Importing the agents registers their intents, so this needs the backend's full dependencies.
+
+Run from the backend directory:
+    python benchmarks/bench_intent_router.py --repeat 1000
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import agents.math_agent  # noqa: F401
+import agents.physics_agent  # noqa: F401
+import agents.chemistry_agent  # noqa: F401
+from agents.intent_router import intent_router
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "data", "tool_queries.json")
+
+def cascade_route(query: str, subject: str):
+    """The first tool branch the agents' old if-chains would have tried for query"""
+    query_lower = query.lower().replace(" ", "")
+    if subject == "math":
+        if any(op in query_lower for op in ["+", "-", "*", "/", "(", ")", "^"]):
+            return "calculator"
+        if "=" in query_lower and any(var in query_lower for var in ["x", "y", "z"]):
+            return "linear_equation"
+        if re.match(r"(\d*)x\^2\s*([+-]?\s*\d*)x\s*([+-]?\s*\d*)\s*=\s*0", query_lower):
+            return "quadratic_equation"
+        if any(keyword in query_lower for keyword in ["mean", "median", "mode", "standarddeviation"]):
+            return "statistics"
+        if "area" in query_lower and any(shape in query_lower for shape in ["circle", "rectangle"]):
+            return "geometry"
+    elif subject == "physics":
+        if any(keyword in query_lower for keyword in ["velocity", "acceleration", "displacement"]):
+            return "kinematics"
+        if any(keyword in query_lower for keyword in ["kinetic", "potential", "energy"]):
+            return "energy"
+        if any(keyword in query_lower for keyword in ["current", "voltage", "resistance"]):
+            return "circuit"
+    elif subject == "chemistry":
+        if "->" in query_lower or "balance" in query_lower:
+            return "equation_balancing"
+        if "molarmass" in query_lower and re.search(r"of\s+([A-Za-z0-9]+)", query_lower):
+            return "molar_mass"
+        if "phof" in query_lower and re.search(r"ph of\s+([a-zA-Z0-9]+)\s+(\d*\.?\d*)\s*m", query_lower):
+            return "ph"
+    return None
+
+def router_route(query: str, subject: str):
+    matches = intent_router.route(query, subject)
+    return matches[0].name if matches else None
+
+def evaluate(name: str, route, sample: list, repeat: int) -> dict:
+    correct = 0
+    for row in sample:
+        predicted = route(row["query"], row["subject"])
+        correct += predicted == row["intent"]
+        if predicted != row["intent"]:
+            print(f"  {name} miss: {row['query']!r} -> {predicted} (expected {row['intent']})")
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for row in sample:
+            route(row["query"], row["subject"])
+    elapsed = time.perf_counter() - start
+    return {"accuracy": correct / len(sample), "mean_us": elapsed / (repeat * len(sample)) * 1e6}
+
+def run(repeat: int):
+    with open(DATA_PATH) as f:
+        sample = json.load(f)
+
+    baseline = evaluate("cascade", cascade_route, sample, repeat)
+    router = evaluate("router", router_route, sample, repeat)
+
+    print(f"Sample size:      {len(sample)}")
+    print(f"{'':18}{'cascade':>10}{'router':>10}")
+    print(f"{'Top-1 accuracy:':18}{baseline['accuracy']:>10.1%}{router['accuracy']:>10.1%}")
+    print(f"{'Mean route (us):':18}{baseline['mean_us']:>10.1f}{router['mean_us']:>10.1f}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+    run(args.repeat)
@@ -0,0 +1,73 @@
+"""Report average prompt size per agent before and after token budgeting.
+
+"Before" is the old layout: the full history string and every retrieved chunk
+concatenated into the prompt. Retrieved chunks are simulated from the knowledge base,
+grown to --chunk-words words each with one duplicate per context, so the script needs
+neither the embedding model nor a database.
+
+Run from the backend directory:
+    python benchmarks/bench_prompt_builder.py --chunk-words 200
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from agents import chemistry_agent, math_agent, physics_agent, tutor_agent
+from prompt_builder import prompt_tokenizer
+from rag import KNOWLEDGE_BASE_PATH
+
+QUERIES = {
+    "math": ["Explain the quadratic formula", "Why does the Pythagorean theorem hold?"],
+    "physics": ["What does Newton's second law mean?", "Explain kinetic energy"],
+    "chemistry": ["What is a covalent bond?", "Explain pH of a strong acid"],
+    "general": ["How should I revise for exams?", "What is the scientific method?"]
+}
+BUILDERS = {
+    "math": math_agent.PROMPT,
+    "physics": physics_agent.PROMPT,
+    "chemistry": chemistry_agent.PROMPT,
+    "general": tutor_agent.PROMPT
+}
+
+def grow(content: str, words: int) -> str:
+    """Pad a knowledge base entry to roughly the given number of words"""
+    padding = content.split()
+    out = []
+    while len(out) < words:
+        out.extend(padding)
+    return " ".join(out[:words])
+
+def run(chunk_words: int, requests: int, k: int = 3):
+    with open(KNOWLEDGE_BASE_PATH) as f:
+        documents = [doc["content"] for doc in json.load(f)]
+    rng = random.Random(0)
+    history = [{"query": q, "subject": s} for s, qs in QUERIES.items() for q in qs][:3]
+    context = "Recent queries: " + "; ".join(f"{h['query']} ({h['subject']})" for h in history)
+
+    prompt_tokenizer.count("warm up")
+    print(f"Tokenizer: {prompt_tokenizer.name}, "
+          f"{requests} prompts per agent, chunks of ~{chunk_words} words\n")
+    print(f"{'agent':10} {'budget':>7} {'before':>8} {'after':>8} {'saved':>7}")
+    for subject, builder in BUILDERS.items():
+        before = after = 0
+        for i in range(requests):
+            query = QUERIES[subject][i % len(QUERIES[subject])]
+            chunks = [grow(doc, chunk_words) for doc in rng.sample(documents, k)]
+            chunks.append(chunks[0])
+            rag_context = "\n".join(chunks)
+            legacy = builder.prefix + f"Given the context: {context}\nRelevant knowledge: {rag_context}\nQuery: {query}\n"
+            before += prompt_tokenizer.count(legacy, cached=False)
+            after += prompt_tokenizer.count(builder.build(query, history, rag_context), cached=False)
+        print(f"{subject:10} {builder.budget:7d} {before / requests:8.1f} {after / requests:8.1f} "
+              f"{1 - after / before:7.1%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-words", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+    run(args.chunk_words, args.requests)
@@ -0,0 +1,49 @@
+"""Compare retrieve_context_batch with one retrieve_context call per query.
+
+Run from the backend directory:
+    python benchmarks/bench_rag_batch.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from rag import get_retrieval_service
+
+TOPICS = [
+    "the quadratic formula", "the Pythagorean theorem", "the area of a circle",
+    "the molar mass of sulfuric acid", "pH of a strong acid", "a covalent bond",
+    "Newton's second law", "kinetic energy", "Ohm's law"
+]
+
+def make_queries(n: int) -> list:
+    """Distinct queries so neither path is helped by the cache"""
+    return [f"Explain {TOPICS[i % len(TOPICS)]} (question {i})" for i in range(n)]
+
+def run(sizes=(10, 100, 1000), k: int = 3):
+    service = get_retrieval_service()
+    service.retrieve_context("warm up", k=k)
+
+    print(f"{'queries':>8} {'loop (s)':>10} {'batch (s)':>10} {'speedup':>8} {'same':>6}")
+    for n in sizes:
+        queries = make_queries(n)
+
+        service.embedding_cache.clear()
+        service.context_cache.clear()
+        start = time.perf_counter()
+        looped = [service.retrieve_context(q, k=k) for q in queries]
+        loop_time = time.perf_counter() - start
+
+        service.embedding_cache.clear()
+        service.context_cache.clear()
+        start = time.perf_counter()
+        batched = service.retrieve_context_batch(queries, k=k)
+        batch_time = time.perf_counter() - start
+
+        # Padding can nudge embeddings slightly, so report agreement rather than assert it
+        same = sum(a == b for a, b in zip(looped, batched)) / n
+        print(f"{n:>8} {loop_time:>10.3f} {batch_time:>10.3f} {loop_time / batch_time:>7.1f}x {same:>6.0%}")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,316 @@
+from typing import Any, Dict, List, Tuple
+from cache import TTLCache, normalize_query
+from db.database import get_cached_classification, save_cached_classification
+from llm import get_gemini_client
+from metrics import metrics
+from rag import get_retrieval_service
+import asyncio
+import json
+import logging
+import numpy as np
+import os
+import re
+import threading
+
+SUBJECTS = ["math", "chemistry", "physics", "evaluation", "general"]
+CONFIDENCE_THRESHOLD = float(os.getenv("TUTOR_CLASSIFIER_THRESHOLD", "0.7"))
+MEMO_CACHE_SIZE = int(os.getenv("TUTOR_CLASSIFICATION_CACHE_SIZE", "4096"))
+# Without embeddings, keyword hits alone never skip Gemini: one generic word ("mean", "base") is too weak
+KEYWORD_ONLY_MAX_CONFIDENCE = round(CONFIDENCE_THRESHOLD * 0.9, 3)
+
+logger = logging.getLogger(__name__)
+
+# Strong single-subject cues; operators like "+" and "=" are deliberately left to the embeddings
+KEYWORDS = {
+    "math": [
+        "solve", "equation", "quadratic", "derivative", "integral", "mean", "median", "mode",
+        "standard deviation", "area of", "perimeter", "radius", "triangle", "algebra", "calculus",
+        "fraction", "factor", "polynomial", "x^2", "sqrt", "sin", "cos", "tan", "log", "matrix"
+    ],
+    "chemistry": [
+        "molar mass", "mole", "ph of", "acid", "base", "reaction", "balance", "compound", "molecule",
+        "covalent", "ionic", "bond", "electron configuration", "periodic table", "h2so4", "hcl",
+        "naoh", "h2o", "co2", "oxidation", "->"
+    ],
+    "physics": [
+        "velocity", "acceleration", "displacement", "force", "newton", "kinetic", "potential energy",
+        "momentum", "voltage", "current", "resistance", "ohm", "circuit", "gravity", "friction",
+        "wavelength", "frequency", "m/s", "joule"
+    ],
+    "evaluation": [
+        "is my answer", "check my answer", "grade my", "evaluate my", "is this correct",
+        "my answer is", "mark my", "did i get"
+    ]
+}
+
+# Seed questions whose embeddings form each subject's centroid
+SEED_EXAMPLES = {
+    "math": [
+        "Solve 2x + 4 = 10", "What is the quadratic formula?", "Find the mean of 1, 2, 3, 4, 5",
+        "Area of a circle with radius 5", "What is 15 + 23?", "Differentiate x^3 + 2x"
+    ],
+    "chemistry": [
+        "What is the molar mass of H2SO4?", "pH of HCl 0.1 M", "Balance C6H12O6 + O2 -> CO2 + H2O",
+        "What is a covalent bond?", "Explain oxidation and reduction", "What is an ionic compound?"
+    ],
+    "physics": [
+        "Find final velocity with initial velocity 0 m/s, acceleration 2 m/s², time 5 s",
+        "Kinetic energy of mass 2 kg with velocity 5 m/s", "Current in resistance 10 ohm with voltage 5 V",
+        "What is Newton's second law?", "Explain conservation of momentum", "What is gravitational potential energy?"
+    ],
+    "evaluation": [
+        "Is my answer 4 correct for 2 + 2?", "Check my answer to this problem", "Grade my solution",
+        "I got x = 3, is that right?"
+    ],
+    "general": [
+        "How should I prepare for exams?", "Tell me about the history of science", "What is a good study schedule?",
+        "Can you help me with my homework?", "Who are you?"
+    ]
+}
+
+class SubjectClassifier:
+    """Local keyword + nearest-centroid subject classifier"""
+
+    def __init__(self, keywords: Dict[str, List[str]] = KEYWORDS, seed_examples: Dict[str, List[str]] = SEED_EXAMPLES):
+        self.keywords = keywords
+        self.seed_examples = seed_examples
+        self._centroids = None
+        self._lock = threading.Lock()
+        self._embeddings_warned = False
+
+    def classify(self, query: str) -> Tuple[str, float]:
+        """Return (subject, confidence) without any network call"""
+        keyword_scores = self._keyword_scores(query)
+        embedding_probs = self._embedding_probabilities(query)
+        keyword_total = sum(keyword_scores.values())
+
+        if keyword_total:
+            subject = max(keyword_scores, key=keyword_scores.get)
+            keyword_share = keyword_scores[subject] / keyword_total
+            if embedding_probs is None:
+                return subject, round(min(0.85 * keyword_share, KEYWORD_ONLY_MAX_CONFIDENCE), 3)
+            return subject, round(0.6 * keyword_share + 0.4 * embedding_probs[subject], 3)
+
+        if embedding_probs is None:
+            return "general", 0.0
+        subject = max(embedding_probs, key=embedding_probs.get)
+        return subject, round(0.8 * embedding_probs[subject], 3)
+
+    def _keyword_scores(self, query: str) -> Dict[str, int]:
+        text = query.lower()
+        scores = {}
+        for subject, words in self.keywords.items():
+            hits = sum(1 for word in words if self._contains(text, word))
+            if hits:
+                scores[subject] = hits
+        return scores
+
+    def _contains(self, text: str, word: str) -> bool:
+        if word[0].isalnum() and word[-1].isalnum():
+            return re.search(rf"\b{re.escape(word)}\b", text) is not None
+        return word in text
+
+    def _embedding_probabilities(self, query: str):
+        """Softmax over cosine similarity to each subject centroid, or None if embeddings are unavailable"""
+        try:
+            centroids = self._get_centroids()
+            vector = np.asarray(get_retrieval_service().embed_query(query), dtype=np.float32)
+        except Exception as e:
+            if not self._embeddings_warned:
+                self._embeddings_warned = True
+                logger.warning("Local classifier embeddings unavailable, using keywords only: %s", e)
+            return None
+        vector /= np.linalg.norm(vector) or 1.0
+        subjects = list(centroids)
+        similarities = np.array([float(centroids[s] @ vector) for s in subjects])
+        weights = np.exp((similarities - similarities.max()) / 0.05)
+        probs = weights / weights.sum()
+        return dict(zip(subjects, probs.tolist()))
+
+    def _get_centroids(self) -> Dict[str, np.ndarray]:
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    embeddings = get_retrieval_service().embeddings
+                    centroids = {}
+                    for subject, examples in self.seed_examples.items():
+                        vectors = np.asarray(embeddings.embed_documents(examples), dtype=np.float32)
+                        centroid = vectors.mean(axis=0)
+                        centroids[subject] = centroid / np.linalg.norm(centroid)
+                    self._centroids = centroids
+        return self._centroids
+
+subject_classifier = SubjectClassifier()
+
+def classify_with_llm(query: str) -> str:
+    """Classify query into subject using Gemini API"""
+    subject = _request_llm_classification(query)
+    return subject if subject is not None else "general"
+
+def _classification_prompt(query: str) -> str:
+    return (
+        f"Classify the following query into one of these categories: math, chemistry, physics, evaluation, or general.\n"
+        f"Query: {query}\n"
+        f"Return only the category name (e.g., 'math', 'chemistry', 'physics', 'evaluation', 'general')."
+    )
+
+CLASSIFICATION_CONFIG = {
+    "max_output_tokens": 50,
+    "temperature": 0.3,
+}
+
+def _parse_category(text: str) -> str:
+    category = text.strip().lower()
+    return category if category in SUBJECTS else "general"
+
+def _request_llm_classification(query: str):
+    """Ask Gemini for the subject; returns None if the call fails"""
+    try:
+        response = get_gemini_client().generate_content(_classification_prompt(query), generation_config=CLASSIFICATION_CONFIG)
+        return _parse_category(response.text)
+    except Exception as e:
+        print(f"Classification error: {e}")
+        return None
+
+async def _request_llm_classification_async(query: str):
+    try:
+        response = await get_gemini_client().generate_content_async(_classification_prompt(query), generation_config=CLASSIFICATION_CONFIG)
+        return _parse_category(response.text)
+    except Exception as e:
+        print(f"Classification error: {e}")
+        return None
+
+class ClassificationMemo:
+    """Two-tier memo of past classifications: an in-process LRU in front of a SQLite table"""
+
+    def __init__(self, maxsize: int = MEMO_CACHE_SIZE):
+        self.memory = TTLCache(maxsize=maxsize)
+        self.sqlite_hits = 0
+        self.misses = 0
+
+    def get(self, query_key: str):
+        subject = self.memory.get(query_key)
+        if subject is not None:
+            return subject
+        try:
+            subject = get_cached_classification(query_key)
+        except Exception as e:
+            print(f"Classification cache read error: {e}")
+            subject = None
+        if subject is None:
+            self.misses += 1
+            return None
+        self.sqlite_hits += 1
+        self.memory.set(query_key, subject)
+        return subject
+
+    def set(self, query_key: str, subject: str):
+        self.memory.set(query_key, subject)
+        try:
+            save_cached_classification(query_key, subject)
+        except Exception as e:
+            print(f"Classification cache write error: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        memory = self.memory.stats()
+        hits = memory["hits"] + self.sqlite_hits
+        lookups = hits + self.misses
+        return {
+            "memory": memory,
+            "sqlite_hits": self.sqlite_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+        }
+
+classification_memo = ClassificationMemo()
+metrics.register("classification_cache", classification_memo.stats)
+
+def _fallback_subject(local_subject: str, confidence: float) -> str:
+    """Label to use when Gemini can't be reached: the local guess if it had any evidence"""
+    return local_subject if confidence > 0 else "general"
+
+def classify_query(query: str) -> str:
+    """Classify query locally, falling back to Gemini only when the local label is uncertain"""
+    query_key = normalize_query(query)
+    subject = classification_memo.get(query_key)
+    if subject is not None:
+        return subject
+
+    local_subject, confidence = subject_classifier.classify(query)
+    subject = local_subject
+    if confidence < CONFIDENCE_THRESHOLD:
+        subject = _request_llm_classification(query)
+        if subject is None:
+            # Don't memoise the fallback label, the next request can retry Gemini
+            return _fallback_subject(local_subject, confidence)
+    classification_memo.set(query_key, subject)
+    return subject
+
+def _request_llm_batch_classification(queries: List[str]) -> List:
+    """Classify several queries in one Gemini call; failed items come back as None"""
+    numbered = "\n".join(f"{i + 1}. {q}" for i, q in enumerate(queries))
+    prompt = (
+        f"Classify each of the following queries into one of these categories: math, chemistry, physics, evaluation, or general.\n"
+        f"{numbered}\n"
+        f"Return only a JSON array of {len(queries)} category names, one per query, in the same order."
+    )
+    try:
+        response = get_gemini_client().generate_content(
+            prompt,
+            generation_config={
+                "max_output_tokens": 20 + 10 * len(queries),
+                "temperature": 0.3,
+            }
+        )
+        text = response.text.strip()
+        labels = json.loads(text[text.index("["):text.rindex("]") + 1])
+        if len(labels) != len(queries):
+            raise ValueError(f"expected {len(queries)} labels, got {len(labels)}")
+        return [_parse_category(str(label)) for label in labels]
+    except Exception as e:
+        print(f"Batch classification error: {e}")
+        return [None] * len(queries)
+
+def classify_queries(queries: List[str]) -> List[str]:
+    """Classify a list of queries: memo first, then the local classifier, then one Gemini call for the rest"""
+    subjects = [None] * len(queries)
+    keys = [normalize_query(q) for q in queries]
+    uncertain = []
+    local = {}
+    for i, (query, key) in enumerate(zip(queries, keys)):
+        subjects[i] = classification_memo.get(key)
+        if subjects[i] is not None:
+            continue
+        subject, confidence = subject_classifier.classify(query)
+        if confidence >= CONFIDENCE_THRESHOLD:
+            subjects[i] = subject
+            classification_memo.set(key, subject)
+        else:
+            uncertain.append(i)
+            local[i] = (subject, confidence)
+
+    if uncertain:
+        labels = _request_llm_batch_classification([queries[i] for i in uncertain])
+        for i, label in zip(uncertain, labels):
+            if label is None:
+                subjects[i] = _fallback_subject(*local[i])
+            else:
+                subjects[i] = label
+                classification_memo.set(keys[i], label)
+    return subjects
+
+async def classify_query_async(query: str) -> str:
+    """classify_query for the async server: local work runs off the event loop, Gemini is awaited"""
+    query_key = normalize_query(query)
+    subject = await asyncio.to_thread(classification_memo.get, query_key)
+    if subject is not None:
+        return subject
+
+    local_subject, confidence = await asyncio.to_thread(subject_classifier.classify, query)
+    subject = local_subject
+    if confidence < CONFIDENCE_THRESHOLD:
+        subject = await _request_llm_classification_async(query)
+        if subject is None:
+            return _fallback_subject(local_subject, confidence)
+    await asyncio.to_thread(classification_memo.set, query_key, subject)
+    return subject
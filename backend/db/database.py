@@ -1,9 +1,142 @@
+import atexit
+import os
 import sqlite3
+import threading
+import weakref
 from datetime import datetime
+from db.history_cache import RecentHistoryCache
+from db.write_behind import WriteBehindWriter
+from metrics import metrics
+
+DB_PATH = os.getenv("TUTOR_DB_PATH", "tutor.db")
+BUSY_TIMEOUT_MS = int(os.getenv("TUTOR_DB_BUSY_TIMEOUT_MS", "5000"))
+WRITE_BEHIND = os.getenv("TUTOR_DB_WRITE_BEHIND", "0") == "1"
+WRITE_BEHIND_FLUSH_SIZE = int(os.getenv("TUTOR_DB_FLUSH_SIZE", "100"))
+WRITE_BEHIND_FLUSH_MS = float(os.getenv("TUTOR_DB_FLUSH_MS", "50"))
+HISTORY_CACHE_USERS = int(os.getenv("TUTOR_HISTORY_CACHE_USERS", "10000"))
+HISTORY_CACHE_DEPTH = int(os.getenv("TUTOR_HISTORY_CACHE_DEPTH", "10"))
+
+class _ThreadConnection:
+    """A thread's connection, held in its thread-locals so it is dropped when the thread ends"""
+
+    __slots__ = ("conn", "__weakref__")
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+class ConnectionManager:
+    """One long-lived SQLite connection per thread, in WAL mode.
+
+    Flask's threaded server runs each request on a fresh thread, so a connection is
+    closed as soon as its thread exits rather than kept until close_all().
+    """
+
+    def __init__(self, db_path: str = DB_PATH, busy_timeout_ms: int = BUSY_TIMEOUT_MS):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        self._connections = set()
+        self._lock = threading.Lock()
+
+    def get_connection(self) -> sqlite3.Connection:
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            # Only the owning thread uses it, but it may be closed from another one
+            conn = sqlite3.connect(self.db_path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            holder = _ThreadConnection(conn)
+            weakref.finalize(holder, self._close, conn)
+            self._local.holder = holder
+            with self._lock:
+                self._connections.add(conn)
+        return holder.conn
+
+    def _close(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._connections.discard(conn)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def open_connections(self) -> int:
+        with self._lock:
+            return len(self._connections)
+
+    def close_all(self):
+        """Close every connection opened by this manager"""
+        with self._lock:
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+_manager = ConnectionManager()
+_writer = None
+history_cache = RecentHistoryCache(max_users=HISTORY_CACHE_USERS, depth=HISTORY_CACHE_DEPTH)
+metrics.register("query_history_cache", history_cache.stats)
+
+def configure_db(db_path: str, busy_timeout_ms: int = BUSY_TIMEOUT_MS):
+    """Point the database layer at another file (e.g. for tests)"""
+    global _manager
+    disable_write_behind()
+    _manager.close_all()
+    _manager = ConnectionManager(db_path, busy_timeout_ms)
+    history_cache.clear()
+
+def get_connection() -> sqlite3.Connection:
+    """Return this thread's connection"""
+    return _manager.get_connection()
+
+def enable_write_behind(flush_size: int = WRITE_BEHIND_FLUSH_SIZE, flush_interval_ms: float = WRITE_BEHIND_FLUSH_MS) -> WriteBehindWriter:
+    """Send save_query/save_content inserts through a background batching writer"""
+    global _writer
+    if _writer is None:
+        _writer = WriteBehindWriter(get_connection, flush_size=flush_size, flush_interval_ms=flush_interval_ms)
+        _writer.start()
+        atexit.register(disable_write_behind)
+        metrics.register("db_write_behind", _writer.stats)
+    return _writer
+
+def disable_write_behind():
+    """Drain queued writes and go back to synchronous inserts"""
+    global _writer
+    writer, _writer = _writer, None
+    if writer is not None:
+        writer.stop()
+
+def get_write_behind():
+    """Return the active background writer, or None"""
+    return _writer
+
+def _insert(sql: str, params: tuple):
+    writer = _writer
+    if writer is not None:
+        writer.submit(sql, params)
+        return
+    conn = get_connection()
+    conn.execute(sql, params)
+    conn.commit()
+
+def _insert_many(sql: str, rows: list):
+    """Insert many rows in one transaction (or hand them all to the background writer)"""
+    writer = _writer
+    if writer is not None:
+        for params in rows:
+            writer.submit(sql, params)
+        return
+    conn = get_connection()
+    with conn:
+        conn.executemany(sql, rows)
 
 def init_db():
     """Initialize SQLite database"""
-    conn = sqlite3.connect("tutor.db")
+    conn = get_connection()
     cursor = conn.cursor()
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS queries (
@@ -23,39 +156,79 @@ def init_db():
             timestamp DATETIME
         )
     """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS classification_cache (
+            query_key TEXT PRIMARY KEY,
+            subject TEXT,
+            timestamp DATETIME
+        )
+    """)
+    # Serves the per-user ORDER BY timestamp DESC LIMIT ? history lookup
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_queries_user_timestamp ON queries (user_id, timestamp)")
     conn.commit()
-    conn.close()
 
 def save_query(user_id: str, query: str, subject: str):
     """Save query to database"""
-    conn = sqlite3.connect("tutor.db")
-    cursor = conn.cursor()
-    cursor.execute(
+    timestamp = datetime.now()
+    _insert(
         "INSERT INTO queries (user_id, query, subject, timestamp) VALUES (?, ?, ?, ?)",
-        (user_id, query, subject, datetime.now())
+        (user_id, query, subject, timestamp)
     )
-    conn.commit()
-    conn.close()
+    history_cache.record(user_id, query, subject, str(timestamp))
+
+def save_queries(rows: list):
+    """Save many (user_id, query, subject) rows at once"""
+    timestamp = datetime.now()
+    _insert_many(
+        "INSERT INTO queries (user_id, query, subject, timestamp) VALUES (?, ?, ?, ?)",
+        [(user_id, query, subject, timestamp) for user_id, query, subject in rows]
+    )
+    for user_id, query, subject in rows:
+        history_cache.record(user_id, query, subject, str(timestamp))
 
 def get_query_history(user_id: str, limit: int = 3) -> list:
     """Retrieve query history for user"""
-    conn = sqlite3.connect("tutor.db")
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT query, subject FROM queries WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?",
-        (user_id, limit)
+    history = history_cache.get(user_id, limit)
+    if history is not None:
+        return history
+    conn = get_connection()
+    cursor = conn.execute(
+        "SELECT query, subject, timestamp FROM queries WHERE user_id = ? ORDER BY timestamp DESC LIMIT ?",
+        (user_id, max(limit, history_cache.depth))
     )
-    history = [{"query": row[0], "subject": row[1]} for row in cursor.fetchall()]
-    conn.close()
-    return history
+    rows = cursor.fetchall()
+    if limit <= history_cache.depth:
+        history_cache.load(user_id, rows)
+        return history_cache.get(user_id, limit)
+    return [{"query": row[0], "subject": row[1]} for row in rows]
 
 def save_content(user_id: str, content_type: str, content: str):
     """Save content (e.g., evaluation feedback) to database"""
-    conn = sqlite3.connect("tutor.db")
-    cursor = conn.cursor()
-    cursor.execute(
+    _insert(
         "INSERT INTO content (user_id, content_type, content, timestamp) VALUES (?, ?, ?, ?)",
         (user_id, content_type, content, datetime.now())
     )
+
+def save_contents(rows: list):
+    """Save many (user_id, content_type, content) rows at once"""
+    timestamp = datetime.now()
+    _insert_many(
+        "INSERT INTO content (user_id, content_type, content, timestamp) VALUES (?, ?, ?, ?)",
+        [(user_id, content_type, content, timestamp) for user_id, content_type, content in rows]
+    )
+
+def get_cached_classification(query_key: str):
+    """Return the cached subject for a normalised query, or None"""
+    conn = get_connection()
+    cursor = conn.execute("SELECT subject FROM classification_cache WHERE query_key = ?", (query_key,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+def save_cached_classification(query_key: str, subject: str):
+    """Save the subject for a normalised query"""
+    conn = get_connection()
+    conn.execute(
+        "INSERT OR REPLACE INTO classification_cache (query_key, subject, timestamp) VALUES (?, ?, ?)",
+        (query_key, subject, datetime.now())
+    )
     conn.commit()
-    conn.close()
@@ -0,0 +1,81 @@
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional
+import threading
+
+class _UserHistory:
+    def __init__(self, depth: int):
+        # Newest first: (query, subject, timestamp)
+        self.entries = deque(maxlen=depth)
+        # True once the buffer has been seeded from SQLite, so it holds everything up to its depth
+        self.complete = False
+
+class RecentHistoryCache:
+    """Per-user ring buffer of recent queries, with LRU eviction across users.
+
+    Only sees writes made by this process; other workers' queries show up after the
+    user's buffer is evicted or the process restarts.
+    """
+
+    def __init__(self, max_users: int = 10000, depth: int = 10):
+        self.max_users = max_users
+        self.depth = depth
+        self.hits = 0
+        self.misses = 0
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, user_id: str, query: str, subject: str, timestamp: str):
+        """Write path: remember a query the moment it is saved"""
+        with self._lock:
+            history = self._users.get(user_id)
+            if history is None:
+                history = self._users[user_id] = _UserHistory(self.depth)
+                self._evict()
+            self._users.move_to_end(user_id)
+            history.entries.appendleft((query, subject, timestamp))
+
+    def get(self, user_id: str, limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Return up to limit recent queries, or None if SQLite has to be consulted"""
+        with self._lock:
+            history = self._users.get(user_id)
+            if history is None or limit > self.depth or (not history.complete and len(history.entries) < limit):
+                self.misses += 1
+                return None
+            self._users.move_to_end(user_id)
+            self.hits += 1
+            return [{"query": q, "subject": s} for q, s, _ in list(history.entries)[:limit]]
+
+    def load(self, user_id: str, rows: list):
+        """Seed a user's buffer from SQLite rows of (query, subject, timestamp), newest first"""
+        with self._lock:
+            history = self._users.get(user_id)
+            if history is None:
+                history = self._users[user_id] = _UserHistory(self.depth)
+                self._evict()
+            newest_stored = str(rows[0][2]) if rows else ""
+            # Keep entries recorded here that haven't reached SQLite yet (e.g. queued by write-behind)
+            pending = [entry for entry in history.entries if entry[2] > newest_stored]
+            history.entries.clear()
+            # Newest first, so trim from the end: extending past maxlen would drop the newest
+            history.entries.extend((pending + [(q, s, str(ts)) for q, s, ts in rows])[:self.depth])
+            history.complete = True
+            self._users.move_to_end(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+    def _evict(self):
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "users": len(self._users),
+                "max_users": self.max_users,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
@@ -0,0 +1,126 @@
+from typing import Any, Callable, Dict, Tuple
+import queue
+import sqlite3
+import threading
+import time
+
+_STOP = object()
+
+class _FlushRequest:
+    def __init__(self):
+        self.done = threading.Event()
+
+class WriteBehindWriter:
+    """Background thread that queues INSERTs and writes them in batched transactions"""
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection], flush_size: int = 100,
+                 flush_interval_ms: float = 50, max_queue: int = 10000):
+        self.connect = connect
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval_ms / 1000
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.records_written = 0
+        self.records_failed = 0
+        self.flushes = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self._total_flush_ms = 0.0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="db-write-behind", daemon=True)
+                self._thread.start()
+
+    def submit(self, sql: str, params: Tuple[Any, ...]):
+        """Queue a statement; blocks only if the queue is full"""
+        self._queue.put((sql, params))
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything queued so far has been written"""
+        request = _FlushRequest()
+        self._queue.put(request)
+        return request.done.wait(timeout)
+
+    def stop(self, timeout: float = 5.0):
+        """Drain the queue and stop the writer thread"""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        conn = self.connect()
+        while True:
+            item = self._queue.get()
+            batch = []
+            waiters = []
+            stopping = False
+            deadline = time.monotonic() + self.flush_interval
+            # Collect until the batch is full or the first record has waited flush_interval
+            while True:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, _FlushRequest):
+                    waiters.append(item)
+                else:
+                    batch.append(item)
+                if stopping or waiters or len(batch) >= self.flush_size:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            if stopping:
+                # Drain whatever arrived before the stop sentinel was processed
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if isinstance(item, _FlushRequest):
+                        waiters.append(item)
+                    elif item is not _STOP:
+                        batch.append(item)
+            if batch:
+                self._write(conn, batch)
+            for waiter in waiters:
+                waiter.done.set()
+            if stopping:
+                return
+
+    def _write(self, conn: sqlite3.Connection, batch: list):
+        start = time.perf_counter()
+        grouped = {}
+        for sql, params in batch:
+            grouped.setdefault(sql, []).append(params)
+        try:
+            with conn:
+                for sql, rows in grouped.items():
+                    conn.executemany(sql, rows)
+            self.records_written += len(batch)
+        except sqlite3.Error as e:
+            self.records_failed += len(batch)
+            print(f"Write-behind flush failed, dropped {len(batch)} records: {e}")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.flushes += 1
+        self.last_flush_ms = elapsed_ms
+        self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+        self._total_flush_ms += elapsed_ms
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self._queue.qsize(),
+            "records_written": self.records_written,
+            "records_failed": self.records_failed,
+            "flushes": self.flushes,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "avg_flush_ms": round(self._total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+            "max_flush_ms": round(self.max_flush_ms, 3)
+        }
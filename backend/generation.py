@@ -0,0 +1,273 @@
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from metrics import metrics
+import os
+import queue
+import threading
+import time
+
+LOCAL_MODEL_NAME = os.getenv("TUTOR_LOCAL_MODEL", "distilgpt2")
+MAX_BATCH_SIZE = int(os.getenv("TUTOR_GENERATION_MAX_BATCH", "8"))
+MAX_WAIT_MS = float(os.getenv("TUTOR_GENERATION_MAX_WAIT_MS", "25"))
+MAX_NEW_TOKENS = int(os.getenv("TUTOR_GENERATION_MAX_NEW_TOKENS", "200"))
+TEMPERATURE = float(os.getenv("TUTOR_GENERATION_TEMPERATURE", "0.7"))
+
+class _BatchStreamer:
+    """Receives each generation step of a batch from model.generate and reports new text per row.
+
+    Text is decoded from all of a row's tokens so far and only the unseen suffix is sent,
+    holding back incomplete multi-byte characters. Rows stop at EOS or at their own limit.
+    """
+
+    def __init__(self, tokenizer, max_new_tokens: List[int], on_text: Callable[[int, str], None]):
+        self.tokenizer = tokenizer
+        self.max_new_tokens = max_new_tokens
+        self.on_text = on_text
+        self.ids = [[] for _ in max_new_tokens]
+        self.sent = [0] * len(max_new_tokens)
+        self.done = [False] * len(max_new_tokens)
+        self._prompt_seen = False
+
+    def put(self, value):
+        # The first call carries the prompt ids
+        if not self._prompt_seen:
+            self._prompt_seen = True
+            return
+        for row, ids in enumerate(value.reshape(len(self.ids), -1).tolist()):
+            for token in ids:
+                if self.done[row]:
+                    break
+                if token == self.tokenizer.eos_token_id:
+                    self.done[row] = True
+                    break
+                self.ids[row].append(token)
+                self.done[row] = len(self.ids[row]) >= self.max_new_tokens[row]
+            self._emit(row)
+
+    def end(self):
+        pass
+
+    def _emit(self, row: int):
+        text = self.tokenizer.decode(self.ids[row], skip_special_tokens=True).lstrip()
+        if text.endswith("\ufffd"):
+            return
+        if len(text) > self.sent[row]:
+            self.on_text(row, text[self.sent[row]:])
+            self.sent[row] = len(text)
+
+class TransformersBackend:
+    """A small causal LM on CPU; transformers and torch are imported when it is loaded"""
+
+    # generate() accepts on_text and reports text as it is produced
+    streams = True
+
+    def __init__(self, model_name: str = LOCAL_MODEL_NAME):
+        self.model_name = model_name
+        self._model = None
+        self._tokenizer = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from transformers import AutoModelForCausalLM, AutoTokenizer
+                    tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                    # Left padding keeps every prompt flush against its generated tokens
+                    tokenizer.padding_side = "left"
+                    if tokenizer.pad_token is None:
+                        tokenizer.pad_token = tokenizer.eos_token
+                    model = AutoModelForCausalLM.from_pretrained(self.model_name)
+                    model.eval()
+                    self._tokenizer = tokenizer
+                    self._model = model
+
+    def generate(self, prompts: List[str], max_new_tokens: List[int], temperature: float,
+                 on_text: Optional[Callable[[int, str], None]] = None) -> List[Tuple[str, int]]:
+        """Generate for a batch of prompts; returns (text, generated token count) per prompt.
+
+        on_text(row, text), if given, is called with each new piece of a row's text as it is generated.
+        """
+        import torch
+        self.load()
+        tokenizer, model = self._tokenizer, self._model
+        longest = max(max_new_tokens)
+        context = getattr(model.config, "max_position_embeddings", 1024)
+        encoded = tokenizer(prompts, return_tensors="pt", padding=True, truncation=True,
+                            max_length=max(16, context - longest))
+        with torch.inference_mode():
+            output = model.generate(
+                **encoded,
+                max_new_tokens=longest,
+                do_sample=temperature > 0,
+                temperature=temperature if temperature > 0 else None,
+                pad_token_id=tokenizer.pad_token_id,
+                streamer=_BatchStreamer(tokenizer, max_new_tokens, on_text) if on_text else None
+            )
+        generated = output[:, encoded["input_ids"].shape[1]:].tolist()
+        results = []
+        for ids, limit in zip(generated, max_new_tokens):
+            ids = ids[:limit]
+            # Finished rows are padded out to the longest one
+            if tokenizer.eos_token_id in ids:
+                ids = ids[:ids.index(tokenizer.eos_token_id)]
+            results.append((tokenizer.decode(ids, skip_special_tokens=True).strip(), len(ids)))
+        return results
+
+class _Request:
+    __slots__ = ("prompt", "max_new_tokens", "on_text", "future", "enqueued_at")
+
+    def __init__(self, prompt: str, max_new_tokens: int, on_text: Optional[Callable[[str], None]] = None):
+        self.prompt = prompt
+        self.max_new_tokens = max_new_tokens
+        self.on_text = on_text
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+_DONE = object()
+
+class GenerationEngine:
+    """One local model shared by every agent, fed by dynamic batches.
+
+    Callers block on their own result while a single worker thread drains the queue:
+    the first waiting prompt opens a batch, which is flushed once it holds
+    max_batch_size prompts or max_wait_ms has passed since that prompt arrived.
+    stream() callers share batches the same way but receive their text as it is generated,
+    when the backend supports it.
+    """
+
+    def __init__(self, backend=None, max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS,
+                 max_new_tokens: int = MAX_NEW_TOKENS, temperature: float = TEMPERATURE):
+        self.backend = backend or TransformersBackend()
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._batches = 0
+        self._errors = 0
+        self._tokens = 0
+        self._generation_s = 0.0
+        self._queue_wait_s = 0.0
+        self._max_queue_wait_s = 0.0
+
+    def load(self):
+        """Load the model now instead of on the first batch"""
+        self.backend.load()
+
+    def submit(self, prompt: str, max_new_tokens: Optional[int] = None,
+               on_text: Optional[Callable[[str], None]] = None) -> Future:
+        self._ensure_worker()
+        request = _Request(prompt, max_new_tokens or self.max_new_tokens, on_text)
+        self._queue.put(request)
+        return request.future
+
+    def generate(self, prompt: str, max_new_tokens: Optional[int] = None, timeout: Optional[float] = None) -> str:
+        """Generate a continuation of prompt, batched with whatever else is waiting"""
+        return self.submit(prompt, max_new_tokens).result(timeout=timeout)
+
+    def stream(self, prompt: str, max_new_tokens: Optional[int] = None, timeout: Optional[float] = None) -> Iterator[str]:
+        """Yield the continuation of prompt piece by piece; the pieces join to generate()'s text"""
+        pieces = queue.Queue()
+        future = self.submit(prompt, max_new_tokens, on_text=pieces.put)
+        future.add_done_callback(lambda _: pieces.put(_DONE))
+        streamed = ""
+        while True:
+            piece = pieces.get(timeout=timeout)
+            if piece is _DONE:
+                break
+            streamed += piece
+            yield piece
+        text = future.result()
+        # Whatever the backend didn't stream (all of it, for backends that can't)
+        if text.startswith(streamed) and len(text) > len(streamed):
+            yield text[len(streamed):]
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="generation", daemon=True)
+                    self._worker.start()
+
+    def _next_batch(self) -> List[_Request]:
+        batch = [self._queue.get()]
+        deadline = batch[0].enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            started = time.perf_counter()
+            streaming = {row: request.on_text for row, request in enumerate(batch) if request.on_text}
+            options = {}
+            if streaming and getattr(self.backend, "streams", False):
+                options["on_text"] = lambda row, text: streaming[row](text) if row in streaming else None
+            try:
+                results = self.backend.generate(
+                    [request.prompt for request in batch],
+                    [request.max_new_tokens for request in batch],
+                    self.temperature,
+                    **options
+                )
+            except Exception as e:
+                self._record(batch, started, 0, failed=True)
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+            self._record(batch, started, sum(tokens for _, tokens in results), failed=False)
+            for request, (text, _) in zip(batch, results):
+                request.future.set_result(text)
+
+    def _record(self, batch: List[_Request], started: float, tokens: int, failed: bool):
+        elapsed = time.perf_counter() - started
+        waits = [started - request.enqueued_at for request in batch]
+        with self._stats_lock:
+            self._requests += len(batch)
+            self._batches += 1
+            self._errors += len(batch) if failed else 0
+            self._tokens += tokens
+            self._generation_s += elapsed
+            self._queue_wait_s += sum(waits)
+            self._max_queue_wait_s = max(self._max_queue_wait_s, max(waits))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            requests, batches, generation_s = self._requests, self._batches, self._generation_s
+            return {
+                "model": getattr(self.backend, "model_name", type(self.backend).__name__),
+                "requests": requests,
+                "batches": batches,
+                "errors": self._errors,
+                "avg_batch_size": round(requests / batches, 2) if batches else 0.0,
+                "generated_tokens": self._tokens,
+                "tokens_per_second": round(self._tokens / generation_s, 1) if generation_s else 0.0,
+                "avg_queue_wait_ms": round(self._queue_wait_s / requests * 1000, 2) if requests else 0.0,
+                "max_queue_wait_ms": round(self._max_queue_wait_s * 1000, 2),
+                "queued": self._queue.qsize()
+            }
+
+_engine = None
+_engine_lock = threading.Lock()
+
+def get_generation_engine() -> GenerationEngine:
+    """Return the process-wide local generation engine"""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = GenerationEngine()
+                metrics.register("local_generation", _engine.stats)
+    return _engine
@@ -0,0 +1,414 @@
+from dotenv import load_dotenv
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+from metrics import metrics
+import asyncio
+import os
+import random
+import threading
+import time
+
+MODEL_NAME = os.getenv("TUTOR_GEMINI_MODEL", "gemini-1.5-flash")
+# "gemini" calls the API; "stub" answers locally so load tests run offline
+BACKEND = os.getenv("TUTOR_GEMINI_BACKEND", "gemini")
+# Requests per minute and burst size of the token bucket; match them to the project's quota
+REQUESTS_PER_MINUTE = float(os.getenv("TUTOR_GEMINI_RPM", "60"))
+BURST = int(os.getenv("TUTOR_GEMINI_BURST", "10"))
+MAX_CONCURRENCY = int(os.getenv("TUTOR_GEMINI_MAX_CONCURRENCY", "8"))
+TIMEOUT = float(os.getenv("TUTOR_GEMINI_TIMEOUT", "30"))
+MAX_RETRIES = int(os.getenv("TUTOR_GEMINI_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("TUTOR_GEMINI_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("TUTOR_GEMINI_BACKOFF_MAX", "8"))
+BREAKER_THRESHOLD = int(os.getenv("TUTOR_GEMINI_BREAKER_THRESHOLD", "5"))
+BREAKER_COOLDOWN = float(os.getenv("TUTOR_GEMINI_BREAKER_COOLDOWN", "30"))
+STUB_LATENCY_MS = float(os.getenv("TUTOR_GEMINI_STUB_LATENCY_MS", "200"))
+STUB_ERROR_RATE = float(os.getenv("TUTOR_GEMINI_STUB_ERROR_RATE", "0"))
+
+# Quota exhaustion, overload and gateway errors are worth another attempt; bad requests are not
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+_model = None
+_model_lock = threading.Lock()
+
+def get_gemini_model():
+    """Return the process-wide Gemini model, configuring the SDK on first use.
+
+    google.generativeai is imported here rather than at module load, so processes that
+    never reach the language model don't pay for it at start-up.
+    """
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import google.generativeai as genai
+                load_dotenv()
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                _model = genai.GenerativeModel(MODEL_NAME)
+    return _model
+
+class LLMUnavailableError(Exception):
+    """The client refused the call before it reached the backend"""
+
+class CircuitOpenError(LLMUnavailableError):
+    pass
+
+class RateLimitedError(LLMUnavailableError):
+    pass
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    code = getattr(error, "code", None)
+    try:
+        return int(code) in RETRYABLE_STATUS
+    except (TypeError, ValueError):
+        return False
+
+class GeminiBackend:
+    name = "gemini"
+
+    def load(self):
+        get_gemini_model()
+
+    def generate(self, prompt: str, generation_config: Optional[dict], timeout: float, stream: bool = False):
+        return get_gemini_model().generate_content(
+            prompt, generation_config=generation_config, stream=stream, request_options={"timeout": timeout}
+        )
+
+    async def generate_async(self, prompt: str, generation_config: Optional[dict], timeout: float):
+        return await get_gemini_model().generate_content_async(
+            prompt, generation_config=generation_config, request_options={"timeout": timeout}
+        )
+
+class StubBackendError(Exception):
+    def __init__(self, code: int = 429):
+        super().__init__(f"{code} stub backend error")
+        self.code = code
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+class StubBackend:
+    """Answers locally after a fixed latency, failing a configurable share of calls with a 429"""
+
+    name = "stub"
+
+    def __init__(self, latency_ms: float = STUB_LATENCY_MS, error_rate: float = STUB_ERROR_RATE,
+                 reply: Optional[str] = None, seed: Optional[int] = None):
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.reply = reply
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def load(self):
+        pass
+
+    def _answer(self, prompt: str, timeout: float) -> str:
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+        if failed:
+            raise StubBackendError(429)
+        if self.latency > timeout:
+            raise TimeoutError(f"stub backend took longer than {timeout}s")
+        lines = prompt.strip().splitlines() or [""]
+        return self.reply if self.reply is not None else f"Stub answer to: {lines[-1][:80]}"
+
+    def generate(self, prompt: str, generation_config: Optional[dict], timeout: float, stream: bool = False):
+        time.sleep(min(self.latency, timeout))
+        text = self._answer(prompt, timeout)
+        if stream:
+            return [StubResponse(word + " ") for word in text.split()]
+        return StubResponse(text)
+
+    async def generate_async(self, prompt: str, generation_config: Optional[dict], timeout: float):
+        await asyncio.sleep(min(self.latency, timeout))
+        return StubResponse(self._answer(prompt, timeout))
+
+class TokenBucket:
+    """Admits rate calls per second on average with bursts of up to capacity.
+
+    Callers reserve a token and are told how long to wait for it, so waiting callers
+    queue fairly and the same bucket serves threads and coroutines.
+    """
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, max_wait: Optional[float] = None) -> Optional[float]:
+        """Take a token; return the seconds to wait before using it, or None if that exceeds max_wait"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (1 - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= 1
+            return wait
+
+class CircuitBreaker:
+    """Fails calls fast after threshold consecutive failures, probing again after cooldown"""
+
+    def __init__(self, threshold: int = BREAKER_THRESHOLD, cooldown: float = BREAKER_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.trips = 0
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        return self.admit() is not None
+
+    def admit(self) -> Optional[bool]:
+        """None if the call is refused, otherwise whether it is the half-open probe"""
+        with self._lock:
+            if self.state == "closed":
+                return False
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.cooldown:
+                self.state = "half_open"
+                self._probing = False
+            # Half open lets a single probe through
+            if self.state == "half_open" and not self._probing:
+                self._probing = True
+                return True
+            return None
+
+    def abandon_probe(self):
+        """The probe ended without reaching the backend; let the next call probe instead"""
+        with self._lock:
+            self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+class GeminiClient:
+    """The one way the backend talks to Gemini, shared by every agent and the classifier.
+
+    Each attempt passes the circuit breaker, takes a token from the bucket (failing fast
+    with RateLimitedError when the wait would exceed the timeout), takes one of
+    max_concurrency slots and runs with a timeout. Timeouts, quota and server errors are
+    retried with full-jitter exponential backoff; other errors are raised at once.
+    generate_content and generate_content_async mirror the SDK model's methods.
+    """
+
+    def __init__(self, backend=None, requests_per_minute: float = REQUESTS_PER_MINUTE, burst: int = BURST,
+                 max_concurrency: int = MAX_CONCURRENCY, timeout: float = TIMEOUT, max_retries: int = MAX_RETRIES,
+                 backoff_base: float = BACKOFF_BASE, backoff_max: float = BACKOFF_MAX, breaker: CircuitBreaker = None):
+        self.backend = backend or GeminiBackend()
+        self.bucket = TokenBucket(requests_per_minute / 60, burst)
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        self._random = random.Random()
+        self._stats_lock = threading.Lock()
+        self._counters = {
+            "calls": 0, "successes": 0, "failures": 0, "retries": 0, "timeouts": 0,
+            "quota_errors": 0, "rejected": 0, "throttled": 0, "in_flight": 0
+        }
+        self._throttle_wait_s = 0.0
+
+    def load(self):
+        self.backend.load()
+
+    def generate_content(self, prompt: str, generation_config: Optional[dict] = None, stream: bool = False):
+        """Return the response, or with stream=True an iterator of chunks"""
+        if stream:
+            return self._stream(prompt, generation_config)
+        return self._call(lambda timeout: self.backend.generate(prompt, generation_config, timeout))
+
+    async def generate_content_async(self, prompt: str, generation_config: Optional[dict] = None):
+        return await self._call_async(lambda timeout: self.backend.generate_async(prompt, generation_config, timeout))
+
+    def _stream(self, prompt: str, generation_config: Optional[dict]) -> Iterator[Any]:
+        def start(timeout: float):
+            # Retries cover everything up to the first chunk; after that the answer is partly sent
+            chunks = iter(self.backend.generate(prompt, generation_config, timeout, stream=True))
+            return next(chunks, None), chunks
+
+        first, chunks = self._call(start, keep_slot=True)
+        try:
+            if first is not None:
+                yield first
+            yield from chunks
+        finally:
+            self._release_slot()
+
+    def _call(self, attempt: Callable[[float], Any], keep_slot: bool = False) -> Any:
+        self._count("calls")
+        for number in range(self.max_retries + 1):
+            probe = self._admit()
+            try:
+                wait = self._reserve_token()
+                if wait:
+                    time.sleep(wait)
+                if not self._slots.acquire(timeout=self.timeout):
+                    self._count("rejected")
+                    raise RateLimitedError(f"No free Gemini slot within {self.timeout}s")
+            except BaseException:
+                self._abandon(probe)
+                raise
+            self._count("in_flight")
+            release = True
+            try:
+                result = attempt(self.timeout)
+            except Exception as e:
+                if not self._failed(e, number):
+                    raise
+            except BaseException:
+                self._abandon(probe)
+                raise
+            else:
+                self._succeeded()
+                release = not keep_slot
+                return result
+            finally:
+                if release:
+                    self._release_slot()
+            time.sleep(self._backoff(number))
+
+    async def _call_async(self, attempt: Callable[[float], Awaitable[Any]]) -> Any:
+        self._count("calls")
+        for number in range(self.max_retries + 1):
+            probe = self._admit()
+            try:
+                wait = self._reserve_token()
+                if wait:
+                    await asyncio.sleep(wait)
+                # Slots are shared with threaded callers, so poll the semaphore rather than block the loop
+                deadline = time.monotonic() + self.timeout
+                while not self._slots.acquire(blocking=False):
+                    if time.monotonic() >= deadline:
+                        self._count("rejected")
+                        raise RateLimitedError(f"No free Gemini slot within {self.timeout}s")
+                    await asyncio.sleep(0.005)
+            except BaseException:
+                # Includes cancellation while throttled or waiting for a slot
+                self._abandon(probe)
+                raise
+            self._count("in_flight")
+            try:
+                result = await asyncio.wait_for(attempt(self.timeout), self.timeout)
+            except Exception as e:
+                if not self._failed(e, number):
+                    raise
+            except BaseException:
+                self._abandon(probe)
+                raise
+            else:
+                self._succeeded()
+                return result
+            finally:
+                self._release_slot()
+            await asyncio.sleep(self._backoff(number))
+
+    def _admit(self) -> bool:
+        """Pass the circuit breaker; True if this attempt is its half-open probe"""
+        probe = self.breaker.admit()
+        if probe is None:
+            self._count("rejected")
+            raise CircuitOpenError("Gemini circuit breaker is open")
+        return probe
+
+    def _abandon(self, probe: bool):
+        """An attempt ended without a verdict on the backend (rate limited, cancelled)"""
+        if probe:
+            self.breaker.abandon_probe()
+
+    def _reserve_token(self) -> float:
+        wait = self.bucket.reserve(max_wait=self.timeout)
+        if wait is None:
+            self._count("rejected")
+            raise RateLimitedError(f"Gemini rate limit would delay the call beyond {self.timeout}s")
+        if wait:
+            with self._stats_lock:
+                self._counters["throttled"] += 1
+                self._throttle_wait_s += wait
+        return wait
+
+    def _release_slot(self):
+        self._slots.release()
+        with self._stats_lock:
+            self._counters["in_flight"] -= 1
+
+    def _failed(self, error: Exception, number: int) -> bool:
+        """Record a failed attempt; True if it should be retried"""
+        retryable = is_retryable(error)
+        with self._stats_lock:
+            self._counters["timeouts"] += isinstance(error, TimeoutError)
+            self._counters["quota_errors"] += getattr(error, "code", None) == 429
+        if retryable:
+            self.breaker.record_failure()
+        else:
+            # The backend answered, it just rejected this request
+            self.breaker.record_success()
+        if retryable and number < self.max_retries:
+            self._count("retries")
+            return True
+        self._count("failures")
+        return False
+
+    def _succeeded(self):
+        self.breaker.record_success()
+        self._count("successes")
+
+    def _backoff(self, number: int) -> float:
+        """Full jitter: uniform between zero and the capped exponential delay"""
+        return self._random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** number))
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._counters[name] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            counters = dict(self._counters)
+            throttle_wait_s = self._throttle_wait_s
+        return {
+            "backend": self.backend.name,
+            **counters,
+            "throttle_wait_ms": round(throttle_wait_s * 1000, 1),
+            "breaker": self.breaker.state,
+            "breaker_trips": self.breaker.trips,
+            "max_concurrency": self.max_concurrency,
+            "requests_per_minute": round(self.bucket.rate * 60, 1)
+        }
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_gemini_client() -> GeminiClient:
+    """Return the process-wide Gemini client (TUTOR_GEMINI_BACKEND=stub for an offline backend)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = GeminiClient(backend=StubBackend() if BACKEND == "stub" else GeminiBackend())
+                metrics.register("gemini", _client.stats)
+    return _client
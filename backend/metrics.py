@@ -0,0 +1,27 @@
+from typing import Any, Callable, Dict
+import threading
+
+class MetricsRegistry:
+    """Named stats providers collected by the /metrics endpoint"""
+
+    def __init__(self):
+        self._providers = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, provider: Callable[[], Dict[str, Any]]):
+        """Register a callable that returns a JSON-serialisable stats dict"""
+        with self._lock:
+            self._providers[name] = provider
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            providers = dict(self._providers)
+        snapshot = {}
+        for name, provider in providers.items():
+            try:
+                snapshot[name] = provider()
+            except Exception as e:
+                snapshot[name] = {"error": str(e)}
+        return snapshot
+
+metrics = MetricsRegistry()
@@ -0,0 +1,201 @@
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+from cache import normalize_query
+from generation import LOCAL_MODEL_NAME
+from metrics import metrics
+import os
+import re
+import threading
+
+DEFAULT_BUDGET = int(os.getenv("TUTOR_PROMPT_BUDGET", "512"))
+# Share of the variable budget query history may use; retrieved knowledge gets the rest
+HISTORY_SHARE = float(os.getenv("TUTOR_PROMPT_HISTORY_SHARE", "0.25"))
+# A chunk cut shorter than this is dropped instead
+MIN_CHUNK_TOKENS = 16
+
+_APPROXIMATE_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+class LocalTokenizer:
+    """Counts tokens with the local model's tokenizer, without a network round trip.
+
+    The tokenizer is loaded on first use. When transformers or the tokenizer files are
+    unavailable (or model_name is None), a word-and-punctuation split stands in, which
+    tracks BPE counts closely enough for budgeting.
+    """
+
+    def __init__(self, model_name: str = LOCAL_MODEL_NAME):
+        self.model_name = model_name
+        self._tokenizer = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded and self.model_name is not None:
+                    try:
+                        from transformers import AutoTokenizer
+                        self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+                    except Exception as e:
+                        print(f"Tokenizer for {self.model_name} unavailable, approximating token counts: {e}")
+                self._loaded = True
+        return self._tokenizer
+
+    @property
+    def name(self) -> str:
+        if not self._loaded:
+            return "not loaded"
+        return self.model_name if self._tokenizer is not None else "approximate"
+
+    def count(self, text: str, cached: bool = True) -> int:
+        """Token count of text; pass cached=False for one-off text such as a whole prompt"""
+        return _count_tokens(self, text) if cached else self._count(text)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """The longest prefix of text that fits in max_tokens"""
+        if max_tokens <= 0:
+            return ""
+        tokenizer = self._load()
+        if tokenizer is not None:
+            ids = tokenizer.encode(text)
+            return text if len(ids) <= max_tokens else tokenizer.decode(ids[:max_tokens]).rstrip()
+        matches = list(_APPROXIMATE_TOKEN.finditer(text))
+        return text if len(matches) <= max_tokens else text[:matches[max_tokens - 1].end()]
+
+    def _count(self, text: str) -> int:
+        tokenizer = self._load()
+        if tokenizer is not None:
+            return len(tokenizer.encode(text))
+        return len(_APPROXIMATE_TOKEN.findall(text))
+
+# RAG chunks and history entries repeat across requests, so their counts are memoised
+@lru_cache(maxsize=4096)
+def _count_tokens(tokenizer: LocalTokenizer, text: str) -> int:
+    return tokenizer._count(text)
+
+prompt_tokenizer = LocalTokenizer()
+
+class PromptStats:
+    """Per-agent prompt sizes, with what the unbudgeted prompt would have cost"""
+
+    def __init__(self):
+        self.prompts = 0
+        self.tokens = 0
+        self.unbudgeted_tokens = 0
+        self.trimmed = 0
+        self.duplicate_chunks = 0
+        self.dropped_chunks = 0
+        self.dropped_history = 0
+        self._lock = threading.Lock()
+
+    def record(self, tokens: int, unbudgeted_tokens: int, duplicate_chunks: int, dropped_chunks: int,
+               dropped_history: int, trimmed: bool):
+        with self._lock:
+            self.prompts += 1
+            self.tokens += tokens
+            self.unbudgeted_tokens += unbudgeted_tokens
+            self.trimmed += trimmed
+            self.duplicate_chunks += duplicate_chunks
+            self.dropped_chunks += dropped_chunks
+            self.dropped_history += dropped_history
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            prompts, tokens, unbudgeted = self.prompts, self.tokens, self.unbudgeted_tokens
+            return {
+                "prompts": prompts,
+                "avg_tokens": round(tokens / prompts, 1) if prompts else 0.0,
+                "avg_unbudgeted_tokens": round(unbudgeted / prompts, 1) if prompts else 0.0,
+                "reduction": round(1 - tokens / unbudgeted, 4) if unbudgeted else 0.0,
+                "trimmed_prompts": self.trimmed,
+                "duplicate_chunks_removed": self.duplicate_chunks,
+                "chunks_dropped": self.dropped_chunks,
+                "history_dropped": self.dropped_history
+            }
+
+class PromptBuilder:
+    """Builds an agent's prompt within a token budget.
+
+    The agent's instructions come first and never change, so every prompt of an agent
+    starts with the same bytes and a provider can reuse its prefix. After them come the
+    recent queries, the retrieved knowledge and the query itself. The query is always
+    kept whole; history (most recent first) may use up to HISTORY_SHARE of what is left,
+    and knowledge chunks fill the rest in retrieval order after duplicates are removed,
+    with the last one cut to fit.
+    """
+
+    def __init__(self, subject: str, instructions: str, budget: int = None, tokenizer: LocalTokenizer = None):
+        self.subject = subject
+        self.prefix = instructions.strip() + "\n"
+        self.budget = budget or int(os.getenv(f"TUTOR_PROMPT_BUDGET_{subject.upper()}", DEFAULT_BUDGET))
+        self.tokenizer = tokenizer or prompt_tokenizer
+        self.stats = PromptStats()
+        _builders[subject] = self
+
+    def build(self, query: str, history: List[dict], rag_context: str) -> str:
+        count = self.tokenizer.count
+        query_line = f"Query: {query}\n"
+        query_tokens = count(query_line, cached=False)
+        available = self.budget - count(self.prefix) - query_tokens
+
+        raw_entries = [f"{h['query']} ({h['subject']})" for h in history]
+        entries = list(dict.fromkeys(raw_entries))
+        history_line, kept_history = self._fit_history(entries, int(max(available, 0) * HISTORY_SHARE))
+        available -= count(history_line) if history_line else 0
+
+        chunks = [chunk.strip() for chunk in rag_context.split("\n") if chunk.strip()] if rag_context else []
+        unique = list({normalize_query(chunk): chunk for chunk in chunks}.values())
+        knowledge, kept_chunks, cut = self._fit_knowledge(unique, available)
+
+        prompt = self.prefix + history_line + knowledge + query_line
+        unbudgeted = count(self.prefix) + query_tokens + sum(count(entry) for entry in raw_entries) + sum(count(chunk) for chunk in chunks)
+        dropped_chunks = len(unique) - kept_chunks
+        dropped_history = len(raw_entries) - kept_history
+        self.stats.record(
+            count(prompt, cached=False), unbudgeted, len(chunks) - len(unique), dropped_chunks, dropped_history,
+            trimmed=bool(dropped_chunks or dropped_history or cut)
+        )
+        return prompt
+
+    def _fit_history(self, entries: List[str], limit: int) -> Tuple[str, int]:
+        count = self.tokenizer.count
+        label = "Recent queries: "
+        used = count(label) + 1
+        kept = []
+        for entry in entries:
+            cost = count(entry) + 1
+            if used + cost > limit:
+                break
+            kept.append(entry)
+            used += cost
+        return (label + "; ".join(kept) + "\n" if kept else ""), len(kept)
+
+    def _fit_knowledge(self, chunks: List[str], limit: int) -> Tuple[str, int, bool]:
+        count = self.tokenizer.count
+        label = "Relevant knowledge:\n"
+        used = count(label)
+        kept = []
+        cut = False
+        for chunk in chunks:
+            cost = count(chunk) + 1
+            if used + cost <= limit:
+                kept.append(chunk)
+                used += cost
+                continue
+            room = limit - used - 1
+            if room >= MIN_CHUNK_TOKENS:
+                kept.append(self.tokenizer.truncate(chunk, room))
+                cut = True
+            break
+        return (label + "".join(f"{chunk}\n" for chunk in kept) if kept else ""), len(kept), cut
+
+_builders: Dict[str, PromptBuilder] = {}
+
+def prompt_stats() -> Dict[str, Any]:
+    """Prompt size per agent, before and after budgeting"""
+    return {
+        "tokenizer": prompt_tokenizer.name,
+        "agents": {subject: {"budget": builder.budget, **builder.stats.snapshot()} for subject, builder in list(_builders.items())}
+    }
+
+metrics.register("prompts", prompt_stats)
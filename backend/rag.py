@@ -1,17 +1,234 @@
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from cache import TTLCache, normalize_query
+from metrics import metrics
+import hashlib
 import json
 import os
+import threading
+import numpy as np
+
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+KNOWLEDGE_BASE_PATH = os.path.join(os.path.dirname(__file__), "db/knowledge_base.json")
+INDEX_DIR = os.getenv("TUTOR_VECTOR_INDEX_DIR", os.path.join(os.path.dirname(__file__), "db/vector_index"))
+MANIFEST_FILE = "manifest.json"
+CACHE_SIZE = int(os.getenv("TUTOR_RAG_CACHE_SIZE", "1024"))
+CACHE_TTL = float(os.getenv("TUTOR_RAG_CACHE_TTL", "3600"))
+
+def document_hash(content: str) -> str:
+    """Stable docstore id for a knowledge base entry"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+class RetrievalService:
+    """Embedding model and vector index shared by every agent in the process"""
+
+    def __init__(self, knowledge_base_path: str = KNOWLEDGE_BASE_PATH, model_name: str = EMBEDDING_MODEL_NAME,
+                 index_dir: str = INDEX_DIR):
+        self.knowledge_base_path = knowledge_base_path
+        self.model_name = model_name
+        self.index_dir = index_dir
+        self._embeddings = None
+        self._vector_store = None
+        self.index_version = 0
+        self.knowledge_base_fingerprint = None
+        self._change_listeners = []
+        # Query embeddings are keyed by normalised text, contexts by (text, k)
+        self.embedding_cache = TTLCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL)
+        self.context_cache = TTLCache(maxsize=CACHE_SIZE, ttl=CACHE_TTL)
+        # Re-entrant because building the index needs the embedding model
+        self._lock = threading.RLock()
+
+    @property
+    def embeddings(self):
+        """Load the embedding model on first use"""
+        if self._embeddings is None:
+            with self._lock:
+                if self._embeddings is None:
+                    # langchain and sentence-transformers are only imported when retrieval is first needed
+                    from langchain_community.embeddings import HuggingFaceEmbeddings
+                    self._embeddings = HuggingFaceEmbeddings(model_name=self.model_name)
+        return self._embeddings
+
+    @property
+    def vector_store(self):
+        """Build the vector index on first use"""
+        if self._vector_store is None:
+            with self._lock:
+                if self._vector_store is None:
+                    self._set_vector_store(self._build_index())
+        return self._vector_store
+
+    def reload(self):
+        """Re-sync the index with the knowledge base file"""
+        with self._lock:
+            self._set_vector_store(self._build_index())
+
+    def _set_vector_store(self, vector_store):
+        fingerprint = hashlib.sha256("".join(sorted(vector_store.index_to_docstore_id.values())).encode("utf-8")).hexdigest()
+        changed = self.knowledge_base_fingerprint is not None and fingerprint != self.knowledge_base_fingerprint
+        self._vector_store = vector_store
+        self.index_version += 1
+        self.knowledge_base_fingerprint = fingerprint
+        # Contexts are only valid for the index they were retrieved from
+        self.context_cache.clear()
+        if changed:
+            for listener in list(self._change_listeners):
+                try:
+                    listener()
+                except Exception as e:
+                    print(f"Knowledge base change listener failed: {e}")
+
+    def add_change_listener(self, listener):
+        """Call listener() whenever a reload changes the knowledge base documents"""
+        self._change_listeners.append(listener)
+
+    def _load_documents(self) -> dict:
+        """Read the knowledge base as {hash: content}, dropping duplicate entries"""
+        with open(self.knowledge_base_path, "r") as f:
+            documents = json.load(f)
+        return {document_hash(doc["content"]): doc["content"] for doc in documents}
+
+    def _build_index(self):
+        """Load the saved index and bring it in line with the knowledge base"""
+        from langchain_community.vectorstores import FAISS
+        documents = self._load_documents()
+        vector_store = self._load_saved_index()
+
+        if vector_store is None:
+            vector_store = FAISS.from_texts(list(documents.values()), self.embeddings, ids=list(documents.keys()))
+        else:
+            indexed = set(vector_store.index_to_docstore_id.values())
+            removed = [doc_id for doc_id in indexed if doc_id not in documents]
+            added = [doc_id for doc_id in documents if doc_id not in indexed]
+            if not added and not removed:
+                return vector_store
+            if len(removed) == len(indexed):
+                vector_store = FAISS.from_texts(list(documents.values()), self.embeddings, ids=list(documents.keys()))
+            else:
+                if removed:
+                    vector_store.delete(removed)
+                if added:
+                    vector_store.add_texts([documents[doc_id] for doc_id in added], ids=added)
+            print(f"RAG index updated: {len(added)} added, {len(removed)} removed")
+
+        self._save_index(vector_store)
+        return vector_store
+
+    def _load_saved_index(self):
+        """Return the index saved by a previous process, or None if it is missing or stale"""
+        manifest_path = os.path.join(self.index_dir, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+            if manifest.get("model_name") != self.model_name:
+                return None
+            from langchain_community.vectorstores import FAISS
+            # The pickle is only ever written by this service
+            return FAISS.load_local(self.index_dir, self.embeddings, allow_dangerous_deserialization=True)
+        except Exception as e:
+            print(f"Could not load saved RAG index: {e}")
+            return None
+
+    def _save_index(self, vector_store):
+        try:
+            manifest_path = os.path.join(self.index_dir, MANIFEST_FILE)
+            os.makedirs(self.index_dir, exist_ok=True)
+            # The manifest is removed first and written last so a partial save is never loaded
+            if os.path.exists(manifest_path):
+                os.remove(manifest_path)
+            vector_store.save_local(self.index_dir)
+            with open(manifest_path, "w") as f:
+                json.dump({"model_name": self.model_name, "documents": len(vector_store.index_to_docstore_id)}, f)
+        except Exception as e:
+            print(f"Could not save RAG index: {e}")
+
+    def embed_query(self, query: str) -> list:
+        """Embed a query, reusing the vector for repeated questions"""
+        key = normalize_query(query)
+        embedding = self.embedding_cache.get(key)
+        if embedding is None:
+            embedding = self.embeddings.embed_query(key)
+            self.embedding_cache.set(key, embedding)
+        return embedding
+
+    def embed_queries(self, queries: list) -> list:
+        """Embed many queries in one padded batch, skipping ones already cached"""
+        keys = [normalize_query(q) for q in queries]
+        embeddings = [self.embedding_cache.get(key) for key in keys]
+        missing = list(dict.fromkeys(key for key, emb in zip(keys, embeddings) if emb is None))
+        if missing:
+            computed = dict(zip(missing, self.embeddings.embed_documents(missing)))
+            for key, embedding in computed.items():
+                self.embedding_cache.set(key, embedding)
+            embeddings = [emb if emb is not None else computed[key] for key, emb in zip(keys, embeddings)]
+        return embeddings
+
+    def retrieve_context(self, query: str, k: int = 3) -> str:
+        key = (normalize_query(query), k)
+        context = self.context_cache.get(key)
+        if context is not None:
+            return context
+
+        vector_store = self.vector_store
+        version = self.index_version
+        results = vector_store.similarity_search_by_vector(self.embed_query(query), k=k)
+        context = "\n".join([res.page_content for res in results])
+        # Skip caching if the index was reloaded while we were searching
+        if version == self.index_version:
+            self.context_cache.set(key, context)
+        return context
+
+    def retrieve_context_batch(self, queries: list, k: int = 3) -> list:
+        """Retrieve contexts for many queries with one embedding pass and one index search"""
+        keys = [normalize_query(q) for q in queries]
+        contexts = {}
+        for key in dict.fromkeys(keys):
+            context = self.context_cache.get((key, k))
+            if context is not None:
+                contexts[key] = context
+
+        missing = [key for key in dict.fromkeys(keys) if key not in contexts]
+        if missing:
+            vector_store = self.vector_store
+            version = self.index_version
+            vectors = np.asarray(self.embed_queries(missing), dtype=np.float32)
+            if getattr(vector_store, "_normalize_L2", False):
+                import faiss
+                faiss.normalize_L2(vectors)
+            _, indices = vector_store.index.search(vectors, k)
+            for key, row in zip(missing, indices):
+                docs = [vector_store.docstore.search(vector_store.index_to_docstore_id[i]) for i in row if i != -1]
+                context = "\n".join([doc.page_content for doc in docs])
+                contexts[key] = context
+                if version == self.index_version:
+                    self.context_cache.set((key, k), context)
+
+        return [contexts[key] for key in keys]
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_retrieval_service() -> RetrievalService:
+    """Return the process-wide retrieval service"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = RetrievalService()
+                metrics.register("rag_embedding_cache", _service.embedding_cache.stats)
+                metrics.register("rag_context_cache", _service.context_cache.stats)
+    return _service
 
 def setup_rag():
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    knowledge_base_path = os.path.join(os.path.dirname(__file__), "db/knowledge_base.json")
-    with open(knowledge_base_path, "r") as f:
-        documents = json.load(f)
-    texts = [doc["content"] for doc in documents]
-    vector_store = FAISS.from_texts(texts, embeddings)
-    return vector_store
-
-def retrieve_context(query, vector_store):
-    results = vector_store.similarity_search(query, k=3)
-    return "\n".join([res.page_content for res in results])
\ No newline at end of file
+    """Return the shared vector store (builds it once per process)"""
+    return get_retrieval_service().vector_store
+
+def retrieve_context(query, vector_store=None, k=3):
+    if vector_store is None:
+        return get_retrieval_service().retrieve_context(query, k=k)
+    results = vector_store.similarity_search(query, k=k)
+    return "\n".join([res.page_content for res in results])
+
+def retrieve_context_batch(queries, k=3):
+    """Return one context string per query, in input order"""
+    return get_retrieval_service().retrieve_context_batch(queries, k=k)
@@ -0,0 +1,65 @@
+from typing import Any, Callable, Dict
+import os
+import threading
+import time
+
+WARMUP = os.getenv("TUTOR_WARMUP", "1") == "1"
+
+class Readiness:
+    """Warms the heavy components in the background and reports when they are loaded.
+
+    /health only says the process is up. /ready turns true once every registered warm-up
+    step has finished, so a load balancer can hold traffic until the first request is fast.
+    A step that fails is reported and leaves the process not ready.
+    """
+
+    def __init__(self):
+        self._steps = {}
+        self._state = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._started_at = time.perf_counter()
+
+    def add(self, name: str, warm: Callable[[], Any]):
+        """Register a warm-up step; steps run in registration order"""
+        with self._lock:
+            self._steps[name] = warm
+            self._state[name] = {"status": "pending"}
+
+    def start(self):
+        """Run the warm-up steps on a daemon thread (once)"""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        with self._lock:
+            steps = list(self._steps.items())
+        for name, warm in steps:
+            start = time.perf_counter()
+            try:
+                warm()
+                state = {"status": "ready"}
+            except Exception as e:
+                print(f"Warm-up of {name} failed: {e}")
+                state = {"status": "failed", "error": str(e)}
+            state["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            with self._lock:
+                self._state[name] = state
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return all(state["status"] == "ready" for state in self._state.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            components = {name: dict(state) for name, state in self._state.items()}
+        return {
+            "ready": all(state["status"] == "ready" for state in components.values()),
+            "uptime_s": round(time.perf_counter() - self._started_at, 1),
+            "components": components
+        }
+
+readiness = Readiness()
@@ -0,0 +1,139 @@
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from metrics import metrics
+import asyncio
+import threading
+
+class SingleFlight:
+    """Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) runs the work; callers arriving while it is
+    in flight wait for the leader's result, or its exception, instead of repeating the
+    work. Once the leader finishes the key is released, so later calls run afresh.
+    do() serves threads and do_async() serves coroutines; they keep separate flights.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, Future] = {}
+        self._async_calls: Dict[Hashable, asyncio.Future] = {}
+        self._async_callers: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self._leaders = 0
+        self._coalesced = 0
+        self._max_waiters = 0
+        self._waiters: Dict[Tuple[str, Hashable], int] = {}
+
+    def do(self, key: Hashable, work: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Return (result, shared); shared is True when another caller's result was reused"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            self._join("sync", key, leader)
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = work()
+        except BaseException as e:
+            self._release("sync", key)
+            future.set_exception(e)
+            raise
+        self._release("sync", key)
+        future.set_result(result)
+        return result, False
+
+    async def do_async(self, key: Hashable, work: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Coroutine version of do().
+
+        The work runs in its own task that every caller, the leader included, awaits through
+        shield(), so cancelling any one caller leaves the others waiting. The task is only
+        cancelled once every caller for the key has been cancelled.
+        """
+        with self._lock:
+            task = self._async_calls.get(key)
+            leader = task is None
+            if leader:
+                task = asyncio.ensure_future(work())
+                self._async_calls[key] = task
+                self._async_callers[key] = 0
+                task.add_done_callback(lambda done: self._finish_async(key, done))
+            self._async_callers[key] += 1
+            self._join("async", key, leader)
+        try:
+            return await asyncio.shield(task), not leader
+        except asyncio.CancelledError:
+            if not task.done():
+                self._leave_async(key, task)
+            raise
+
+    def _leave_async(self, key: Hashable, task: asyncio.Future):
+        with self._lock:
+            if self._async_calls.get(key) is not task:
+                return
+            self._async_callers[key] -= 1
+            abandoned = self._async_callers[key] == 0
+            if abandoned:
+                # Later calls start afresh rather than joining work that is being cancelled
+                del self._async_calls[key], self._async_callers[key]
+                self._waiters.pop(("async", key), None)
+        if abandoned:
+            task.cancel()
+
+    def _finish_async(self, key: Hashable, task: asyncio.Future):
+        with self._lock:
+            if self._async_calls.get(key) is task:
+                del self._async_calls[key], self._async_callers[key]
+                self._waiters.pop(("async", key), None)
+        # Marks the exception retrieved when nobody was waiting for it
+        if not task.cancelled():
+            task.exception()
+
+    def _join(self, kind: str, key: Hashable, leader: bool):
+        if leader:
+            self._leaders += 1
+            self._waiters[kind, key] = 0
+        else:
+            self._coalesced += 1
+            self._waiters[kind, key] += 1
+            self._max_waiters = max(self._max_waiters, self._waiters[kind, key])
+
+    def _release(self, kind: str, key: Hashable):
+        with self._lock:
+            (self._calls if kind == "sync" else self._async_calls).pop(key, None)
+            self._waiters.pop((kind, key), None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            leaders, coalesced = self._leaders, self._coalesced
+            in_flight = len(self._calls) + len(self._async_calls)
+            max_waiters = self._max_waiters
+        requests = leaders + coalesced
+        return {
+            "requests": requests,
+            "executed": leaders,
+            "coalesced": coalesced,
+            "coalesced_rate": round(coalesced / requests, 4) if requests else 0.0,
+            "max_waiters": max_waiters,
+            "in_flight": in_flight
+        }
+
+_flights: Dict[str, SingleFlight] = {}
+_flights_lock = threading.Lock()
+
+def get_single_flight(name: str) -> SingleFlight:
+    """Return the process-wide flight group for name; all groups report as one metric"""
+    with _flights_lock:
+        if name not in _flights:
+            _flights[name] = SingleFlight(name)
+        return _flights[name]
+
+def single_flight_stats() -> Dict[str, Any]:
+    with _flights_lock:
+        flights = dict(_flights)
+    return {name: flight.stats() for name, flight in flights.items()}
+
+metrics.register("single_flight", single_flight_stats)
@@ -0,0 +1,95 @@
+import unittest
+import time
+from answer_cache import SemanticAnswerCache
+from rag import RetrievalService
+
+VOCABULARY = ["what", "is", "newton", "second", "law", "photosynthesis", "explain", "entropy", "the", "of"]
+
+def bag_of_words(text: str) -> list:
+    """A deterministic stand-in for the sentence embedding model"""
+    words = text.replace("?", "").split()
+    return [float(words.count(word)) for word in VOCABULARY]
+
+def result(answer: str) -> dict:
+    return {"agent": "physics", "tool_used": "language_model", "query": "", "answer": answer, "confidence": 0.75}
+
+class TestSemanticAnswerCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = SemanticAnswerCache(embed=bag_of_words, threshold=0.9, max_entries=2, ttl=60)
+
+    def test_similar_question_hits(self):
+        self.cache.store("What is Newton second law?", "physics", result("F = ma"))
+        hit = self.cache.lookup("what is the newton second law", "physics")
+        self.assertIsNotNone(hit)
+        self.assertEqual(hit["answer"], "F = ma")
+        self.assertTrue(hit["cached"])
+        self.assertEqual(hit["query"], "what is the newton second law")
+        self.assertGreaterEqual(hit["cache_similarity"], 0.9)
+
+    def test_different_question_misses(self):
+        self.cache.store("What is Newton second law?", "physics", result("F = ma"))
+        self.assertIsNone(self.cache.lookup("explain entropy", "physics"))
+        self.assertEqual(self.cache.stats()["misses"], 1)
+
+    def test_numbers_and_operators_must_match(self):
+        self.cache.store("explain entropy of 2 + 3", "physics", result("five"))
+        self.assertIsNone(self.cache.lookup("explain entropy of 2 + 4", "physics"))
+        self.assertIsNone(self.cache.lookup("explain entropy of 2 * 3", "physics"))
+        self.assertEqual(self.cache.lookup("Explain entropy of 2+3?", "physics")["answer"], "five")
+
+    def test_different_numbers_are_stored_separately(self):
+        self.cache.store("explain entropy of 2", "physics", result("two"))
+        self.cache.store("explain entropy of 3", "physics", result("three"))
+        self.assertEqual(self.cache.lookup("explain entropy of 2", "physics")["answer"], "two")
+        self.assertEqual(self.cache.stats()["size"], {"physics": 2})
+
+    def test_subjects_are_isolated(self):
+        self.cache.store("explain entropy", "physics", result("disorder"))
+        self.assertIsNone(self.cache.lookup("explain entropy", "chemistry"))
+
+    def test_entries_expire(self):
+        cache = SemanticAnswerCache(embed=bag_of_words, threshold=0.9, max_entries=2, ttl=0.05)
+        cache.store("explain entropy", "physics", result("disorder"))
+        time.sleep(0.1)
+        self.assertIsNone(cache.lookup("explain entropy", "physics"))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.store("explain entropy", "physics", result("disorder"))
+        self.cache.store("explain photosynthesis", "physics", result("light to sugar"))
+        self.cache.lookup("explain entropy", "physics")
+        self.cache.store("newton second law", "physics", result("F = ma"))
+        self.assertIsNotNone(self.cache.lookup("explain entropy", "physics"))
+        self.assertIsNone(self.cache.lookup("explain photosynthesis", "physics"))
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_near_duplicate_replaces_entry(self):
+        self.cache.store("explain entropy", "physics", result("old"))
+        self.cache.store("Explain entropy?", "physics", result("new"))
+        self.assertEqual(self.cache.lookup("explain entropy", "physics")["answer"], "new")
+        self.assertEqual(self.cache.stats()["size"], {"physics": 1})
+
+    def test_embedding_failure_is_a_miss(self):
+        def broken(text):
+            raise RuntimeError("model unavailable")
+        cache = SemanticAnswerCache(embed=broken)
+        cache.store("explain entropy", "physics", result("disorder"))
+        self.assertIsNone(cache.lookup("explain entropy", "physics"))
+        self.assertEqual(cache.stats()["errors"], 2)
+
+    def test_knowledge_base_change_invalidates(self):
+        class FakeStore:
+            def __init__(self, ids):
+                self.index_to_docstore_id = dict(enumerate(ids))
+
+        service = RetrievalService()
+        service.add_change_listener(self.cache.invalidate)
+        self.cache.store("explain entropy", "physics", result("disorder"))
+        service._set_vector_store(FakeStore(["a", "b"]))
+        service._set_vector_store(FakeStore(["b", "a"]))
+        self.assertIsNotNone(self.cache.lookup("explain entropy", "physics"))
+        service._set_vector_store(FakeStore(["a", "b", "c"]))
+        self.assertIsNone(self.cache.lookup("explain entropy", "physics"))
+        self.assertEqual(self.cache.stats()["invalidations"], 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from tools.general_tools.answer_comparator import AnswerComparator
+
+class TestAnswerComparator(unittest.TestCase):
+    def setUp(self):
+        self.comparator = AnswerComparator()
+
+    def test_numeric_match(self):
+        result = self.comparator.compare_answer("5.0", "5", "What is 2 + 3?")
+        self.assertTrue(result["is_correct"])
+
+    def test_numeric_mismatch_is_not_rescued_by_text_similarity(self):
+        result = self.comparator.compare_answer("10000", "1000", "What is 10^3?")
+        self.assertFalse(result["is_correct"])
+
+    def test_batch_mixed_submissions(self):
+        result = self.comparator.compare_batch(["4", " 4.0 ", "5", "four"], "4", "What is 2 + 2?")
+        self.assertTrue(result["success"])
+        self.assertEqual([r["is_correct"] for r in result["results"]], [True, True, False, False])
+        self.assertEqual(result["results"][1]["student_answer"], "4.0")
+
+    def test_out_of_range_number_does_not_fail_the_batch(self):
+        result = self.comparator.compare_answer("1e400", "4", "What is 2 + 2?")
+        self.assertTrue(result["success"])
+        self.assertFalse(result["is_correct"])
+        batch = self.comparator.compare_batch(["4", "1e400", "-1e400"], "4", "What is 2 + 2?")
+        self.assertTrue(batch["success"])
+        self.assertEqual([r["is_correct"] for r in batch["results"]], [True, False, False])
+
+    def test_batch_matches_single_comparison(self):
+        answers = ["A bond where electrons are shared", "ionic bond", "3"]
+        key = "A bond where electrons are shared between atoms"
+        batch = self.comparator.compare_batch(answers, key, "What is a covalent bond?")["results"]
+        for answer, result in zip(answers, batch):
+            single = self.comparator.compare_answer(answer, key, "What is a covalent bond?")
+            self.assertEqual(result["is_correct"], single["is_correct"])
+            self.assertEqual(result["similarity"], single["similarity"])
+
+    def test_fraction_and_decimal(self):
+        result = self.comparator.compare_answer("1/2", "0.5", "What is half?")
+        self.assertTrue(result["is_correct"])
+        self.assertEqual(result["tier"], "numeric")
+
+    def test_symbolic_equivalence(self):
+        result = self.comparator.compare_answer("2x+4", "4 + 2x", "Simplify 2(x + 2)")
+        self.assertTrue(result["is_correct"])
+        self.assertEqual(result["tier"], "symbolic")
+        result = self.comparator.compare_answer("x = 3", "3 = x", "Solve 2x + 4 = 10")
+        self.assertTrue(result["is_correct"])
+
+    def test_scaled_equation_matches(self):
+        for answer in ["2x = 6", "x/2 = 3/2", "6 = 2x", "0.5x = 1.5"]:
+            result = self.comparator.compare_answer(answer, "x = 3", "Solve 2x + 4 = 10")
+            self.assertTrue(result["is_correct"], answer)
+            self.assertEqual(result["tier"], "symbolic")
+        self.assertFalse(self.comparator.compare_answer("x^2 = 9", "x = 3", "Solve 2x + 4 = 10")["is_correct"])
+
+    def test_expression_is_not_an_equation(self):
+        for answer in ["x - 3", "3 - x"]:
+            result = self.comparator.compare_answer(answer, "x = 3", "Solve 2x + 4 = 10")
+            self.assertFalse(result["is_correct"], answer)
+        self.assertFalse(self.comparator.compare_answer("x = 3", "x - 3", "Simplify (x - 3)")["is_correct"])
+
+    def test_symbolic_mismatch(self):
+        result = self.comparator.compare_answer("2x+3", "2x+4", "Simplify 2(x + 2)")
+        self.assertFalse(result["is_correct"])
+
+    def test_text_answer_uses_token_similarity(self):
+        result = self.comparator.compare_answer(
+            "A bond where electrons are shared", "A bond where electrons are shared between atoms", "What is a covalent bond?"
+        )
+        self.assertTrue(result["is_correct"])
+        self.assertEqual(result["tier"], "token")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+import answer_cache
+import app as app_module
+import classifier
+import llm
+from db import database
+from llm import GeminiClient, StubBackend
+from rag import get_retrieval_service
+
+class CountingBackend(StubBackend):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+        self.calls_lock = threading.Lock()
+
+    def generate(self, prompt, generation_config, timeout, stream=False):
+        with self.calls_lock:
+            self.calls += 1
+        return super().generate(prompt, generation_config, timeout, stream)
+
+class TestQueryBatch(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        database.configure_db(os.path.join(self.tmpdir.name, "tutor.db"))
+        database.init_db()
+        classifier.classification_memo.memory.clear()
+        # Long enough for duplicates dispatched together to overlap
+        self.backend = CountingBackend(latency_ms=300)
+        stub = GeminiClient(backend=self.backend, requests_per_minute=0, max_retries=0)
+        self.patches = [
+            patch.object(llm, "_client", stub),
+            patch.object(answer_cache, "ENABLED", False),
+            patch.object(classifier.subject_classifier, "classify", return_value=("general", 0.99)),
+            patch("agents.request_context.retrieve_context", return_value="")
+        ]
+        for p in self.patches:
+            p.start()
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        classifier.classification_memo.memory.clear()
+        database.configure_db(database.DB_PATH)
+        self.tmpdir.cleanup()
+
+    def test_results_keep_input_order(self):
+        queries = [f"Why study topic {i}?" for i in range(6)]
+        response = self.client.post("/query/batch", json={"queries": queries, "user_id": "batch"})
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()["results"]
+        self.assertEqual([r["query"] for r in results], queries)
+        for query, result in zip(queries, results):
+            self.assertEqual(result["subject"], "general")
+            self.assertEqual(result["response"], f"Stub answer to: Query: {query}")
+
+    def test_duplicates_share_one_answer(self):
+        before = app_module.answer_flight.stats()["coalesced"]
+        queries = ["Why study history?"] * 4 + ["Why study art?"]
+        response = self.client.post("/query/batch", json={"queries": queries, "user_id": "batch"})
+        results = response.get_json()["results"]
+        self.assertEqual(len({r["response"] for r in results[:4]}), 1)
+        self.assertEqual(self.backend.calls, 2)
+        self.assertEqual(app_module.answer_flight.stats()["coalesced"] - before, 3)
+        # Every request is still logged for its user
+        self.assertEqual(len(database.get_query_history("batch", limit=10)), 5)
+
+    def test_batch_size_limit(self):
+        queries = ["Why?"] * (app_module.BATCH_MAX_ITEMS + 1)
+        response = self.client.post("/query/batch", json={"queries": queries})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.backend.calls, 0)
+
+    def test_rejects_empty_queries(self):
+        for body in ({"queries": []}, {"queries": ["ok", " "]}, {"queries": "Why?"}):
+            self.assertEqual(self.client.post("/query/batch", json=body).status_code, 400)
+
+class FakeStore:
+    def __init__(self, ids):
+        self.index_to_docstore_id = dict(enumerate(ids))
+
+class TestKnowledgeReload(unittest.TestCase):
+    def setUp(self):
+        self.service = get_retrieval_service()
+        self.saved = (self.service._vector_store, self.service.index_version, self.service.knowledge_base_fingerprint)
+        self.client = app_module.app.test_client()
+
+    def tearDown(self):
+        self.service._vector_store, self.service.index_version, self.service.knowledge_base_fingerprint = self.saved
+
+    def test_changed_knowledge_base_drops_cached_answers(self):
+        stores = [FakeStore(["a"]), FakeStore(["a", "b"])]
+        before = answer_cache.answer_cache.stats()["invalidations"]
+        with patch.object(self.service, "_build_index", side_effect=stores):
+            first = self.client.post("/knowledge/reload").get_json()
+            second = self.client.post("/knowledge/reload").get_json()
+        self.assertEqual(second["index_version"], first["index_version"] + 1)
+        self.assertNotEqual(second["fingerprint"], first["fingerprint"])
+        self.assertEqual(answer_cache.answer_cache.stats()["invalidations"], before + 1)
+
+    def test_reload_failure_is_reported(self):
+        with patch.object(self.service, "_build_index", side_effect=FileNotFoundError("knowledge_base.json")):
+            response = self.client.post("/knowledge/reload")
+        self.assertEqual(response.status_code, 500)
+        self.assertIn("knowledge_base.json", response.get_json()["error"])
+
+if __name__ == "__main__":
+    unittest.main()
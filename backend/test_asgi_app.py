@@ -0,0 +1,74 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import answer_cache
+import classifier
+import llm
+from agents.evaluation_agent import evaluation_solver
+from db import database
+from llm import GeminiClient, StubBackend
+
+# The asyncio serving mode is optional; quart is only needed to run it
+HAS_QUART = importlib.util.find_spec("quart") is not None
+if HAS_QUART:
+    from asgi_app import app
+
+@unittest.skipUnless(HAS_QUART, "quart is not installed")
+class TestAsgiApp(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        database.configure_db(os.path.join(self.tmpdir.name, "tutor.db"))
+        database.init_db()
+        classifier.classification_memo.memory.clear()
+        stub = GeminiClient(backend=StubBackend(latency_ms=0, reply="Stub answer"), requests_per_minute=0, max_retries=0)
+        self.patches = [
+            patch.object(llm, "_client", stub),
+            patch.object(answer_cache, "ENABLED", False),
+            patch.object(classifier.subject_classifier, "classify", return_value=("general", 0.99)),
+            patch("agents.request_context.retrieve_context", return_value="")
+        ]
+        for p in self.patches:
+            p.start()
+        self.client = app.test_client()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        classifier.classification_memo.memory.clear()
+        database.configure_db(database.DB_PATH)
+        self.tmpdir.cleanup()
+
+    async def test_query(self):
+        response = await self.client.post("/query", json={"query": "Why study history?", "user_id": "asgi"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(await response.get_json(), {"response": "Stub answer", "subject": "general"})
+        self.assertEqual(database.get_query_history("asgi", limit=1)[0]["subject"], "general")
+
+    async def test_query_requires_query(self):
+        response = await self.client.post("/query", json={})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_evaluate(self):
+        response = await self.client.post("/evaluate", json={
+            "query": "What is 2+2?", "student_answer": "4", "correct_answer": "4", "user_id": "asgi"
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("correct", (await response.get_json())["response"])
+
+    async def test_evaluate_reports_a_failed_comparison(self):
+        failure = {"query": "What is 2+2?", "success": False, "error": "comparison failed"}
+        with patch.object(evaluation_solver.answer_comparator, "compare_answer", return_value=failure):
+            response = await self.client.post("/evaluate", json={
+                "query": "What is 2+2?", "student_answer": "4", "correct_answer": "4", "user_id": "asgi"
+            })
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(await response.get_json(), {"error": "comparison failed"})
+
+    async def test_evaluate_requires_answers(self):
+        response = await self.client.post("/evaluate", json={"query": "What is 2+2?"})
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import time
+from cache import TTLCache, normalize_query
+
+class TestTTLCache(unittest.TestCase):
+    def test_hit_and_miss_counters(self):
+        cache = TTLCache(maxsize=4)
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_lru_eviction(self):
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+
+    def test_ttl_expiry(self):
+        cache = TTLCache(maxsize=2, ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        self.assertIsNone(cache.get("a"))
+
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("Solve x^2 + 5x + 6 = 0"), normalize_query("solve  x^2+5x+6=0"))
+        self.assertNotEqual(normalize_query("2 + 3"), normalize_query("2 + 4"))
+
+if __name__ == "__main__":
+    unittest.main()
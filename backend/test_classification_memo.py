@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import classifier
+import llm
+from cache import normalize_query
+from db import database
+from llm import GeminiClient, StubBackend
+
+def stub_client(**kwargs) -> GeminiClient:
+    return GeminiClient(backend=StubBackend(latency_ms=0, **kwargs), requests_per_minute=0, max_retries=0)
+
+class TestClassificationMemo(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        database.configure_db(os.path.join(self.tmpdir.name, "tutor.db"))
+        database.init_db()
+        classifier.classification_memo.memory.clear()
+        # The local classifier is unsure, so every query goes on to Gemini
+        self.uncertain = mock.patch.object(classifier.subject_classifier, "classify", return_value=("physics", 0.3))
+        self.uncertain.start()
+
+    def tearDown(self):
+        self.uncertain.stop()
+        classifier.classification_memo.memory.clear()
+        database.configure_db(database.DB_PATH)
+        self.tmpdir.cleanup()
+
+    def test_sqlite_tier_survives_memory_clear(self):
+        memo = classifier.ClassificationMemo()
+        memo.set(normalize_query("What is  2+2 ?"), "math")
+        memo.memory.clear()
+        self.assertEqual(memo.get(normalize_query("what is 2 + 2?")), "math")
+        self.assertEqual(memo.sqlite_hits, 1)
+
+    def test_gemini_label_is_memoised(self):
+        with mock.patch.object(llm, "_client", stub_client(reply="chemistry")):
+            self.assertEqual(classifier.classify_query("Tell me about salts"), "chemistry")
+        classifier.classification_memo.memory.clear()
+        self.assertEqual(database.get_cached_classification(normalize_query("tell me about salts")), "chemistry")
+
+    def test_failed_gemini_classification_is_not_memoised(self):
+        with mock.patch.object(llm, "_client", stub_client(error_rate=1.0)):
+            # Falls back to the uncertain local guess for this request only
+            self.assertEqual(classifier.classify_query("Tell me about waves"), "physics")
+        self.assertIsNone(classifier.classification_memo.get(normalize_query("Tell me about waves")))
+
+    def test_failed_batch_classification_is_not_memoised(self):
+        with mock.patch.object(llm, "_client", stub_client(error_rate=1.0)):
+            self.assertEqual(classifier.classify_queries(["Tell me about waves", "and sound"]), ["physics", "physics"])
+        self.assertIsNone(classifier.classification_memo.get("and sound"))
+
+if __name__ == "__main__":
+    unittest.main()
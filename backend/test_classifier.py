@@ -0,0 +1,42 @@
+import unittest
+from classifier import CONFIDENCE_THRESHOLD, SubjectClassifier, subject_classifier
+
+class NoEmbeddingsClassifier(SubjectClassifier):
+    def _get_centroids(self):
+        raise RuntimeError("embedding model unavailable")
+
+class TestSubjectClassifier(unittest.TestCase):
+    def test_math(self):
+        subject, confidence = subject_classifier.classify("Solve x^2 + 5x + 6 = 0")
+        self.assertEqual(subject, "math")
+        self.assertGreater(confidence, 0.0)
+
+    def test_chemistry(self):
+        subject, _ = subject_classifier.classify("What is the molar mass of H2SO4?")
+        self.assertEqual(subject, "chemistry")
+
+    def test_physics(self):
+        subject, _ = subject_classifier.classify("Current in resistance 10 ohm with voltage 5 V")
+        self.assertEqual(subject, "physics")
+
+    def test_evaluation(self):
+        subject, _ = subject_classifier.classify("Is my answer of 5 correct for 2 + 2?")
+        self.assertEqual(subject, "evaluation")
+
+class TestKeywordOnlyConfidence(unittest.TestCase):
+    def test_single_keyword_does_not_skip_gemini(self):
+        classifier = NoEmbeddingsClassifier()
+        for query in ["What does mean?", "base"]:
+            subject, confidence = classifier.classify(query)
+            self.assertGreater(confidence, 0.0)
+            self.assertLess(confidence, CONFIDENCE_THRESHOLD)
+
+    def test_missing_embeddings_are_logged_once(self):
+        classifier = NoEmbeddingsClassifier()
+        with self.assertLogs("classifier", level="WARNING") as logs:
+            classifier.classify("velocity of a car")
+            classifier.classify("molar mass of water")
+        self.assertEqual(len(logs.records), 1)
+
+if __name__ == "__main__":
+    unittest.main()
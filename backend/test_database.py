@@ -0,0 +1,102 @@
+import gc
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from db import database
+
+class TestDatabase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        database.configure_db(os.path.join(self.tmpdir.name, "tutor.db"))
+        database.init_db()
+
+    def tearDown(self):
+        database.configure_db(database.DB_PATH)
+        self.tmpdir.cleanup()
+
+    def test_wal_mode(self):
+        mode = database.get_connection().execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+    def test_history_index(self):
+        plan = database.get_connection().execute(
+            "EXPLAIN QUERY PLAN SELECT query, subject FROM queries WHERE user_id = ? ORDER BY timestamp DESC LIMIT 3",
+            ("test_user",)
+        ).fetchall()
+        self.assertIn("idx_queries_user_timestamp", " ".join(str(row) for row in plan))
+
+    def test_query_history_order(self):
+        for i in range(5):
+            database.save_query("test_user", f"query {i}", "math")
+        database.save_query("other_user", "other", "physics")
+        history = database.get_query_history("test_user", limit=3)
+        self.assertEqual([h["query"] for h in history], ["query 4", "query 3", "query 2"])
+
+    def test_write_behind_batches_and_drains(self):
+        writer = database.enable_write_behind(flush_size=10, flush_interval_ms=1000)
+        for i in range(25):
+            database.save_query("batch_user", f"query {i}", "math")
+        database.save_content("batch_user", "evaluation", "feedback")
+        self.assertTrue(writer.flush())
+        self.assertEqual(len(database.get_query_history("batch_user", limit=100)), 25)
+        self.assertEqual(writer.stats()["records_written"], 26)
+        database.save_query("batch_user", "last", "math")
+        database.disable_write_behind()
+        self.assertEqual(database.get_query_history("batch_user", limit=1)[0]["query"], "last")
+
+    def test_history_served_from_ring_buffer(self):
+        database.save_query("cached_user", "first", "math")
+        database.save_query("cached_user", "second", "physics")
+        self.assertEqual([h["query"] for h in database.get_query_history("cached_user", limit=3)], ["second", "first"])
+        hits = database.history_cache.hits
+        database.save_query("cached_user", "third", "chemistry")
+        history = database.get_query_history("cached_user", limit=3)
+        self.assertEqual([h["query"] for h in history], ["third", "second", "first"])
+        self.assertEqual(database.history_cache.hits, hits + 1)
+
+    def test_history_after_restart_falls_back_to_sqlite(self):
+        database.save_query("restart_user", "old", "math")
+        database.history_cache.clear()
+        database.save_query("restart_user", "new", "math")
+        history = database.get_query_history("restart_user", limit=3)
+        self.assertEqual([h["query"] for h in history], ["new", "old"])
+
+    def test_pending_writes_survive_a_full_reload(self):
+        for i in range(12):
+            database.save_query("overflow_user", f"query {i}", "math")
+        database.history_cache.clear()
+        writer = database.enable_write_behind(flush_size=1000, flush_interval_ms=60000)
+        database.save_query("overflow_user", "NEWEST", "math")
+        # SQLite holds a full buffer's worth of older rows while NEWEST is still queued
+        history = database.get_query_history("overflow_user", limit=3)
+        self.assertEqual([h["query"] for h in history], ["NEWEST", "query 11", "query 10"])
+        self.assertTrue(writer.flush())
+        database.disable_write_behind()
+        history = database.get_query_history("overflow_user", limit=3)
+        self.assertEqual([h["query"] for h in history], ["NEWEST", "query 11", "query 10"])
+
+    def test_connections_close_when_their_thread_ends(self):
+        manager = database.ConnectionManager(os.path.join(self.tmpdir.name, "threads.db"))
+        opened = []
+        threads = [threading.Thread(target=lambda: opened.append(manager.get_connection())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        gc.collect()
+        self.assertEqual(len(opened), 8)
+        self.assertEqual(manager.open_connections(), 0)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            opened[0].execute("SELECT 1")
+
+    def test_thread_keeps_its_connection(self):
+        manager = database.ConnectionManager(os.path.join(self.tmpdir.name, "threads.db"))
+        self.assertIs(manager.get_connection(), manager.get_connection())
+        self.assertEqual(manager.open_connections(), 1)
+        manager.close_all()
+        self.assertEqual(manager.open_connections(), 0)
+
+if __name__ == "__main__":
+    unittest.main()
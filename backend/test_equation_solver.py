@@ -0,0 +1,78 @@
+import unittest
+import numpy as np
+from tools.math_tools.equation_solver import EquationSolver, parse_linear_equation
+
+class TestLinearEquation(unittest.TestCase):
+    def setUp(self):
+        self.solver = EquationSolver()
+
+    def test_closed_form(self):
+        result = self.solver.solve_linear_equation("2x + 4 = 10")
+        self.assertEqual(result["solution"], "3")
+        self.assertEqual(result["variable"], "x")
+        self.assertEqual(result["method"], "linear")
+
+    def test_any_variable_and_exact_fractions(self):
+        result = self.solver.solve_linear_equation("3t - 7 = 0")
+        self.assertEqual(result["variable"], "t")
+        self.assertEqual(result["solution"], "7/3")
+
+    def test_parentheses(self):
+        self.assertEqual(self.solver.solve_linear_equation("2(y + 1) = 7")["solution"], "5/2")
+
+    def test_decimals_are_exact(self):
+        result = self.solver.solve_linear_equation("0.1x + 0.2 = 0.3")
+        self.assertEqual(result["solution"], "1")
+        self.assertEqual(result["method"], "linear")
+
+    def test_no_solution(self):
+        result = self.solver.solve_linear_equation("x + 1 = x + 2")
+        self.assertTrue(result["success"])
+        self.assertIsNone(result["solution"])
+        self.assertEqual(result["nature"], "No solution")
+
+    def test_infinitely_many_solutions(self):
+        result = self.solver.solve_linear_equation("2(x + 1) = 2x + 2")
+        self.assertIsNone(result["solution"])
+        self.assertEqual(result["nature"], "Infinitely many solutions")
+
+    def test_negative_probe_rejects_abs(self):
+        self.assertIsNone(parse_linear_equation("abs(x)=3"))
+        self.assertIsNone(parse_linear_equation("x^2=4"))
+        self.assertNotEqual(self.solver.solve_linear_equation("abs(x) = 3").get("method"), "linear")
+
+    def test_nonlinear_falls_back_to_sympy(self):
+        self.assertIsNone(parse_linear_equation("1/x=2"))
+        result = self.solver.solve_linear_equation("1/x = 2")
+        self.assertEqual(result["method"], "sympy")
+        self.assertEqual(result["solution"], "1/2")
+
+class TestLinearSystem(unittest.TestCase):
+    def setUp(self):
+        self.solver = EquationSolver()
+
+    def test_two_by_two(self):
+        result = self.solver.solve_linear_system(["2x + y = 5", "x - y = 1"])
+        self.assertTrue(result["success"])
+        self.assertAlmostEqual(result["solution"]["x"], 2.0)
+        self.assertAlmostEqual(result["solution"]["y"], 1.0)
+
+    def test_singular(self):
+        result = self.solver.solve_linear_system(["x + y = 2", "2x + 2y = 4"])
+        self.assertFalse(result["success"])
+        self.assertIn("no unique solution", result["error"])
+
+    def test_unknowns_must_match_equations(self):
+        self.assertFalse(self.solver.solve_linear_system(["x + y = 2"])["success"])
+
+    def test_large_matrix_system(self):
+        n = 300
+        matrix = np.eye(n) * 4 + np.eye(n, k=1) + np.eye(n, k=-1)
+        expected = np.arange(n, dtype=float)
+        result = self.solver.solve_matrix_system(matrix, matrix @ expected)
+        self.assertTrue(result["success"])
+        np.testing.assert_allclose(list(result["solution"].values()), expected, atol=1e-8)
+        self.assertLess(result["residual"], 1e-8)
+
+if __name__ == "__main__":
+    unittest.main()
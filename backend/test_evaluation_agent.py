@@ -38,5 +38,20 @@ class TestEvaluationAgent(unittest.TestCase):
         self.assertTrue(result["is_correct"])
         self.assertIn("Great job", result["feedback"])
 
+    def test_batch_evaluation(self):
+        result = self.agent.evaluate_batch(
+            query="What is 2 + 2?",
+            correct_answer="4",
+            submissions=[
+                {"user_id": "student_1", "student_answer": "4"},
+                {"user_id": "student_2", "student_answer": "5"},
+                {"user_id": "student_3", "student_answer": "4.0"}
+            ]
+        )
+        self.assertTrue(result["success"])
+        self.assertEqual([r["is_correct"] for r in result["results"]], [True, False, True])
+        self.assertEqual(result["correct_count"], 2)
+        self.assertIn("incorrect", result["results"][1]["feedback"])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+from tools.math_tools.calculator import BasicCalculator
+from tools.math_tools.expression_engine import clean_expression, compile_expression, evaluate, evaluate_vectorised
+
+class TestExpressionEngine(unittest.TestCase):
+    def test_arithmetic(self):
+        self.assertEqual(evaluate("15 + 23"), 38)
+        self.assertEqual(evaluate("2^10"), 1024)
+        self.assertEqual(evaluate("sqrt(16) + 3×2"), 10.0)
+
+    def test_aliases_only_rewrite_whole_names(self):
+        self.assertEqual(clean_expression("sin(x) + ln(x)"), "sin(x)+log(x)")
+        self.assertAlmostEqual(evaluate("ln(e)"), 1.0)
+        self.assertAlmostEqual(evaluate("log10(1000)"), 3.0)
+
+    def test_implicit_multiplication(self):
+        self.assertEqual(evaluate("2x + 1", x=3), 7)
+
+    def test_rejects_unsafe_input(self):
+        for expression in ["__import__('os')", "(1).real", "[1, 2]", "9**9**9", "'a' * 3"]:
+            with self.assertRaises(Exception):
+                evaluate(expression)
+
+    def test_power_result_size_is_bounded(self):
+        self.assertEqual(evaluate("2**60000"), 2 ** 60000)
+        for expression in ["2**70000", "(10**100)**1000", "(-3)**99999", "pow(9, 999999)"]:
+            with self.assertRaisesRegex(ValueError, "too large"):
+                evaluate(expression)
+        self.assertEqual(evaluate("1**1000000000"), 1)
+        self.assertEqual(evaluate("2**-3"), 0.125)
+
+    def test_compiled_expression_is_cached(self):
+        cleaned = clean_expression("3 * 7 + 1")
+        self.assertIs(compile_expression(cleaned), compile_expression(cleaned))
+
+    def test_vectorised_matches_scalar(self):
+        xs = np.linspace(-3, 3, 1001)
+        ys = evaluate_vectorised("sin(x)^2 + 2x", xs)
+        expected = [evaluate("sin(x)^2 + 2x", x=float(x)) for x in xs]
+        np.testing.assert_allclose(ys, expected)
+
+    def test_vectorised_constant(self):
+        np.testing.assert_array_equal(evaluate_vectorised("5", np.arange(3)), [5.0, 5.0, 5.0])
+
+    def test_vectorised_negative_integer_power(self):
+        xs = np.arange(1, 4)
+        np.testing.assert_allclose(evaluate_vectorised("2^-1 * x + x^-2", xs), [1.5, 1.25, 1.6111111111])
+        np.testing.assert_allclose(evaluate_vectorised("pow(2, -2)", xs), [0.25, 0.25, 0.25])
+
+class TestBasicCalculator(unittest.TestCase):
+    def test_error_is_reported(self):
+        result = BasicCalculator().evaluate_expression("1/0")
+        self.assertFalse(result["success"])
+        self.assertIn("division by zero", result["error"])
+
+    def test_table_of_values(self):
+        result = BasicCalculator().table_of_values("log(x)", 0, 2, 3)
+        self.assertTrue(result["success"])
+        self.assertEqual(result["x"], [0.0, 1.0, 2.0])
+        self.assertIsNone(result["y"][0])
+        self.assertEqual(result["y"][1], 0.0)
+
+if __name__ == "__main__":
+    unittest.main()
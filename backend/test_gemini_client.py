@@ -0,0 +1,159 @@
+import unittest
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from llm import (CircuitBreaker, CircuitOpenError, GeminiClient, RateLimitedError, StubBackend,
+                 StubBackendError, StubResponse, TokenBucket)
+
+class ScriptedBackend:
+    """Raises the scripted errors in order, then answers; tracks peak concurrency"""
+
+    name = "scripted"
+
+    def __init__(self, errors=(), latency: float = 0.0):
+        self.errors = list(errors)
+        self.latency = latency
+        self.calls = 0
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def load(self):
+        pass
+
+    def generate(self, prompt, generation_config, timeout, stream=False):
+        with self.lock:
+            self.calls += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            error = self.errors.pop(0) if self.errors else None
+        try:
+            time.sleep(self.latency)
+            if error:
+                raise error
+            return [StubResponse("a "), StubResponse("b")] if stream else StubResponse(prompt.upper())
+        finally:
+            with self.lock:
+                self.active -= 1
+
+    async def generate_async(self, prompt, generation_config, timeout):
+        await asyncio.sleep(self.latency)
+        return StubResponse(prompt.upper())
+
+def client(backend, **kwargs) -> GeminiClient:
+    options = {"requests_per_minute": 0, "max_concurrency": 4, "timeout": 1.0, "max_retries": 3,
+               "backoff_base": 0.001, "backoff_max": 0.01}
+    options.update(kwargs)
+    return GeminiClient(backend=backend, **options)
+
+class TestGeminiClient(unittest.TestCase):
+    def test_transient_errors_are_retried(self):
+        backend = ScriptedBackend(errors=[StubBackendError(429), TimeoutError("slow")])
+        llm = client(backend)
+        self.assertEqual(llm.generate_content("hi").text, "HI")
+        stats = llm.stats()
+        self.assertEqual((backend.calls, stats["retries"], stats["quota_errors"], stats["timeouts"]), (3, 2, 1, 1))
+
+    def test_bad_request_is_not_retried(self):
+        backend = ScriptedBackend(errors=[StubBackendError(400)])
+        llm = client(backend)
+        with self.assertRaises(StubBackendError):
+            llm.generate_content("hi")
+        self.assertEqual(backend.calls, 1)
+        self.assertEqual(llm.breaker.state, "closed")
+
+    def test_breaker_opens_and_recovers(self):
+        backend = ScriptedBackend(errors=[StubBackendError(503)] * 2)
+        llm = client(backend, max_retries=0, breaker=CircuitBreaker(threshold=2, cooldown=0.05))
+        for _ in range(2):
+            with self.assertRaises(StubBackendError):
+                llm.generate_content("hi")
+        with self.assertRaises(CircuitOpenError):
+            llm.generate_content("hi")
+        self.assertEqual(backend.calls, 2)
+        time.sleep(0.06)
+        self.assertEqual(llm.generate_content("hi").text, "HI")
+        self.assertEqual(llm.stats()["breaker"], "closed")
+        self.assertEqual(llm.stats()["breaker_trips"], 1)
+
+    def test_concurrency_is_capped(self):
+        backend = ScriptedBackend(latency=0.02)
+        llm = client(backend, max_concurrency=2)
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(llm.generate_content, [f"q{i}" for i in range(8)]))
+        self.assertEqual(backend.peak, 2)
+        self.assertEqual(llm.stats()["in_flight"], 0)
+
+    def test_streaming_yields_chunks_and_frees_slot(self):
+        llm = client(ScriptedBackend(errors=[StubBackendError(503)]), max_concurrency=1)
+        self.assertEqual("".join(chunk.text for chunk in llm.generate_content("hi", stream=True)), "a b")
+        self.assertEqual(llm.generate_content("hi").text, "HI")
+
+    def test_async_call(self):
+        llm = client(StubBackend(latency_ms=1, reply="ok"))
+        self.assertEqual(asyncio.run(llm.generate_content_async("hi")).text, "ok")
+
+    def test_cancelled_async_call_frees_slot(self):
+        llm = client(ScriptedBackend(latency=1.0), max_concurrency=1, timeout=5.0)
+
+        async def cancel_in_flight():
+            task = asyncio.ensure_future(llm.generate_content_async("hi"))
+            await asyncio.sleep(0.05)
+            self.assertEqual(llm.stats()["in_flight"], 1)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_in_flight())
+        self.assertEqual(llm.stats()["in_flight"], 0)
+        self.assertEqual(llm.generate_content("hi").text, "HI")
+
+    def test_cancelled_probe_lets_the_next_call_probe(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=0.0)
+        breaker.record_failure()
+        llm = client(ScriptedBackend(latency=1.0), timeout=5.0, breaker=breaker)
+
+        async def cancel_probe():
+            task = asyncio.ensure_future(llm.generate_content_async("hi"))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_probe())
+        llm.backend.latency = 0.0
+        self.assertEqual(llm.generate_content("hi").text, "HI")
+        self.assertEqual(breaker.state, "closed")
+
+    def test_rate_limited_probe_lets_the_next_call_probe(self):
+        breaker = CircuitBreaker(threshold=1, cooldown=0.0)
+        llm = client(ScriptedBackend(), requests_per_minute=60, burst=1, timeout=0.5, breaker=breaker)
+        llm.generate_content("first")
+        breaker.record_failure()
+        with self.assertRaises(RateLimitedError):
+            llm.generate_content("second")
+        self.assertTrue(breaker.allow())
+
+    def test_stub_error_rate(self):
+        llm = client(StubBackend(latency_ms=0, error_rate=1.0, seed=1), max_retries=1)
+        with self.assertRaises(StubBackendError):
+            llm.generate_content("hi")
+        self.assertEqual(llm.stats()["quota_errors"], 2)
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=100, capacity=2)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertEqual(bucket.reserve(), 0.0)
+        self.assertAlmostEqual(bucket.reserve(), 0.01, delta=0.002)
+        self.assertAlmostEqual(bucket.reserve(), 0.02, delta=0.002)
+
+    def test_long_wait_is_refused(self):
+        llm = client(ScriptedBackend(), requests_per_minute=60, burst=1, timeout=0.5)
+        llm.generate_content("first")
+        with self.assertRaises(RateLimitedError):
+            llm.generate_content("second")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from generation import GenerationEngine
+
+class EchoBackend:
+    """Answers each prompt with its upper-cased text and records batch sizes"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batch_sizes = []
+        self.lock = threading.Lock()
+
+    def load(self):
+        pass
+
+    def generate(self, prompts, max_new_tokens, temperature):
+        with self.lock:
+            self.batch_sizes.append(len(prompts))
+        time.sleep(self.delay)
+        return [(prompt.upper(), len(prompt.split())) for prompt in prompts]
+
+class StreamingBackend(EchoBackend):
+    """Reports each upper-cased word of every row as soon as it is produced"""
+
+    streams = True
+
+    def generate(self, prompts, max_new_tokens, temperature, on_text=None):
+        results = super().generate(prompts, max_new_tokens, temperature)
+        if on_text:
+            for row, (text, _) in enumerate(results):
+                for word in text.split(" ")[:-1]:
+                    on_text(row, word + " ")
+        return results
+
+class FailingBackend(EchoBackend):
+    def generate(self, prompts, max_new_tokens, temperature):
+        raise RuntimeError("model unavailable")
+
+class TestGenerationEngine(unittest.TestCase):
+    def test_each_caller_gets_its_own_result(self):
+        engine = GenerationEngine(backend=EchoBackend(), max_batch_size=4, max_wait_ms=50)
+        prompts = [f"prompt {i}" for i in range(12)]
+        with ThreadPoolExecutor(max_workers=12) as pool:
+            results = list(pool.map(engine.generate, prompts))
+        self.assertEqual(results, [prompt.upper() for prompt in prompts])
+
+    def test_concurrent_prompts_are_batched(self):
+        backend = EchoBackend(delay=0.02)
+        engine = GenerationEngine(backend=backend, max_batch_size=8, max_wait_ms=100)
+        futures = [engine.submit(f"prompt {i}") for i in range(8)]
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(backend.batch_sizes, [8])
+        stats = engine.stats()
+        self.assertEqual(stats["requests"], 8)
+        self.assertEqual(stats["avg_batch_size"], 8.0)
+        self.assertEqual(stats["generated_tokens"], 16)
+
+    def test_single_prompt_flushes_after_max_wait(self):
+        engine = GenerationEngine(backend=EchoBackend(), max_batch_size=8, max_wait_ms=10)
+        start = time.perf_counter()
+        self.assertEqual(engine.generate("alone", timeout=5), "ALONE")
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+    def test_stream_yields_text_as_it_is_generated(self):
+        engine = GenerationEngine(backend=StreamingBackend(), max_batch_size=4, max_wait_ms=20)
+        prompts = [f"explain step {i} of the proof" for i in range(4)]
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            streams = list(pool.map(lambda prompt: list(engine.stream(prompt, timeout=5)), prompts))
+        for prompt, chunks in zip(prompts, streams):
+            self.assertGreater(len(chunks), 1)
+            self.assertEqual("".join(chunks), prompt.upper())
+
+    def test_stream_without_backend_support_yields_the_whole_text(self):
+        engine = GenerationEngine(backend=EchoBackend(), max_batch_size=2, max_wait_ms=10)
+        self.assertEqual(list(engine.stream("no partial text", timeout=5)), ["NO PARTIAL TEXT"])
+
+    def test_stream_raises_backend_errors(self):
+        engine = GenerationEngine(backend=FailingBackend(), max_batch_size=2, max_wait_ms=10)
+        with self.assertRaises(RuntimeError):
+            list(engine.stream("a", timeout=5))
+
+    def test_errors_reach_every_caller(self):
+        engine = GenerationEngine(backend=FailingBackend(), max_batch_size=2, max_wait_ms=50)
+        futures = [engine.submit("a"), engine.submit("b")]
+        for future in futures:
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=5)
+        self.assertEqual(engine.stats()["errors"], 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import time
+import unittest
+import agents.math_agent  # registers the math intents
+from agents.intent_router import IntentRouter, intent_router
+
+class TestIntentRouter(unittest.TestCase):
+    def setUp(self):
+        self.router = IntentRouter()
+        self.router.register("physics", "kinematics", keywords=["velocity", "acceleration"])
+        self.router.register("physics", "circuit", keywords=["current", "voltage", "resistance"])
+        self.router.register(
+            "chemistry", "molar_mass",
+            pattern=r"molar\s*mass\s+of\s+([A-Za-z0-9]+)",
+            parse=lambda routed, match: {"compound": match.group(1)}
+        )
+
+    def test_most_keywords_wins(self):
+        matches = self.router.route("Find the current given voltage 10 V and resistance 5 ohm at velocity 0", "physics")
+        self.assertEqual([m.name for m in matches], ["circuit", "kinematics"])
+
+    def test_no_match(self):
+        self.assertEqual(self.router.route("What is inertia?", "physics"), [])
+
+    def test_pattern_args_keep_original_case(self):
+        matches = self.router.route("What is the molar mass of H2SO4?", "chemistry")
+        self.assertEqual(matches[0].args, {"compound": "H2SO4"})
+
+    def test_parser_can_decline(self):
+        self.router.register("math", "calculator", keywords=["calculate"], parse=lambda routed, match: None)
+        self.assertEqual(self.router.route("calculate something", "math"), [])
+
+    def test_subjects_are_isolated(self):
+        self.assertEqual(self.router.route("velocity 5", "chemistry"), [])
+        self.assertEqual(self.router.intents("physics"), ["kinematics", "circuit"])
+
+    def test_long_queries_are_routed_by_keywords_only(self):
+        self.router.register("physics", "ohms_law", keywords=["voltage"], pattern=r"voltage\s+(\d+)")
+        query = "voltage 10 " + "x" * IntentRouter.MAX_PATTERN_LENGTH
+        self.assertEqual([m.name for m in self.router.route(query, "physics")], ["circuit"])
+
+class TestMathPatterns(unittest.TestCase):
+    def route(self, query: str) -> list:
+        return [(m.name, m.args) for m in intent_router.route(query, "math")]
+
+    def test_quadratic_forms(self):
+        self.assertEqual(self.route("Solve x^2 + 5x + 6 = 0")[0], ("quadratic_equation", {"a": 1, "b": 5, "c": 6}))
+        self.assertEqual(self.route("- 2 x**2 + 8 = 0")[0], ("quadratic_equation", {"a": -2, "b": 0, "c": 8}))
+        self.assertEqual(self.route("0.5x^2 - x = 0")[0], ("quadratic_equation", {"a": 0.5, "b": -1, "c": 0}))
+
+    def test_calculator_expression(self):
+        self.assertEqual(self.route("What is 15 +  23 ?")[0], ("calculator", {"expression": "15 +  23"}))
+
+    def test_calculator_constants_and_aliases(self):
+        for expression in ["ln(e)", "e^2", "2 * pi", "lg(100) + 1", "arcsin(1) * 2", "exp(1) - e"]:
+            self.assertEqual(self.route(f"Calculate {expression}")[0], ("calculator", {"expression": expression}))
+        self.assertEqual(self.route("What is e?"), [])
+
+    def test_near_misses_fail_fast(self):
+        limit = IntentRouter.MAX_PATTERN_LENGTH - 10
+        queries = [
+            "1" * limit + "x",
+            "1" + " " * limit + "x",
+            " " * limit + "!",
+            "x^2 +" + " " * limit + "!",
+            "1." * (limit // 2) + "x^2 = 1",
+            "x^2 + 3x +" + " " * limit + "!"
+        ]
+        for query in queries:
+            start = time.perf_counter()
+            self.assertEqual(self.route(query), [])
+            self.assertLess(time.perf_counter() - start, 0.1, repr(query[:20]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+from unittest.mock import patch
 from agents.math_agent import MathAgent
 
 class TestMathAgent(unittest.TestCase):
@@ -11,12 +12,22 @@ class TestMathAgent(unittest.TestCase):
         self.assertEqual(result["answer"], "Result: 38")
         self.assertEqual(result["tool_used"], "calculator")
 
+    def test_huge_integer_result(self):
+        result = self.agent.solve_math_query("10^5000 + 1")
+        self.assertEqual(result["tool_used"], "calculator")
+        self.assertEqual(result["answer"], "Result: 1.000000000000e+5000")
+
     def test_linear_equation(self):
         result = self.agent.solve_math_query("2x + 4 = 10")
         self.assertTrue(result["success"])
         self.assertIn("x = 3", result["answer"])
         self.assertEqual(result["tool_used"], "equation_solver")
 
+    def test_linear_equation_without_solution(self):
+        result = self.agent.solve_math_query("x + 1 = x + 2")
+        self.assertEqual(result["tool_used"], "equation_solver")
+        self.assertTrue(result["answer"].startswith("Solution: No solution\n"))
+
     def test_quadratic_equation(self):
         result = self.agent.solve_math_query("x^2 + 5x + 6 = 0")
         self.assertTrue(result["success"])
@@ -40,5 +51,22 @@ class TestMathAgent(unittest.TestCase):
         self.assertEqual(result["tool_used"], "language_model")
         self.assertIn("quadratic formula", result["answer"].lower())
 
+    def test_tool_answer_skips_context_lookups(self):
+        with patch("agents.request_context.get_query_history") as history, \
+                patch("agents.request_context.retrieve_context") as retrieve:
+            result = self.agent.solve_math_query("Area of circle with radius 5")
+        self.assertEqual(result["tool_used"], "geometry_calculator")
+        history.assert_not_called()
+        retrieve.assert_not_called()
+
+    def test_stream_uses_local_engine(self):
+        with patch("agents.math_agent.get_generation_engine") as engine, \
+                patch("answer_cache.ENABLED", False), \
+                patch("agents.request_context.get_query_history", return_value=[]), \
+                patch("agents.request_context.retrieve_context", return_value=""):
+            engine.return_value.stream.return_value = iter(["Use the ", "discriminant."])
+            chunks = list(self.agent.stream_math_query("Why does the quadratic formula work?"))
+        self.assertEqual(chunks, ["Use the ", "discriminant."])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
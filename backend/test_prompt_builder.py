@@ -0,0 +1,66 @@
+import unittest
+from prompt_builder import LocalTokenizer, PromptBuilder
+
+tokenizer = LocalTokenizer(model_name=None)
+
+HISTORY = [
+    {"query": "what is velocity", "subject": "physics"},
+    {"query": "what is velocity", "subject": "physics"},
+    {"query": "define acceleration", "subject": "physics"}
+]
+
+def chunk(topic: str, words: int) -> str:
+    return f"{topic}: " + " ".join(["detail"] * words)
+
+class TestPromptBuilder(unittest.TestCase):
+    def builder(self, budget: int) -> PromptBuilder:
+        return PromptBuilder("test", "You are a test expert. Keep it short.", budget=budget, tokenizer=tokenizer)
+
+    def test_prompt_fits_budget_and_keeps_query(self):
+        builder = self.builder(120)
+        rag = "\n".join(chunk(f"topic {i}", 60) for i in range(5))
+        prompt = builder.build("Explain momentum", HISTORY, rag)
+        self.assertLessEqual(tokenizer.count(prompt), 120)
+        self.assertTrue(prompt.endswith("Query: Explain momentum\n"))
+        stats = builder.stats.snapshot()
+        self.assertEqual(stats["trimmed_prompts"], 1)
+        self.assertLess(stats["avg_tokens"], stats["avg_unbudgeted_tokens"])
+
+    def test_static_prefix_is_identical(self):
+        builder = self.builder(200)
+        first = builder.build("Explain momentum", HISTORY, chunk("momentum", 10))
+        second = builder.build("What is work?", [], chunk("work", 30) + "\n" + chunk("energy", 5))
+        prefix = "You are a test expert. Keep it short.\n"
+        self.assertTrue(first.startswith(prefix))
+        self.assertTrue(second.startswith(prefix))
+
+    def test_duplicates_are_removed(self):
+        builder = self.builder(500)
+        rag = "Momentum is mass times velocity.\nmomentum is  mass times velocity.\nWork is force times distance."
+        prompt = builder.build("Explain momentum", HISTORY, rag)
+        self.assertEqual(prompt.count("times velocity"), 1)
+        self.assertIn("Work is force times distance.", prompt)
+        self.assertEqual(prompt.count("what is velocity (physics)"), 1)
+        self.assertEqual(builder.stats.snapshot()["duplicate_chunks_removed"], 1)
+
+    def test_last_chunk_is_truncated_to_fit(self):
+        builder = self.builder(100)
+        prompt = builder.build("Explain momentum", [], chunk("first", 20) + "\n" + chunk("second", 200))
+        self.assertIn(chunk("first", 20), prompt)
+        self.assertIn("second:", prompt)
+        self.assertNotIn(chunk("second", 200), prompt)
+        self.assertLessEqual(tokenizer.count(prompt), 100)
+
+    def test_history_is_capped(self):
+        builder = self.builder(60)
+        history = [{"query": " ".join(["long"] * 20), "subject": "math"}] * 3
+        prompt = builder.build("Explain momentum", history, "")
+        self.assertNotIn("Recent queries", prompt)
+        self.assertEqual(builder.stats.snapshot()["history_dropped"], 3)
+
+    def test_approximate_truncate(self):
+        self.assertEqual(tokenizer.truncate("a b, c d", 3), "a b,")
+        self.assertEqual(tokenizer.truncate("a b", 5), "a b")
+
+if __name__ == "__main__":
+    unittest.main()
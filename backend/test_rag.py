@@ -0,0 +1,194 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+import numpy as np
+from rag import MANIFEST_FILE, RetrievalService, document_hash
+
+# The service imports FAISS from langchain when it builds an index
+HAS_LANGCHAIN = importlib.util.find_spec("langchain_community") is not None
+
+VOCABULARY = ["acid", "base", "velocity", "force", "circle", "triangle"]
+
+class FakeEmbeddings:
+    """Counts vocabulary words, so texts sharing a topic are close; records every text it embeds"""
+
+    def __init__(self):
+        self.embedded = []
+
+    def embed_documents(self, texts):
+        self.embedded.extend(texts)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self.embedded.append(text)
+        return self._vector(text)
+
+    def _vector(self, text):
+        return [float(text.lower().count(word)) for word in VOCABULARY]
+
+class FakeDocument:
+    def __init__(self, page_content):
+        self.page_content = page_content
+
+class FakeStore:
+    """Stands in for langchain's FAISS store: a dot-product index saved as JSON"""
+
+    built = []
+    searches = []
+
+    def __init__(self, embeddings, docs, vectors):
+        self.embeddings = embeddings
+        self.docs = docs
+        self.vectors = vectors
+        self._normalize_L2 = False
+        self.index = self
+        self.docstore = self
+
+    @property
+    def index_to_docstore_id(self):
+        return dict(enumerate(self.docs))
+
+    @classmethod
+    def from_texts(cls, texts, embeddings, ids):
+        cls.built.append(list(ids))
+        return cls(embeddings, dict(zip(ids, texts)), dict(zip(ids, embeddings.embed_documents(texts))))
+
+    @classmethod
+    def load_local(cls, index_dir, embeddings, allow_dangerous_deserialization=False):
+        with open(os.path.join(index_dir, "index.json")) as f:
+            saved = json.load(f)
+        return cls(embeddings, saved["docs"], saved["vectors"])
+
+    def save_local(self, index_dir):
+        with open(os.path.join(index_dir, "index.json"), "w") as f:
+            json.dump({"docs": self.docs, "vectors": self.vectors}, f)
+
+    def add_texts(self, texts, ids):
+        self.docs.update(zip(ids, texts))
+        self.vectors.update(zip(ids, self.embeddings.embed_documents(texts)))
+
+    def delete(self, ids):
+        for doc_id in ids:
+            del self.docs[doc_id], self.vectors[doc_id]
+
+    def search(self, query, k=None):
+        # index.search(vectors, k) and docstore.search(doc_id) share this object
+        if k is None:
+            return FakeDocument(self.docs[query])
+        FakeStore.searches.append(len(query))
+        ids = list(self.docs)
+        scores = np.asarray(query) @ np.asarray([self.vectors[doc_id] for doc_id in ids]).T
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        return scores, order
+
+    def similarity_search_by_vector(self, vector, k):
+        _, order = self.search([vector], k)
+        ids = list(self.docs)
+        return [FakeDocument(self.docs[ids[i]]) for i in order[0]]
+
+@unittest.skipUnless(HAS_LANGCHAIN, "langchain is not installed")
+class TestRetrievalService(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.knowledge_base_path = os.path.join(self.tmpdir.name, "knowledge_base.json")
+        self.index_dir = os.path.join(self.tmpdir.name, "index")
+        self.write_knowledge_base([
+            "An acid donates protons.",
+            "Velocity is displacement over time.",
+            "The area of a circle is pi r squared."
+        ])
+        FakeStore.built = []
+        FakeStore.searches = []
+        self.patch = patch("langchain_community.vectorstores.FAISS", FakeStore)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.tmpdir.cleanup()
+
+    def write_knowledge_base(self, contents):
+        with open(self.knowledge_base_path, "w") as f:
+            json.dump([{"content": content} for content in contents], f)
+
+    def service(self, model_name="fake-model"):
+        service = RetrievalService(self.knowledge_base_path, model_name=model_name, index_dir=self.index_dir)
+        service._embeddings = FakeEmbeddings()
+        return service
+
+    def test_saved_index_is_loaded_instead_of_rebuilt(self):
+        self.service().vector_store
+        self.assertEqual(len(FakeStore.built), 1)
+        self.assertTrue(os.path.exists(os.path.join(self.index_dir, MANIFEST_FILE)))
+
+        service = self.service()
+        self.assertEqual(len(service.vector_store.docs), 3)
+        self.assertEqual(len(FakeStore.built), 1)
+        self.assertEqual(service.embeddings.embedded, [])
+
+    def test_missing_manifest_or_other_model_rebuilds(self):
+        self.service().vector_store
+        self.service(model_name="another-model").vector_store
+        self.assertEqual(len(FakeStore.built), 2)
+
+        os.remove(os.path.join(self.index_dir, MANIFEST_FILE))
+        self.service(model_name="another-model").vector_store
+        self.assertEqual(len(FakeStore.built), 3)
+
+    def test_only_changed_documents_are_embedded(self):
+        self.service().vector_store
+        self.write_knowledge_base([
+            "An acid donates protons.",
+            "Velocity is displacement over time.",
+            "The area of a triangle is half base times height."
+        ])
+        service = self.service()
+        store = service.vector_store
+        self.assertEqual(len(FakeStore.built), 1)
+        self.assertEqual(service.embeddings.embedded, ["The area of a triangle is half base times height."])
+        self.assertNotIn(document_hash("The area of a circle is pi r squared."), store.docs)
+        self.assertIn(document_hash("The area of a triangle is half base times height."), store.docs)
+
+    def test_reload_invalidates_contexts_and_notifies_on_change(self):
+        service = self.service()
+        changes = []
+        service.add_change_listener(lambda: changes.append(service.index_version))
+        self.assertEqual(service.retrieve_context("What is an acid?", k=1), "An acid donates protons.")
+        version = service.index_version
+
+        service.reload()
+        self.assertEqual(service.index_version, version + 1)
+        self.assertEqual(len(service.context_cache), 0)
+        self.assertEqual(changes, [])
+
+        self.write_knowledge_base(["A base accepts protons.", "Velocity is displacement over time."])
+        service.reload()
+        self.assertEqual(service.index_version, version + 2)
+        self.assertEqual(changes, [version + 2])
+        self.assertEqual(service.retrieve_context("What is a base?", k=1), "A base accepts protons.")
+
+    def test_batch_keeps_input_order_and_embeds_each_query_once(self):
+        service = self.service()
+        service.vector_store
+        service.embeddings.embedded = []
+        queries = ["Define velocity", "What is an acid?", "what is an  ACID?", "Define velocity"]
+
+        contexts = service.retrieve_context_batch(queries, k=1)
+        self.assertEqual(contexts, [
+            "Velocity is displacement over time.",
+            "An acid donates protons.",
+            "An acid donates protons.",
+            "Velocity is displacement over time."
+        ])
+        self.assertEqual(service.embeddings.embedded, ["define velocity", "what is an acid?"])
+        self.assertEqual(FakeStore.searches, [2])
+        self.assertEqual([service.retrieve_context(query, k=1) for query in queries], contexts)
+
+        # Cached contexts are served without another search
+        self.assertEqual(service.retrieve_context_batch(queries[::-1], k=1), contexts[::-1])
+        self.assertEqual(FakeStore.searches, [2])
+
+if __name__ == "__main__":
+    unittest.main()
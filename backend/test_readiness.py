@@ -0,0 +1,32 @@
+import unittest
+import time
+from readiness import Readiness
+
+class TestReadiness(unittest.TestCase):
+    def wait(self, readiness):
+        deadline = time.time() + 5
+        while time.time() < deadline and any(
+                state["status"] == "pending" for state in readiness.snapshot()["components"].values()):
+            time.sleep(0.01)
+
+    def test_ready_after_all_steps(self):
+        readiness = Readiness()
+        readiness.add("fast", lambda: None)
+        self.assertFalse(readiness.is_ready())
+        readiness.start()
+        self.wait(readiness)
+        self.assertTrue(readiness.is_ready())
+        self.assertEqual(readiness.snapshot()["components"]["fast"]["status"], "ready")
+
+    def test_failed_step_keeps_not_ready(self):
+        readiness = Readiness()
+        readiness.add("ok", lambda: None)
+        readiness.add("broken", lambda: 1 / 0)
+        readiness.start()
+        self.wait(readiness)
+        snapshot = readiness.snapshot()
+        self.assertFalse(snapshot["ready"])
+        self.assertEqual(snapshot["components"]["broken"]["status"], "failed")
+
+if __name__ == "__main__":
+    unittest.main()
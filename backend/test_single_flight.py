@@ -0,0 +1,129 @@
+import unittest
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from single_flight import SingleFlight
+
+def wait_for(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_duplicates_share_one_execution(self):
+        flight = SingleFlight("test")
+        release = threading.Event()
+        calls = []
+
+        def work():
+            calls.append(1)
+            release.wait(2)
+            return "answer"
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            futures = [pool.submit(flight.do, ("what is x", "math"), work) for _ in range(8)]
+            wait_for(lambda: flight.stats()["coalesced"] == 7)
+            release.set()
+            results = [future.result() for future in futures]
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([result for result, _ in results], ["answer"] * 8)
+        self.assertEqual(sum(shared for _, shared in results), 7)
+        stats = flight.stats()
+        self.assertEqual((stats["executed"], stats["coalesced"], stats["in_flight"]), (1, 7, 0))
+
+    def test_distinct_keys_and_later_calls_run_separately(self):
+        flight = SingleFlight("test")
+        self.assertEqual(flight.do("a", lambda: 1), (1, False))
+        self.assertEqual(flight.do("b", lambda: 2), (2, False))
+        self.assertEqual(flight.do("a", lambda: 3), (3, False))
+        self.assertEqual(flight.stats()["coalesced"], 0)
+
+    def test_waiters_receive_the_leaders_exception(self):
+        flight = SingleFlight("test")
+        release = threading.Event()
+
+        def work():
+            release.wait(2)
+            raise RuntimeError("model unavailable")
+
+        with ThreadPoolExecutor(max_workers=3) as pool:
+            futures = [pool.submit(flight.do, "q", work) for _ in range(3)]
+            wait_for(lambda: flight.stats()["coalesced"] == 2)
+            release.set()
+            for future in futures:
+                with self.assertRaises(RuntimeError):
+                    future.result()
+        self.assertEqual(flight.do("q", lambda: "retry"), ("retry", False))
+
+    def test_async_duplicates_share_one_execution(self):
+        flight = SingleFlight("test")
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "answer"
+
+        async def run():
+            return await asyncio.gather(*[flight.do_async("q", work) for _ in range(5)])
+
+        results = asyncio.run(run())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([result for result, _ in results], ["answer"] * 5)
+        self.assertEqual(flight.stats()["coalesced"], 4)
+
+    def test_cancelling_the_async_leader_keeps_the_work_for_waiters(self):
+        flight = SingleFlight("test")
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "answer"
+
+        async def run():
+            leader = asyncio.ensure_future(flight.do_async("q", work))
+            await asyncio.sleep(0)
+            waiters = [asyncio.ensure_future(flight.do_async("q", work)) for _ in range(3)]
+            await asyncio.sleep(0)
+            leader.cancel()
+            results = await asyncio.gather(*waiters)
+            return leader, results
+
+        leader, results = asyncio.run(run())
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(results, [("answer", True)] * 3)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.stats()["in_flight"], 0)
+
+    def test_async_work_is_cancelled_when_every_caller_is(self):
+        flight = SingleFlight("test")
+        cancelled = []
+
+        async def work():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(1)
+                raise
+
+        async def quick():
+            return "fresh"
+
+        async def run():
+            callers = [asyncio.ensure_future(flight.do_async("q", work)) for _ in range(3)]
+            await asyncio.sleep(0.01)
+            for caller in callers:
+                caller.cancel()
+            await asyncio.gather(*callers, return_exceptions=True)
+            await asyncio.sleep(0)
+            return await flight.do_async("q", quick)
+
+        self.assertEqual(asyncio.run(run()), ("fresh", False))
+        self.assertEqual(cancelled, [1])
+        self.assertEqual(flight.stats()["in_flight"], 0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from tools.registry import ToolRegistry, tool_registry
+
+class FlakyTool:
+    def run(self, ok: bool) -> dict:
+        if ok is None:
+            raise ValueError("boom")
+        return {"success": ok}
+
+class TestToolRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ToolRegistry()
+        self.registry.register("flaky", FlakyTool)
+
+    def test_one_shared_instance(self):
+        self.assertIs(self.registry.get("flaky"), self.registry.get("flaky"))
+        self.assertIs(tool_registry.get("calculator").tool, tool_registry.get("calculator").tool)
+
+    def test_unknown_tool(self):
+        with self.assertRaises(KeyError):
+            self.registry.get("missing")
+
+    def test_calls_errors_and_latency(self):
+        tool = self.registry.get("flaky")
+        tool.run(True)
+        tool.run(False)
+        with self.assertRaises(ValueError):
+            tool.run(None)
+        stats = self.registry.stats()
+        flaky = stats["tools"]["flaky"]
+        self.assertEqual(flaky["calls"], 3)
+        self.assertEqual(flaky["errors"], 2)
+        self.assertEqual(sum(flaky["histogram"].values()), 3)
+        self.assertEqual(stats["hottest"], ["flaky"])
+
+    def test_builtin_tools_are_registered(self):
+        result = tool_registry.get("calculator").evaluate_expression("2 + 2")
+        self.assertEqual(result["result"], 4)
+        self.assertIn("ph_calculator", tool_registry.names())
+
+if __name__ == "__main__":
+    unittest.main()
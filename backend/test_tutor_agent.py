@@ -0,0 +1,53 @@
+import asyncio
+import unittest
+from unittest.mock import patch
+import answer_cache
+import llm
+from agents.tutor_agent import TutorAgent
+from llm import GeminiClient, StubBackend
+
+class BlockedResponse:
+    @property
+    def text(self):
+        raise ValueError("The response was blocked by the safety filters")
+
+class BlockedBackend(StubBackend):
+    def generate(self, prompt, generation_config, timeout, stream=False):
+        return BlockedResponse()
+
+    async def generate_async(self, prompt, generation_config, timeout):
+        return BlockedResponse()
+
+class TestTutorAgent(unittest.TestCase):
+    def setUp(self):
+        self.agent = TutorAgent()
+        self.patches = [
+            patch.object(answer_cache, "ENABLED", False),
+            patch("agents.request_context.get_query_history", return_value=[]),
+            patch("agents.request_context.retrieve_context", return_value="")
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+
+    def client(self, backend) -> GeminiClient:
+        return GeminiClient(backend=backend, requests_per_minute=0, max_retries=0)
+
+    def test_answer(self):
+        with patch.object(llm, "_client", self.client(StubBackend(latency_ms=0, reply="Because it repeats"))):
+            result = self.agent.handle_general_query("Why study history?")
+        self.assertEqual(result["answer"], "Because it repeats")
+
+    def test_blocked_response_is_an_error_result(self):
+        with patch.object(llm, "_client", self.client(BlockedBackend(latency_ms=0))):
+            result = self.agent.handle_general_query("Why study history?")
+            async_result = asyncio.run(self.agent.handle_general_query_async("Why study history?"))
+        for r in (result, async_result):
+            self.assertTrue(r["answer"].startswith("Error: "))
+            self.assertIn("blocked", r["answer"])
+
+if __name__ == "__main__":
+    unittest.main()
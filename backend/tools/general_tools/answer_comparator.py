@@ -1,41 +1,68 @@
-from typing import Dict, Any
-import re
-from difflib import SequenceMatcher
+from typing import Dict, Any, List
+import time
+import numpy as np
+from tools.general_tools.answer_equivalence import answer_equivalence_engine, normalize_answer, parse_number
 
 class AnswerComparator:
     """Compare student answers to correct answers"""
-       
+
+    def __init__(self, engine=answer_equivalence_engine):
+        self.engine = engine
+
     def compare_answer(self, student_answer: str, correct_answer: str, query: str) -> Dict[str, Any]:
         """Compare answers and determine correctness"""
         try:
-            student_answer = student_answer.strip().lower()
-            correct_answer = correct_answer.strip().lower()
-               
-               # Numerical comparison (e.g., "5" vs "5.0")
-            try:
-                if float(student_answer) == float(correct_answer):
-                    return {
-                        "query": query,
-                        "student_answer": student_answer,
-                        "correct_answer": correct_answer,
-                        "is_correct": True,
-                        "similarity": 1.0,
-                        "success": True,
-                        "error": None
-                       }
-            except ValueError:
-                pass
-               
-            # Text comparison
-            similarity = SequenceMatcher(None, student_answer, correct_answer).ratio()
-            is_correct = similarity > 0.85
-               
+            result = self.engine.compare(student_answer, correct_answer)
+            return {
+                "query": query,
+                "student_answer": normalize_answer(student_answer),
+                "correct_answer": normalize_answer(correct_answer),
+                "is_correct": result["is_correct"],
+                "similarity": result["similarity"],
+                "tier": result["tier"],
+                "success": True,
+                "error": None
+            }
+        except Exception as e:
+            return {
+                "query": query,
+                "success": False,
+                "error": str(e)
+            }
+
+    def compare_batch(self, student_answers: List[str], correct_answer: str, query: str) -> Dict[str, Any]:
+        """Compare many submissions against one answer key, normalising and parsing the key once"""
+        try:
+            correct_answer = normalize_answer(correct_answer)
+            correct_value = parse_number(correct_answer)
+            normalized = [normalize_answer(answer) for answer in student_answers]
+            results = [None] * len(normalized)
+
+            text_indices = list(range(len(normalized)))
+            if correct_value is not None:
+                start = time.perf_counter()
+                values = [parse_number(answer) for answer in normalized]
+                numeric_indices = [i for i, value in enumerate(values) if value is not None]
+                text_indices = [i for i, value in enumerate(values) if value is None]
+                if numeric_indices:
+                    matches = np.isclose(
+                        np.array([values[i] for i in numeric_indices], dtype=np.float64), correct_value,
+                        rtol=self.engine.NUMERIC_RTOL, atol=self.engine.NUMERIC_ATOL
+                    )
+                    for i, is_correct in zip(numeric_indices, matches.tolist()):
+                        results[i] = {"is_correct": is_correct, "similarity": 1.0 if is_correct else 0.0, "tier": "numeric"}
+                    self.engine.record("numeric", (time.perf_counter() - start) * 1000, len(numeric_indices))
+
+            # The remaining tiers only run on submissions that couldn't be settled numerically
+            for i in text_indices:
+                results[i] = self.engine.compare(normalized[i], correct_answer)
+
+            for answer, result in zip(normalized, results):
+                result["student_answer"] = answer
             return {
                 "query": query,
-                "student_answer": student_answer,
                 "correct_answer": correct_answer,
-                "is_correct": is_correct,
-                "similarity": round(similarity, 2),
+                "results": results,
                 "success": True,
                 "error": None
             }
@@ -44,4 +71,4 @@ class AnswerComparator:
                 "query": query,
                 "success": False,
                 "error": str(e)
-            }
\ No newline at end of file
+            }
@@ -0,0 +1,171 @@
+from collections import Counter
+from fractions import Fraction
+from functools import lru_cache
+from typing import Any, Dict, Optional
+import math
+import re
+import threading
+import time
+
+TIERS = ["exact", "numeric", "symbolic", "token"]
+
+# Only short, purely mathematical answers are handed to SymPy (parse_expr evaluates its input)
+_MATH_ANSWER = re.compile(r"^[0-9a-z+\-*/^().=\s]{1,80}$")
+# Dots only as decimal points; no huge or chained powers that would make SymPy grind
+_UNSAFE = re.compile(r"(?<![0-9])\.|\.(?![0-9])|(\^|\*\*)\s*\(?\s*\d{3,}|(\^|\*\*)[^+\-=]*(\^|\*\*)")
+_ALLOWED_WORDS = {"sqrt", "sin", "cos", "tan", "log", "ln", "exp", "pi"}
+_WORD = re.compile(r"[a-z]+")
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+def normalize_answer(answer: str) -> str:
+    return " ".join(answer.strip().lower().split())
+
+def parse_number(answer: str) -> Optional[float]:
+    """Parse plain numbers and fractions such as "0.5", "-3" or "1/2"; None otherwise"""
+    try:
+        value = float(Fraction(answer.replace(" ", "")))
+    except (ValueError, ZeroDivisionError, OverflowError):
+        # "1e400" parses as a Fraction but is beyond float range
+        return None
+    return value if math.isfinite(value) else None
+
+@lru_cache(maxsize=None)
+def _sympy():
+    """SymPy, its parser and the names answers may use; imported on the first symbolic comparison"""
+    import sympy as sp
+    from sympy.parsing.sympy_parser import (
+        convert_xor, implicit_multiplication_application, parse_expr, standard_transformations
+    )
+    names = {
+        "sqrt": sp.sqrt, "sin": sp.sin, "cos": sp.cos, "tan": sp.tan,
+        "log": sp.log, "ln": sp.log, "exp": sp.exp, "pi": sp.pi
+    }
+    return sp, parse_expr, names, standard_transformations + (implicit_multiplication_application, convert_xor)
+
+@lru_cache(maxsize=4096)
+def canonical_form(answer: str):
+    """Expanded, simplified SymPy form of a math answer, or None if it isn't one.
+
+    An equation becomes left - right with denominators, positive factors and the sign
+    normalised away, so "2x = 6", "x = 3" and "3 = x" share one form. Cached process-wide,
+    so an answer key is only canonicalised once across requests.
+    """
+    if not _MATH_ANSWER.match(answer) or _UNSAFE.search(answer):
+        return None
+    words = _WORD.findall(answer)
+    if any(len(word) > 1 and word not in _ALLOWED_WORDS for word in words):
+        return None
+    sp, parse_expr, names, transformations = _sympy()
+    try:
+        if answer.count("=") == 1:
+            left, right = answer.split("=")
+            expr = parse_expr(left, local_dict=names, transformations=transformations) - \
+                parse_expr(right, local_dict=names, transformations=transformations)
+            return _normalize_equation(sp, sp.expand(sp.simplify(expr)))
+        elif "=" not in answer:
+            expr = parse_expr(answer, local_dict=names, transformations=transformations)
+        else:
+            return None
+        return sp.expand(sp.simplify(expr))
+    except Exception:
+        return None
+
+def _normalize_equation(sp, expr):
+    """Canonical side of "expr = 0": multiplying both sides by a non-zero constant doesn't change it"""
+    numerator = sp.together(expr).as_numer_denom()[0]
+    _, primitive = sp.expand(numerator).as_content_primitive()
+    if primitive.could_extract_minus_sign():
+        primitive = -primitive
+    return sp.expand(primitive)
+
+def token_similarity(student_answer: str, correct_answer: str) -> float:
+    """Dice coefficient over word tokens; linear in answer length"""
+    student_tokens = Counter(_TOKEN.findall(student_answer))
+    correct_tokens = Counter(_TOKEN.findall(correct_answer))
+    total = sum(student_tokens.values()) + sum(correct_tokens.values())
+    if not total:
+        return 1.0 if student_answer == correct_answer else 0.0
+    overlap = sum((student_tokens & correct_tokens).values())
+    return 2 * overlap / total
+
+class AnswerEquivalenceEngine:
+    """Tiered answer comparison: exact, numeric, symbolic (memoised SymPy), then token similarity"""
+
+    NUMERIC_RTOL = 1e-9
+    NUMERIC_ATOL = 1e-12
+    SIMILARITY_THRESHOLD = 0.85
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tier_counts = {tier: 0 for tier in TIERS}
+        self._tier_time_ms = {tier: 0.0 for tier in TIERS}
+
+    def compare(self, student_answer: str, correct_answer: str) -> Dict[str, Any]:
+        """Return is_correct, similarity and the tier that decided it"""
+        start = time.perf_counter()
+        student = normalize_answer(student_answer)
+        correct = normalize_answer(correct_answer)
+
+        if student == correct or student.replace(" ", "") == correct.replace(" ", ""):
+            return self._decide("exact", True, 1.0, start)
+
+        student_value = parse_number(student)
+        correct_value = parse_number(correct)
+        if student_value is not None and correct_value is not None:
+            return self._decide("numeric", self.numbers_match(student_value, correct_value), None, start)
+
+        correct_form = canonical_form(correct)
+        if correct_form is not None:
+            student_form = canonical_form(student)
+            if student_form is not None:
+                # An expression is never the same answer as an equation, even one side minus the other
+                is_equation = "=" in correct
+                equivalent = ("=" in student) == is_equation and self._forms_match(student_form, correct_form, is_equation)
+                return self._decide("symbolic", equivalent, None, start)
+
+        similarity = token_similarity(student, correct)
+        return self._decide("token", similarity > self.SIMILARITY_THRESHOLD, similarity, start)
+
+    def numbers_match(self, student_value: float, correct_value: float) -> bool:
+        return math.isclose(student_value, correct_value, rel_tol=self.NUMERIC_RTOL, abs_tol=self.NUMERIC_ATOL)
+
+    def _forms_match(self, student_form, correct_form, is_equation: bool) -> bool:
+        if student_form == correct_form:
+            return True
+        sp = _sympy()[0]
+        try:
+            if sp.expand(student_form - correct_form) == 0:
+                return True
+            if not is_equation:
+                return False
+            # Scalings the normal form can't see, e.g. by a decimal: the ratio is a non-zero constant
+            ratio = sp.simplify(student_form / correct_form)
+            return not ratio.free_symbols and ratio != 0
+        except Exception:
+            return False
+
+    def _decide(self, tier: str, is_correct: bool, similarity: Optional[float], start: float) -> Dict[str, Any]:
+        self.record(tier, (time.perf_counter() - start) * 1000)
+        if similarity is None:
+            similarity = 1.0 if is_correct else 0.0
+        return {"is_correct": is_correct, "similarity": round(similarity, 2), "tier": tier}
+
+    def record(self, tier: str, elapsed_ms: float, count: int = 1):
+        with self._lock:
+            self._tier_counts[tier] += count
+            self._tier_time_ms[tier] += elapsed_ms
+
+    def stats(self) -> Dict[str, Any]:
+        """Decisions and average latency per tier, plus the canonical-form cache"""
+        with self._lock:
+            tiers = {
+                tier: {
+                    "count": self._tier_counts[tier],
+                    "avg_ms": round(self._tier_time_ms[tier] / self._tier_counts[tier], 4) if self._tier_counts[tier] else 0.0
+                }
+                for tier in TIERS
+            }
+        info = canonical_form.cache_info()
+        return {"tiers": tiers, "canonical_cache": {"hits": info.hits, "misses": info.misses, "size": info.currsize}}
+
+answer_equivalence_engine = AnswerEquivalenceEngine()
@@ -1,6 +1,6 @@
-import math
-import re
+import numpy as np
 from typing import Dict, Any
+from tools.math_tools.expression_engine import clean_expression, compile_expression
 
 class BasicCalculator:
     """Advanced calculator with support for various mathematical operations"""
@@ -12,14 +12,8 @@ class BasicCalculator:
     def evaluate_expression(self, expression: str) -> Dict[str, Any]:
         """Safely evaluate mathematical expressions"""
         try:
-            cleaned_expr = self._clean_expression(expression)
-            cleaned_expr = self._handle_special_functions(cleaned_expr)
-            result = eval(cleaned_expr, {"__builtins__": {}}, {
-                "sin": math.sin, "cos": math.cos, "tan": math.tan,
-                "log": math.log, "log10": math.log10, "sqrt": math.sqrt,
-                "pi": math.pi, "e": math.e, "abs": abs, "pow": pow,
-                "floor": math.floor, "ceil": math.ceil, "round": round
-            })
+            cleaned_expr = clean_expression(expression)
+            result = compile_expression(cleaned_expr).evaluate()
             self.last_result = result
             return {
                 "result": result,
@@ -35,23 +29,27 @@ class BasicCalculator:
                 "success": False,
                 "error": str(e)
             }
-    
-    def _clean_expression(self, expr: str) -> str:
-        """Clean and prepare expression for evaluation"""
-        expr = expr.replace(" ", "").replace("×", "*").replace("÷", "/").replace("^", "**")
-        expr = re.sub(r'(\d)([a-zA-Z])', r'\1*\2', expr)
-        expr = re.sub(r'([a-zA-Z])(\d)', r'\1*\2', expr)
-        return expr
-    
-    def _handle_special_functions(self, expr: str) -> str:
-        """Convert special function names to Python equivalents"""
-        replacements = {
-            'ln': 'log', 'lg': 'log10', 'arcsin': 'asin', 'arccos': 'acos', 'arctan': 'atan'
-        }
-        for old, new in replacements.items():
-            expr = expr.replace(old, new)
-        return expr
+
+    def table_of_values(self, expression: str, start: float, stop: float, points: int = 11, variable: str = "x") -> Dict[str, Any]:
+        """Evaluate an expression in one variable over evenly spaced points, e.g. for plotting"""
+        try:
+            xs = np.linspace(start, stop, points)
+            ys = compile_expression(clean_expression(expression)).evaluate_vectorised(xs, variable)
+            return {
+                "expression": expression,
+                "variable": variable,
+                "x": xs.tolist(),
+                "y": [None if not np.isfinite(y) else y for y in ys.tolist()],
+                "success": True,
+                "error": None
+            }
+        except Exception as e:
+            return {
+                "expression": expression,
+                "success": False,
+                "error": str(e)
+            }
     
     def percentage(self, value: float, percentage: float) -> float:
         """Calculate percentage of a value"""
-        return (value * percentage) / 100
\ No newline at end of file
+        return (value * percentage) / 100
@@ -1,28 +1,121 @@
-import sympy as sp
-from typing import Dict, Any, List
+import numpy as np
+from fractions import Fraction
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from tools.math_tools.expression_engine import clean_expression, compile_expression
+
+# Systems at least this large with at most this fraction of non-zero coefficients use sparse LU
+SPARSE_MIN_SIZE = 200
+SPARSE_MAX_DENSITY = 0.1
+
+@lru_cache(maxsize=None)
+def _scipy():
+    """SciPy with its sparse solvers, imported on first large system; None when it isn't installed"""
+    try:
+        import scipy.sparse
+        import scipy.sparse.linalg
+    except ImportError:
+        return None
+    return scipy
+
+def _number(value) -> str:
+    """Render a coefficient or solution: exact rationals as "3" or "7/3", floats as floats"""
+    if isinstance(value, Fraction):
+        return str(value.numerator) if value.denominator == 1 else str(value)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+def _close(left, right) -> bool:
+    if isinstance(left, Fraction) and isinstance(right, Fraction):
+        return left == right
+    return abs(float(left) - float(right)) <= 1e-9 * max(1.0, abs(float(left)), abs(float(right)))
+
+@lru_cache(maxsize=1024)
+def parse_linear_equation(equation: str) -> Optional[Tuple[Tuple[Tuple[str, Any], ...], Any]]:
+    """Coefficients and constant of a linear equation, as ((variable, a), ...), b meaning sum(a*v) + b = 0.
+
+    Each side is compiled once, with its numbers as exact Fractions, and the difference is
+    probed at the origin and at unit vectors; two further off-grid probes, one on each side of
+    the origin, confirm it is linear. Returns None for anything non-linear.
+    """
+    if equation.count("=") != 1:
+        return None
+    left, right = equation.split("=")
+    try:
+        left_expr = compile_expression(clean_expression(left), exact=True)
+        right_expr = compile_expression(clean_expression(right), exact=True)
+    except (SyntaxError, ValueError):
+        return None
+    variables = sorted(left_expr.variables | right_expr.variables)
+    if not variables:
+        return None
+
+    def difference(point):
+        values = dict(zip(variables, point))
+        left_values = {v: values[v] for v in left_expr.variables}
+        right_values = {v: values[v] for v in right_expr.variables}
+        return left_expr.evaluate(**left_values) - right_expr.evaluate(**right_values)
+
+    try:
+        zero = Fraction(0)
+        constant = difference([zero] * len(variables))
+        coefficients = []
+        for i in range(len(variables)):
+            point = [zero] * len(variables)
+            point[i] = Fraction(1)
+            coefficients.append(difference(point) - constant)
+        # The negative probe catches abs(x) and even powers, which agree with a line for x > 0
+        for probe in ([Fraction(7, 3) + i for i in range(len(variables))],
+                      [-Fraction(11, 5) - i for i in range(len(variables))]):
+            expected = constant + sum(a * p for a, p in zip(coefficients, probe))
+            if not _close(difference(probe), expected):
+                return None
+    except (ArithmeticError, TypeError, ValueError):
+        return None
+    return tuple(zip(variables, coefficients)), constant
+
+def linear_cache_stats() -> Dict[str, Any]:
+    info = parse_linear_equation.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize}
 
 class EquationSolver:
     """Solve various types of mathematical equations"""
-    
+
     def __init__(self):
         self.variables = {}
-    
+
     def solve_linear_equation(self, equation: str) -> Dict[str, Any]:
-        """Solve linear equations like '2x + 5 = 11'"""
+        """Solve linear equations like '2x + 5 = 11' in any single variable"""
         try:
-            left, right = equation.replace(" ", "").split('=')
-            x = sp.Symbol('x')
-            left_expr = sp.sympify(left)
-            right_expr = sp.sympify(right)
-            equation_obj = sp.Eq(left_expr, right_expr)
-            solution = sp.solve(equation_obj, x)
-            steps = self._get_solution_steps(left_expr, right_expr, solution)
+            parsed = parse_linear_equation(equation.replace(" ", ""))
+            if parsed is None or len(parsed[0]) != 1:
+                return self._solve_with_sympy(equation)
+            ((variable, a),), b = parsed
+            steps = [
+                f"Original equation: {equation}",
+                f"Collect terms: {_number(a)}{variable} + {_number(b)} = 0"
+            ]
+            solution = None
+            if a != 0:
+                solution = -b / a
+                nature = "One solution"
+                steps.append(f"Isolate {variable}: {variable} = {_number(-b)}/{_number(a)}")
+                steps.append(f"Solution: {variable} = {_number(solution)}")
+            elif b == 0:
+                nature = "Infinitely many solutions"
+                steps.append(f"The variable cancels out and 0 = 0 holds for every {variable}")
+            else:
+                nature = "No solution"
+                steps.append(f"The variable cancels out, leaving {_number(b)} = 0, which is false")
             return {
                 "equation": equation,
-                "solution": str(solution[0]) if solution else None,
+                "solution": _number(solution) if solution is not None else None,
+                "nature": nature,
                 "steps": steps,
                 "success": True,
-                "variable": "x"
+                "variable": variable,
+                "method": "linear"
             }
         except Exception as e:
             return {
@@ -31,9 +124,128 @@ class EquationSolver:
                 "success": False,
                 "error": str(e)
             }
-    
+
+    def _solve_with_sympy(self, equation: str) -> Dict[str, Any]:
+        """General fallback for equations that aren't linear"""
+        # SymPy takes longer to import than the rest of the app; only this path needs it
+        import sympy as sp
+        from sympy.parsing.sympy_parser import (
+            convert_xor, implicit_multiplication_application, parse_expr, standard_transformations
+        )
+        transformations = standard_transformations + (implicit_multiplication_application, convert_xor)
+        left, right = equation.replace(" ", "").split('=')
+        left_expr = parse_expr(left, transformations=transformations)
+        right_expr = parse_expr(right, transformations=transformations)
+        symbols = sorted((left_expr - right_expr).free_symbols, key=str)
+        variable = symbols[0] if len(symbols) == 1 else sp.Symbol('x')
+        solution = sp.solve(sp.Eq(left_expr, right_expr), variable)
+        steps = self._get_solution_steps(left_expr, right_expr, solution, str(variable))
+        return {
+            "equation": equation,
+            "solution": str(solution[0]) if solution else None,
+            "steps": steps,
+            "success": True,
+            "variable": str(variable),
+            "method": "sympy"
+        }
+
+    def solve_linear_system(self, equations: Sequence[str]) -> Dict[str, Any]:
+        """Solve n linear equations in n unknowns, e.g. ['2x + y = 5', 'x - y = 1']"""
+        try:
+            parsed = []
+            for equation in equations:
+                result = parse_linear_equation(equation.replace(" ", ""))
+                if result is None:
+                    raise ValueError(f"Not a linear equation: {equation}")
+                parsed.append(result)
+            variables = sorted({variable for coefficients, _ in parsed for variable, _ in coefficients})
+            if len(variables) != len(parsed):
+                raise ValueError(f"{len(parsed)} equations in {len(variables)} unknowns; need one equation per unknown")
+
+            index = {variable: i for i, variable in enumerate(variables)}
+            matrix = np.zeros((len(parsed), len(variables)))
+            constants = np.zeros(len(parsed))
+            for row, (coefficients, constant) in enumerate(parsed):
+                for variable, a in coefficients:
+                    matrix[row, index[variable]] = float(a)
+                constants[row] = -float(constant)
+            result = self.solve_matrix_system(matrix, constants, variables)
+            result["equations"] = list(equations)
+            return result
+        except Exception as e:
+            return {
+                "equations": list(equations),
+                "solution": None,
+                "success": False,
+                "error": str(e)
+            }
+
+    def solve_matrix_system(self, coefficients, constants, variables: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Solve A·v = b, using sparse LU for large, mostly-zero systems and dense LU otherwise"""
+        try:
+            scipy = _scipy()
+            sparse_input = scipy is not None and scipy.sparse.issparse(coefficients)
+            if not sparse_input:
+                coefficients = np.asarray(coefficients, dtype=np.float64)
+            constants = np.asarray(constants, dtype=np.float64)
+            n = coefficients.shape[0]
+            if coefficients.shape != (n, n) or constants.shape != (n,):
+                raise ValueError(f"Expected an n×n coefficient matrix and n constants, got {coefficients.shape} and {constants.shape}")
+            variables = variables or [f"x{i + 1}" for i in range(n)]
+
+            nonzero = coefficients.nnz if sparse_input else np.count_nonzero(coefficients)
+            density = nonzero / (n * n) if n else 0.0
+            use_sparse = scipy is not None and (sparse_input or (n >= SPARSE_MIN_SIZE and density <= SPARSE_MAX_DENSITY))
+            if use_sparse:
+                matrix = scipy.sparse.csc_matrix(coefficients)
+                solution = scipy.sparse.linalg.spsolve(matrix, constants)
+                if not np.all(np.isfinite(solution)):
+                    raise np.linalg.LinAlgError("Singular matrix")
+                residual = np.linalg.norm(matrix @ solution - constants)
+                method = "sparse LU (scipy.sparse.linalg.spsolve)"
+            else:
+                if sparse_input:
+                    coefficients = coefficients.toarray()
+                solution = np.linalg.solve(coefficients, constants)
+                residual = np.linalg.norm(coefficients @ solution - constants)
+                method = "dense LU (numpy.linalg.solve)"
+
+            values = {variable: float(value) for variable, value in zip(variables, solution)}
+            steps = [
+                f"System of {n} linear equations in {n} unknowns",
+                f"Coefficient matrix: {n}×{n}, {density:.1%} non-zero",
+                f"Solved with {method}",
+                f"Residual norm: {residual:.2e}"
+            ]
+            shown = list(values.items())[:10]
+            steps.append("Solution: " + ", ".join(f"{variable} = {value:g}" for variable, value in shown) +
+                         (f", ... ({n - len(shown)} more)" if n > len(shown) else ""))
+            return {
+                "solution": values,
+                "variables": variables,
+                "method": method,
+                "residual": float(residual),
+                "steps": steps,
+                "success": True
+            }
+        except np.linalg.LinAlgError:
+            return {
+                "solution": None,
+                "success": False,
+                "error": "The system has no unique solution (singular coefficient matrix)",
+                "steps": []
+            }
+        except Exception as e:
+            return {
+                "solution": None,
+                "success": False,
+                "error": str(e),
+                "steps": []
+            }
+
     def solve_quadratic_equation(self, a: float, b: float, c: float) -> Dict[str, Any]:
         """Solve quadratic equations ax² + bx + c = 0"""
+        import sympy as sp
         try:
             discriminant = b**2 - 4*a*c
             steps = [
@@ -82,13 +294,13 @@ class EquationSolver:
                 "error": str(e),
                 "steps": []
             }
-    
-    def _get_solution_steps(self, left_expr, right_expr, solution) -> List[str]:
+
+    def _get_solution_steps(self, left_expr, right_expr, solution, variable: str = "x") -> List[str]:
         """Generate step-by-step solution"""
         steps = [
             f"Original equation: {left_expr} = {right_expr}",
             f"Rearrange: {left_expr - right_expr} = 0"
         ]
         if solution:
-            steps.append(f"Solution: x = {solution[0]}")
-        return steps
\ No newline at end of file
+            steps.append(f"Solution: {variable} = {solution[0]}")
+        return steps
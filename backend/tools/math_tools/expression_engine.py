@@ -0,0 +1,160 @@
+from fractions import Fraction
+from functools import lru_cache
+from numbers import Rational
+from typing import Any, Dict, FrozenSet
+import ast
+import math
+import re
+import numpy as np
+
+# Aliases are rewritten as whole names, so the "ln" inside "sin" is left alone
+FUNCTION_ALIASES = {"ln": "log", "lg": "log10", "arcsin": "asin", "arccos": "acos", "arctan": "atan"}
+
+SCALAR_NAMESPACE = {
+    "sin": math.sin, "cos": math.cos, "tan": math.tan,
+    "asin": math.asin, "acos": math.acos, "atan": math.atan,
+    "log": math.log, "log10": math.log10, "sqrt": math.sqrt, "exp": math.exp,
+    "abs": abs, "pow": pow, "floor": math.floor, "ceil": math.ceil, "round": round,
+    "pi": math.pi, "e": math.e
+}
+
+VECTOR_NAMESPACE = {
+    "sin": np.sin, "cos": np.cos, "tan": np.tan,
+    "asin": np.arcsin, "acos": np.arccos, "atan": np.arctan,
+    "log": np.log, "log10": np.log10, "sqrt": np.sqrt, "exp": np.exp,
+    "abs": np.abs, "pow": np.power, "floor": np.floor, "ceil": np.ceil, "round": np.round,
+    "pi": np.pi, "e": np.e
+}
+
+FUNCTIONS = frozenset(name for name, value in SCALAR_NAMESPACE.items() if callable(value))
+
+# Integer powers whose result would need more bits than this are refused rather than left to
+# grind through bignum arithmetic; chained powers like (10**100)**100 are each checked
+MAX_RESULT_BITS = 1 << 16
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.USub, ast.UAdd
+)
+_IDENTIFIER = re.compile(r"[a-zA-Z_]+\d*")
+
+def _guarded_pow(base, exponent):
+    if isinstance(exponent, Fraction) and exponent.denominator == 1:
+        exponent = exponent.numerator
+    if isinstance(base, Rational) and isinstance(exponent, int):
+        # int ** negative int is a float, but a Fraction stays exact either way
+        power = abs(exponent) if isinstance(base, Fraction) else exponent
+        size = max(abs(base.numerator), base.denominator)
+        if power > 0 and size > 1 and power * math.log2(size) > MAX_RESULT_BITS:
+            raise ValueError(f"Power is too large: the result would exceed {MAX_RESULT_BITS} bits")
+    return base ** exponent
+
+_SCALAR_GLOBALS = dict(SCALAR_NAMESPACE, pow=_guarded_pow, _pow=_guarded_pow, _Fraction=Fraction, __builtins__={})
+# np.power refuses integer arrays raised to negative integer powers; float_power always works in floats
+_VECTOR_GLOBALS = dict(VECTOR_NAMESPACE, pow=np.float_power, _pow=np.float_power, __builtins__={})
+_UNSET = object()
+
+def _rewrite_identifier(match) -> str:
+    name = match.group(0)
+    name = FUNCTION_ALIASES.get(name, name)
+    if name in SCALAR_NAMESPACE:
+        return name
+    # "x2" is x times 2, as before
+    return re.sub(r"([a-zA-Z])(\d)", r"\1*\2", name)
+
+@lru_cache(maxsize=4096)
+def clean_expression(expression: str) -> str:
+    """Normalise operators, function aliases and implicit multiplication ("2x" -> "2*x")"""
+    expr = expression.replace(" ", "").replace("×", "*").replace("÷", "/").replace("^", "**")
+    expr = _IDENTIFIER.sub(_rewrite_identifier, expr)
+    expr = re.sub(r"(\d)([a-zA-Z])", r"\1*\2", expr)
+    # "2(x+1)" and "(x+1)(x-1)"; digits that end a name such as log10 are left alone
+    return re.sub(r"((?<![a-zA-Z_\d])\d+(?:\.\d+)?|\))\(", r"\1*(", expr)
+
+class _PowTransformer(ast.NodeTransformer):
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            call = ast.Call(func=ast.Name(id="_pow", ctx=ast.Load()), args=[node.left, node.right], keywords=[])
+            return ast.copy_location(call, node)
+        return node
+
+class _ExactTransformer(ast.NodeTransformer):
+    def visit_Constant(self, node):
+        # Built from the literal's text, so 0.1 is exactly 1/10
+        call = ast.Call(func=ast.Name(id="_Fraction", ctx=ast.Load()), args=[ast.Constant(repr(node.value))], keywords=[])
+        return ast.copy_location(call, node)
+
+class CompiledExpression:
+    """An expression parsed, checked against a node whitelist and compiled once.
+
+    With exact=True every number in the expression is a Fraction, so rational arithmetic
+    stays exact; functions such as sqrt still return floats.
+    """
+
+    def __init__(self, cleaned: str, exact: bool = False):
+        tree = ast.parse(cleaned, mode="eval")
+        variables = set()
+        for node in ast.walk(tree):
+            if not isinstance(node, _ALLOWED_NODES):
+                raise ValueError(f"Unsupported syntax: {type(node).__name__}")
+            if isinstance(node, ast.Constant) and (isinstance(node.value, bool) or not isinstance(node.value, (int, float))):
+                raise ValueError(f"Unsupported constant: {node.value!r}")
+            if isinstance(node, ast.Call):
+                if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+                    raise ValueError("Only calls to supported math functions are allowed")
+            elif isinstance(node, ast.Name) and node.id not in SCALAR_NAMESPACE:
+                if node.id.startswith("_"):
+                    raise ValueError(f"Unsupported name: {node.id}")
+                variables.add(node.id)
+        self.cleaned = cleaned
+        self.variables: FrozenSet[str] = frozenset(variables)
+        tree = _PowTransformer().visit(tree)
+        if exact:
+            tree = _ExactTransformer().visit(tree)
+        tree = ast.fix_missing_locations(tree)
+        self._code = compile(tree, "<expression>", "eval")
+        self._constant = _UNSET
+
+    def evaluate(self, **variables) -> Any:
+        if not self.variables:
+            # No free variables, so the value never changes; errors are not cached
+            if self._constant is _UNSET:
+                self._constant = eval(self._code, _SCALAR_GLOBALS)
+            return self._constant
+        missing = self.variables - variables.keys()
+        if missing:
+            raise ValueError(f"Missing value for {', '.join(sorted(missing))}")
+        return eval(self._code, _SCALAR_GLOBALS, variables)
+
+    def evaluate_vectorised(self, values: np.ndarray, variable: str = "x") -> np.ndarray:
+        """Evaluate over every point of values in one pass of NumPy ufuncs"""
+        extra = self.variables - {variable}
+        if extra:
+            raise ValueError(f"Unexpected variable {', '.join(sorted(extra))}")
+        values = np.asarray(values, dtype=np.float64)
+        with np.errstate(all="ignore"):
+            result = eval(self._code, _VECTOR_GLOBALS, {variable: values})
+        # Expressions without the variable are constants; give them the input's shape
+        return np.broadcast_to(np.asarray(result, dtype=np.float64), values.shape)
+
+@lru_cache(maxsize=1024)
+def compile_expression(cleaned: str, exact: bool = False) -> CompiledExpression:
+    """Compiled expression for a cleaned string, cached process-wide"""
+    return CompiledExpression(cleaned, exact)
+
+def evaluate(expression: str, **variables) -> Any:
+    return compile_expression(clean_expression(expression)).evaluate(**variables)
+
+def evaluate_vectorised(expression: str, values: np.ndarray, variable: str = "x") -> np.ndarray:
+    return compile_expression(clean_expression(expression)).evaluate_vectorised(values, variable)
+
+def cache_stats() -> Dict[str, Any]:
+    info = compile_expression.cache_info()
+    total = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "hit_rate": round(info.hits / total, 4) if total else 0.0
+    }
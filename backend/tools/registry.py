@@ -0,0 +1,164 @@
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List
+import functools
+import math
+import threading
+import time
+
+# Upper bounds in ms; the last bucket catches everything slower
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, math.inf)
+
+class ToolStats:
+    """Call count, error count and a latency histogram for one tool"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS_MS)
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_ms: float, failed: bool):
+        with self._lock:
+            self.calls += 1
+            self.errors += failed
+            self.total_ms += elapsed_ms
+            self.max_ms = max(self.max_ms, elapsed_ms)
+            self.buckets[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+    def _percentile(self, buckets: List[int], calls: int, pct: float) -> float:
+        """Upper bound of the bucket holding the pct-th call"""
+        target = pct / 100 * calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, buckets):
+            seen += count
+            if seen >= target:
+                return bound
+        return LATENCY_BUCKETS_MS[-1]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            calls, errors, total_ms, max_ms, buckets = self.calls, self.errors, self.total_ms, self.max_ms, list(self.buckets)
+        if not calls:
+            return {"calls": 0, "errors": 0}
+        p50, p95 = self._percentile(buckets, calls, 50), self._percentile(buckets, calls, 95)
+        return {
+            "calls": calls,
+            "errors": errors,
+            "error_rate": round(errors / calls, 4),
+            "avg_ms": round(total_ms / calls, 3),
+            "max_ms": round(max_ms, 3),
+            # Histogram estimates: the bucket bound the percentile falls under (max_ms when unbounded)
+            "p50_ms": p50 if p50 != math.inf else round(max_ms, 3),
+            "p95_ms": p95 if p95 != math.inf else round(max_ms, 3),
+            "histogram": {
+                ("inf" if bound == math.inf else f"le_{bound:g}ms"): count
+                for bound, count in zip(LATENCY_BUCKETS_MS, buckets) if count
+            }
+        }
+
+class InstrumentedTool:
+    """Wraps a shared tool instance so every public method call is timed and counted.
+
+    Tools report failure by returning {"success": False, ...} rather than raising, so
+    those results count as errors too.
+    """
+
+    def __init__(self, name: str, tool: Any, stats: ToolStats):
+        self.name = name
+        self.tool = tool
+        self._stats = stats
+
+    def __getattr__(self, attr: str):
+        value = getattr(self.tool, attr)
+        if attr.startswith("_") or not callable(value):
+            return value
+
+        @functools.wraps(value)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = value(*args, **kwargs)
+                failed = isinstance(result, dict) and result.get("success") is False
+                return result
+            finally:
+                self._stats.record((time.perf_counter() - start) * 1000, failed)
+
+        # Cache the wrapper so later lookups skip __getattr__
+        setattr(self, attr, timed)
+        return timed
+
+class ToolRegistry:
+    """One shared, instrumented instance of each tool, created on first lookup"""
+
+    def __init__(self):
+        self._factories = {}
+        self._tools = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        with self._lock:
+            self._factories[name] = factory
+            self._tools.pop(name, None)
+            self._stats.setdefault(name, ToolStats())
+
+    def get(self, name: str) -> InstrumentedTool:
+        tool = self._tools.get(name)
+        if tool is None:
+            with self._lock:
+                tool = self._tools.get(name)
+                if tool is None:
+                    if name not in self._factories:
+                        raise KeyError(f"Unknown tool: {name}")
+                    tool = InstrumentedTool(name, self._factories[name](), self._stats[name])
+                    self._tools[name] = tool
+        return tool
+
+    def names(self) -> List[str]:
+        with self._lock:
+            return list(self._factories)
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-tool stats plus the busiest and slowest tools"""
+        with self._lock:
+            stats = dict(self._stats)
+        tools = {name: tool_stats.snapshot() for name, tool_stats in stats.items()}
+        used = [name for name, snapshot in tools.items() if snapshot["calls"]]
+        return {
+            "tools": tools,
+            "hottest": sorted(used, key=lambda name: tools[name]["calls"], reverse=True)[:5],
+            "slowest": sorted(used, key=lambda name: tools[name]["avg_ms"], reverse=True)[:5]
+        }
+
+def _register_builtin_tools(registry: ToolRegistry):
+    from tools.math_tools.calculator import BasicCalculator
+    from tools.math_tools.equation_solver import EquationSolver
+    from tools.math_tools.statistics_calculator import StatisticsCalculator
+    from tools.math_tools.geometry_calculator import GeometryCalculator
+    from tools.physic_tools.kinematics_calculator import KinematicsCalculator
+    from tools.physic_tools.energy_calculator import EnergyCalculator
+    from tools.physic_tools.circuit_calculator import CircuitCalculator
+    from tools.chemistry_tools.chemical_equation_balancer import ChemicalEquationBalancer
+    from tools.chemistry_tools.molar_mass_calculator import MolarMassCalculator
+    from tools.chemistry_tools.ph_calculator import pHCalculator
+    from tools.general_tools.answer_comparator import AnswerComparator
+    from tools.general_tools.feedback_generator import FeedbackGenerator
+
+    registry.register("calculator", BasicCalculator)
+    registry.register("equation_solver", EquationSolver)
+    registry.register("statistics_calculator", StatisticsCalculator)
+    registry.register("geometry_calculator", GeometryCalculator)
+    registry.register("kinematics_calculator", KinematicsCalculator)
+    registry.register("energy_calculator", EnergyCalculator)
+    registry.register("circuit_calculator", CircuitCalculator)
+    registry.register("equation_balancer", ChemicalEquationBalancer)
+    registry.register("molar_mass_calculator", MolarMassCalculator)
+    registry.register("ph_calculator", pHCalculator)
+    registry.register("answer_comparator", AnswerComparator)
+    registry.register("feedback_generator", FeedbackGenerator)
+
+tool_registry = ToolRegistry()
+_register_builtin_tools(tool_registry)